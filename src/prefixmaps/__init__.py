@@ -1,17 +1,60 @@
-from .datamodel.context import Context, PrefixExpansion, StatusType
-from .io.parser import load_context, load_converter, load_multi_context
+"""
+Semantic prefix maps.
 
-try:
-    from importlib.metadata import version
-except ImportError:  # for Python<3.8
-    from importlib_metadata import version
+Public names are imported on first use (see :func:`__getattr__`), so that importing the
+package stays cheap for command line tools that only need part of it.
+"""
+
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .datamodel.context import Context, PrefixExpansion, StatusType
+    from .io.parser import (
+        aload_context,
+        load_context,
+        load_converter,
+        load_multi_context,
+    )
 
 __all__ = [
     "load_converter",
     "load_context",
+    "aload_context",
     "load_multi_context",
     "Context",
     "StatusType",
     "PrefixExpansion",
 ]
-__version__ = version(__name__)
+
+_LAZY = {
+    "load_converter": "io.parser",
+    "load_context": "io.parser",
+    "aload_context": "io.parser",
+    "load_multi_context": "io.parser",
+    "Context": "datamodel.context",
+    "StatusType": "datamodel.context",
+    "PrefixExpansion": "datamodel.context",
+}
+"""Modules defining the public names, relative to this package."""
+
+
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        try:
+            from importlib.metadata import version
+        except ImportError:  # for Python<3.8
+            from importlib_metadata import version
+
+        value = version(__name__)
+    elif name in _LAZY:
+        # __import__ rather than importlib.import_module, to show in -X importtime
+        module = __import__(_LAZY[name], globals(), fromlist=[name], level=1)
+        value = getattr(module, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(__all__ + ["__version__"])
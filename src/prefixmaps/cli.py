@@ -0,0 +1,149 @@
+"""Command line interface for prefixmaps."""
+
+import io
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, TextIO, Tuple
+
+import click
+
+from prefixmaps.conversion.stream import CHUNK_SIZE, FORMATS, convert_stream
+from prefixmaps.conversion.trie import TrieConverter
+from prefixmaps.data import context_names
+from prefixmaps.io.parser import load_multi_context
+
+BUFFER_SIZE = 1 << 20
+"""Size in bytes of the buffers used to read and write files."""
+
+_SUFFIX_FORMATS = {".csv": "csv", ".nt": "nt"}
+
+
+@contextmanager
+def _open(path: str, mode: str, newline=None) -> Iterator[TextIO]:
+    if path != "-":
+        with open(path, mode, encoding="utf-8", newline=newline, buffering=BUFFER_SIZE) as file:
+            yield file
+        return
+    stream = sys.stdin if "r" in mode else sys.stdout
+    file = io.TextIOWrapper(stream.buffer, encoding="utf-8", newline=newline)
+    try:
+        yield file
+    finally:
+        # leave the standard stream open
+        if "w" in mode:
+            file.flush()
+        file.detach()
+
+
+@click.group()
+def main():
+    """Work with semantic prefix maps."""
+
+
+@main.command()
+@click.argument("input", default="-", type=click.Path(exists=True, allow_dash=True, dir_okay=False))
+@click.option(
+    "-o",
+    "--output",
+    default="-",
+    type=click.Path(allow_dash=True, dir_okay=False),
+    help="Path to write to; defaults to standard output",
+)
+@click.option(
+    "-c",
+    "--context",
+    "contexts",
+    multiple=True,
+    default=["merged"],
+    show_default=True,
+    help="Context to use; repeat to merge contexts, the first having highest precedence",
+)
+@click.option(
+    "--expand/--compress",
+    default=False,
+    help="Expand CURIEs to URIs, or compress URIs to CURIEs (the default)",
+)
+@click.option(
+    "-f",
+    "--format",
+    type=click.Choice(FORMATS),
+    help="Input format; inferred from the file extension if not given, otherwise tsv",
+)
+@click.option(
+    "-k",
+    "--column",
+    "columns",
+    multiple=True,
+    help="Column to convert, as a 1-based number or a header name; repeatable. "
+    "Defaults to every column",
+)
+@click.option("--header/--no-header", default=False, help="Copy the first line unchanged")
+@click.option(
+    "-j", "--jobs", default=1, show_default=True, type=click.IntRange(min=1), help="Processes"
+)
+@click.option(
+    "--chunk-size",
+    default=CHUNK_SIZE,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Lines converted at a time",
+)
+def convert(
+    input: str,
+    output: str,
+    contexts: Tuple[str, ...],
+    expand: bool,
+    format: str,
+    columns: Tuple[str, ...],
+    header: bool,
+    jobs: int,
+    chunk_size: int,
+):
+    """
+    Converts URIs to CURIEs (or back) in a TSV, CSV or N-Triples file.
+
+    Reads from INPUT, or standard input if not given. Values that cannot be
+    converted are left unchanged. Input is processed in chunks, so files of any
+    size can be converted in constant memory.
+
+    Example:
+
+        prefixmaps convert -c obo -k 2 --header associations.tsv > compressed.tsv
+    """
+    names = context_names()
+    for name in contexts:
+        if name not in names:
+            raise click.BadParameter(
+                f"{name}; must be one of {', '.join(names)}", param_hint="--context"
+            )
+    if format is None:
+        format = _SUFFIX_FORMATS.get(Path(input).suffix, "tsv")
+    if format == "nt" and columns:
+        raise click.UsageError("--column cannot be used with N-Triples")
+    selected = None
+    if columns:
+        selected = [int(c) - 1 if c.isdigit() else c for c in columns]
+        if any(c == -1 for c in selected):
+            raise click.BadParameter("column numbers start at 1", param_hint="--column")
+    converter = TrieConverter.from_context(load_multi_context(list(contexts)))
+    newline = "" if format == "csv" else None
+    with _open(input, "r", newline=newline) as input_file, _open(output, "w") as output_file:
+        try:
+            convert_stream(
+                input_file,
+                output_file,
+                converter,
+                expand=expand,
+                format=format,
+                columns=selected,
+                header=header,
+                jobs=jobs,
+                chunk_size=chunk_size,
+            )
+        except ValueError as e:
+            raise click.UsageError(str(e)) from e
+
+
+if __name__ == "__main__":
+    main()
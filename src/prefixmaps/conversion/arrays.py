@@ -0,0 +1,230 @@
+"""
+Bulk conversion of NumPy and Arrow string arrays between CURIEs and URIs.
+
+For compression, rather than converting element by element, the distinct namespace
+candidates in an array are resolved once against the canonical prefix map of a context,
+and the results are applied to the whole array with vectorized splitting and
+concatenation. Expansion looks up the prefix of each value in the prefix map, which is
+faster than vectorized splitting of NumPy strings.
+
+Values that cannot be converted are left unchanged and flagged in a boolean mask, rather
+than raising exceptions.
+
+This module requires NumPy; Arrow arrays are supported if PyArrow is installed.
+"""
+
+from typing import Any, Mapping, NamedTuple, Optional
+
+from prefixmaps.conversion.trie import NamespaceTrie
+from prefixmaps.datamodel.context import NAMESPACE, PREFIX, Context
+
+__all__ = [
+    "ArrayResult",
+    "ArrayConverter",
+]
+
+CHUNK_SIZE = 1 << 18
+"""Number of values converted at a time, bounding the size of intermediate arrays."""
+
+STEM_TERMINALS = "/#_:="
+"""Characters that namespaces conventionally end with."""
+
+
+class ArrayResult(NamedTuple):
+    """The result of converting an array."""
+
+    values: Any
+    """The converted values, as the same kind of array as the input (NumPy or Arrow).
+    Unconverted values are left as they were."""
+
+    unmatched: Any
+    """NumPy boolean array, True where a value could not be converted (including nulls)."""
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("Array conversion requires numpy; pip install numpy") from e
+    return numpy
+
+
+class ArrayConverter:
+    """
+    Converts arrays of CURIEs or URIs using a canonical prefix map.
+
+    Only canonical expansions are used, as given by :meth:`Context.as_dict` and
+    :meth:`Context.as_inverted_dict`.
+    """
+
+    def __init__(self, prefix_map: Mapping[PREFIX, NAMESPACE], delimiter: str = ":"):
+        self.prefix_map = dict(prefix_map)
+        self.delimiter = delimiter
+        self._trie = NamespaceTrie()
+        self._irregular_namespaces = []
+        self._self_expanding = False
+        """Whether some CURIE expands to itself, e.g. with a namespace "x:" for prefix "x"."""
+        for prefix, namespace in self.prefix_map.items():
+            self._trie.add(namespace, prefix)
+            if not namespace or namespace[-1] not in STEM_TERMINALS:
+                self._irregular_namespaces.append(namespace)
+            if namespace == prefix + delimiter:
+                self._self_expanding = True
+
+    @classmethod
+    def from_context(cls, context: Context, delimiter: str = ":") -> "ArrayConverter":
+        """
+        Creates a converter from the canonical expansions of a context.
+
+        :param context:
+        :param delimiter: separator between prefix and local identifier in CURIEs
+        :return:
+        """
+        return cls(context.as_dict(), delimiter=delimiter)
+
+    def expand(self, values) -> ArrayResult:
+        """
+        Expands an array of CURIEs to URIs.
+
+        :param values: NumPy array, PyArrow array or chunked array, or sequence of strings
+        :return:
+        """
+        return self._convert(values, self._expand_chunk)
+
+    def compress(self, values) -> ArrayResult:
+        """
+        Compresses an array of URIs to CURIEs, using the longest matching namespace.
+
+        :param values: NumPy array, PyArrow array or chunked array, or sequence of strings
+        :return:
+        """
+        return self._convert(values, self._compress_chunk)
+
+    def _convert(self, values, convert_chunk) -> ArrayResult:
+        np = _import_numpy()
+        arrow_type = _arrow_type(values)
+        if arrow_type is not None:
+            values = values.to_numpy(zero_copy_only=False)
+        values = np.asarray(values)
+        if values.dtype == object:
+            nulls = np.equal(values, None)
+            strings = np.where(nulls, "", values).astype(str)
+        else:
+            nulls = np.zeros(values.shape, dtype=bool)
+            strings = values.astype(str, copy=False)
+        strings = strings.ravel()
+        results = []
+        unmatched = []
+        for start in range(0, len(strings), CHUNK_SIZE):
+            chunk_results, chunk_unmatched = convert_chunk(np, strings[start : start + CHUNK_SIZE])
+            results.append(chunk_results)
+            unmatched.append(chunk_unmatched)
+        if len(results) == 1:
+            converted = results[0].reshape(values.shape)
+            unmatched = unmatched[0].reshape(values.shape) | nulls
+        elif results:
+            converted = np.concatenate(results).reshape(values.shape)
+            unmatched = np.concatenate(unmatched).reshape(values.shape) | nulls
+        else:
+            converted = strings.reshape(values.shape)
+            unmatched = nulls
+        if arrow_type is not None:
+            import pyarrow
+
+            converted = pyarrow.array(converted.ravel(), mask=nulls.ravel(), type=arrow_type)
+        elif values.dtype == object:
+            converted = np.where(unmatched, values, converted.astype(object))
+        return ArrayResult(converted, unmatched)
+
+    def _expand_chunk(self, np, curies):
+        # a dict lookup per value is faster than splitting and joining fixed-width NumPy
+        # strings (see the "arrays:expand" benchmark)
+        get = self.prefix_map.get
+        delimiter = self.delimiter
+        expanded = []
+        append = expanded.append
+        for curie in curies.tolist():
+            prefix, found, local_id = curie.partition(delimiter)
+            namespace = get(prefix) if found else None
+            append(curie if namespace is None else namespace + local_id)
+        expanded = np.array(expanded, dtype=str)
+        if not self._self_expanding:
+            # only unmatched values are left unchanged
+            return expanded, expanded == curies
+        prefixes = np.char.partition(curies, delimiter)
+        matched = np.isin(prefixes[:, 0], list(self.prefix_map)) & (prefixes[:, 1] != "")
+        return expanded, ~matched
+
+    def _compress_chunk(self, np, uris):
+        # The stem of a URI runs up to the last character that a namespace conventionally
+        # ends with. Any such namespace matching the URI is a prefix of its stem, so all
+        # URIs with the same stem compress using the same namespace. URIs that may match
+        # an irregular namespace use the whole URI as the stem.
+        n = len(uris)
+        stem_lengths = np.zeros(n, dtype=np.int64)
+        for terminal in STEM_TERMINALS:
+            np.maximum(stem_lengths, np.char.rfind(uris, terminal) + 1, out=stem_lengths)
+        for namespace in self._irregular_namespaces:
+            irregular = np.char.startswith(uris, namespace)
+            stem_lengths[irregular] = np.char.str_len(uris[irregular])
+        stems = _slice(np, uris, np.zeros(n, dtype=np.int64), stem_lengths)
+        unique_stems, inverse = _group(np, stems)
+        longest_match = self._trie.longest_match
+        matches = [longest_match(stem) for stem in unique_stems]
+        found = np.array([match is not None for match in matches], dtype=bool)
+        prefixes = np.array([match[0] + self.delimiter if match else "" for match in matches])
+        lengths = np.array([match[1] if match else 0 for match in matches], dtype=np.int64)
+        matched = found[inverse]
+        local_ids = _slice(np, uris, lengths[inverse], None)
+        curies = np.char.add(prefixes[inverse].astype(str), local_ids)
+        return np.where(matched, curies, uris), ~matched
+
+
+def _group(np, values):
+    """
+    Groups equal values.
+
+    :return: the distinct values as a list, and for each value the index of its group
+    """
+    groups = {}
+    setdefault = groups.setdefault
+    inverse = np.fromiter(
+        (setdefault(value, len(groups)) for value in values.tolist()),
+        dtype=np.int64,
+        count=len(values),
+    )
+    return list(groups), inverse
+
+
+def _slice(np, strings, starts, stops):
+    """
+    Slices each string of an array, with a start (and stop) per string.
+
+    :param strings: array of strings
+    :param starts: integer array of start positions
+    :param stops: integer array of stop positions, or None for the end of each string
+    :return:
+    """
+    if hasattr(np, "strings") and hasattr(np.strings, "slice"):
+        return np.strings.slice(strings, starts, stops)
+    # older NumPy: gather characters from a 2D view of the fixed-width strings
+    n = len(strings)
+    width = strings.dtype.itemsize // 4
+    if n == 0 or width == 0:
+        return strings
+    chars = np.ascontiguousarray(strings).view("U1").reshape(n, width)
+    columns = np.arange(width)
+    source = starts[:, None] + columns
+    keep = source < width
+    if stops is not None:
+        keep &= source < stops[:, None]
+    sliced = np.where(keep, chars[np.arange(n)[:, None], np.minimum(source, width - 1)], "")
+    return np.ascontiguousarray(sliced).view(f"U{width}").ravel()
+
+
+def _arrow_type(values) -> Optional[Any]:
+    """Get the Arrow type of an Arrow array, or None if it is not an Arrow array."""
+    module = type(values).__module__
+    if not module.startswith("pyarrow"):
+        return None
+    return values.type
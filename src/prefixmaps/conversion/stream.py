@@ -0,0 +1,217 @@
+"""
+Streaming conversion of delimited and N-Triples files.
+
+Input is read and converted in chunks of lines, so memory use is bounded by the chunk
+size rather than the size of the input. Chunks can be converted in parallel by a pool
+of worker processes; output is always written in input order.
+"""
+
+import csv
+import io
+import multiprocessing
+import re
+from collections import deque
+from typing import Collection, Iterable, Iterator, List, Optional, TextIO, Union
+
+from prefixmaps.conversion.trie import TrieConverter
+
+__all__ = [
+    "FORMATS",
+    "LineRewriter",
+    "convert_stream",
+]
+
+FORMATS = ["tsv", "csv", "nt"]
+"""Supported input formats."""
+
+CHUNK_SIZE = 10000
+"""Default number of lines (or records, for CSV) converted at a time."""
+
+_NT_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"(?:@[\w-]+|\^\^)?|<([^>]*)>|([^\s<"]+)')
+"""Matches a literal (skipped), an IRI (group 1) or a bare term (group 2) in N-Triples."""
+
+
+class LineRewriter:
+    """
+    Rewrites chunks of input, converting either selected columns or every term.
+
+    Values that cannot be converted are written unchanged.
+    """
+
+    def __init__(
+        self,
+        converter: TrieConverter,
+        expand: bool = False,
+        format: str = "tsv",
+        columns: Optional[Collection[int]] = None,
+    ):
+        """
+        :param converter:
+        :param expand: if True, expand CURIEs to URIs, otherwise compress URIs to CURIEs
+        :param format: one of :data:`FORMATS`
+        :param columns: zero-based indexes of columns to convert; None for all
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format: {format}; must be one of {FORMATS}")
+        self.converter = converter
+        self.expand = expand
+        self.format = format
+        self.columns = None if columns is None else frozenset(columns)
+        self._convert = converter.expand if expand else converter.compress
+
+    def convert_value(self, value: str) -> str:
+        """
+        Converts a single value, or returns it unchanged.
+
+        :param value:
+        :return:
+        """
+        converted = self._convert(value)
+        return value if converted is None else converted
+
+    def rewrite(self, chunk: List) -> str:
+        """
+        Rewrites a chunk of input.
+
+        :param chunk: lines of text, or for CSV, parsed records
+        :return: the rewritten text
+        """
+        if self.format == "nt":
+            return "".join(map(self._rewrite_triple, chunk))
+        if self.format == "csv":
+            output = io.StringIO()
+            csv.writer(output, lineterminator="\n").writerows(map(self._rewrite_row, chunk))
+            return output.getvalue()
+        lines = []
+        for line in chunk:
+            content = line.rstrip("\r\n")
+            row = self._rewrite_row(content.split("\t"))
+            lines.append("\t".join(row) + line[len(content) :])
+        return "".join(lines)
+
+    def _rewrite_row(self, row: List[str]) -> List[str]:
+        convert_value = self.convert_value
+        columns = self.columns
+        return [
+            convert_value(value) if value and (columns is None or i in columns) else value
+            for i, value in enumerate(row)
+        ]
+
+    def _rewrite_triple(self, line: str) -> str:
+        if self.expand:
+            return _NT_TOKEN.sub(self._expand_term, line)
+        return _NT_TOKEN.sub(self._compress_term, line)
+
+    def _compress_term(self, match: "re.Match") -> str:
+        if match.group(1) is None:
+            return match.group(0)
+        curie = self._convert(match.group(1))
+        return match.group(0) if curie is None else curie
+
+    def _expand_term(self, match: "re.Match") -> str:
+        if match.group(2) is None:
+            return match.group(0)
+        uri = self._convert(match.group(2))
+        return match.group(0) if uri is None else f"<{uri}>"
+
+
+def _chunks(records: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+_worker_rewriter: Optional[LineRewriter] = None
+
+
+def _init_worker(rewriter: LineRewriter) -> None:
+    global _worker_rewriter
+    _worker_rewriter = rewriter
+
+
+def _rewrite_in_worker(chunk: List) -> str:
+    return _worker_rewriter.rewrite(chunk)
+
+
+def _column_indexes(
+    columns: Optional[Collection[Union[int, str]]], header: Optional[List[str]]
+) -> Optional[List[int]]:
+    if columns is None:
+        return None
+    indexes = []
+    for column in columns:
+        if isinstance(column, int):
+            indexes.append(column)
+        elif header is not None and column in header:
+            indexes.append(header.index(column))
+        else:
+            raise ValueError(f"No such column: {column}")
+    return indexes
+
+
+def convert_stream(
+    input: TextIO,
+    output: TextIO,
+    converter: TrieConverter,
+    expand: bool = False,
+    format: str = "tsv",
+    columns: Optional[Collection[Union[int, str]]] = None,
+    header: bool = False,
+    jobs: int = 1,
+    chunk_size: int = CHUNK_SIZE,
+) -> None:
+    """
+    Converts a stream, writing the result to another stream.
+
+    For CSV, the input should be opened with ``newline=""``, as for :func:`csv.reader`.
+
+    :param input:
+    :param output:
+    :param converter:
+    :param expand: if True, expand CURIEs to URIs, otherwise compress URIs to CURIEs
+    :param format: one of :data:`FORMATS`
+    :param columns: columns to convert, as zero-based indexes or header names; None for all
+    :param header: if True, the first line is a header, and is copied unchanged
+    :param jobs: number of worker processes; 1 to convert in this process
+    :param chunk_size: number of lines (or CSV records) per chunk
+    :return:
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format: {format}; must be one of {FORMATS}")
+    if format == "nt" and columns is not None:
+        raise ValueError("Columns cannot be selected for N-Triples")
+    header_row = None
+    if format == "csv":
+        records = csv.reader(input)
+        if header:
+            header_row = next(records, None)
+            if header_row is not None:
+                csv.writer(output, lineterminator="\n").writerow(header_row)
+    else:
+        records = iter(input)
+        if header:
+            line = next(records, None)
+            if line is not None:
+                header_row = line.rstrip("\r\n").split("\t")
+                output.write(line)
+    rewriter = LineRewriter(converter, expand, format, _column_indexes(columns, header_row))
+    chunks = _chunks(records, chunk_size)
+    if jobs <= 1:
+        for chunk in chunks:
+            output.write(rewriter.rewrite(chunk))
+        return
+    # keep a bounded window of chunks in flight, so memory stays constant and
+    # results can be written in input order
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(rewriter,)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_rewrite_in_worker, (chunk,)))
+            if len(pending) >= 2 * jobs:
+                output.write(pending.popleft().get())
+        while pending:
+            output.write(pending.popleft().get())
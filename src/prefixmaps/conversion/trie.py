@@ -0,0 +1,217 @@
+"""
+Compression of URIs and expansion of CURIEs using a radix trie of namespaces.
+
+Compressing a URI means finding the longest namespace that the URI starts with. Rather
+than trying every namespace, the namespaces of a context are stored in a radix trie
+(a trie whose edges are labeled with strings rather than single characters), so a
+lookup follows a single path whose length is bounded by the length of the URI,
+independent of the number of namespaces.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from prefixmaps.datamodel.context import (
+    NAMESPACE,
+    PREFIX,
+    Context,
+    PrefixExpansion,
+    StatusType,
+)
+
+__all__ = [
+    "NamespaceTrie",
+    "TrieConverter",
+]
+
+CURIE = str
+URI = str
+
+
+class _Node:
+    __slots__ = ("label", "value", "children")
+
+    def __init__(self, label: str, value: Optional[PREFIX] = None):
+        self.label = label
+        self.value = value
+        self.children: Dict[str, "_Node"] = {}
+
+
+class NamespaceTrie:
+    """
+    A radix trie mapping namespaces to prefixes, supporting longest-match lookup.
+    """
+
+    def __init__(self):
+        self._root = _Node("")
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, namespace: NAMESPACE, prefix: PREFIX) -> bool:
+        """
+        Adds a namespace, unless it is already present.
+
+        :param namespace:
+        :param prefix: the prefix to compress the namespace to
+        :return: True if the namespace was added
+        """
+        node = self._root
+        pos = 0
+        end = len(namespace)
+        while pos < end:
+            child = node.children.get(namespace[pos])
+            if child is None:
+                node.children[namespace[pos]] = _Node(namespace[pos:], prefix)
+                self._size += 1
+                return True
+            label = child.label
+            i = 1
+            limit = min(len(label), end - pos)
+            while i < limit and label[i] == namespace[pos + i]:
+                i += 1
+            if i < len(label):
+                # split the edge at the first mismatch
+                middle = _Node(label[:i])
+                child.label = label[i:]
+                middle.children[child.label[0]] = child
+                node.children[namespace[pos]] = middle
+                child = middle
+            node = child
+            pos += i
+        if node.value is not None:
+            return False
+        node.value = prefix
+        self._size += 1
+        return True
+
+    def longest_match(self, uri: URI) -> Optional[Tuple[PREFIX, int]]:
+        """
+        Finds the longest namespace that is a prefix of the URI.
+
+        :param uri:
+        :return: the prefix for the namespace and the length of the namespace, or None
+        """
+        node = self._root
+        pos = 0
+        end = len(uri)
+        best = None
+        while True:
+            if node.value is not None:
+                best = node.value, pos
+            if pos >= end:
+                return best
+            node = node.children.get(uri[pos])
+            if node is None or not uri.startswith(node.label, pos):
+                return best
+            pos += len(node.label)
+
+
+class TrieConverter:
+    """
+    Converts between URIs and CURIEs using the canonical expansions of a context.
+
+    The precedence rules are those of :meth:`Context.as_extended_prefix_map`:
+
+    - URIs starting with a canonical namespace, or with the namespace of a prefix alias of
+      a canonical prefix, are compressed using the canonical prefix
+    - CURIEs using a canonical prefix, or the prefix of a namespace alias of a canonical
+      namespace, are expanded using the canonical namespace
+
+    Unlike :class:`curies.Converter`, this does not require building an extended prefix
+    map, and lookups take time proportional to the length of the URI.
+    """
+
+    def __init__(self, expansions: Iterable[PrefixExpansion], delimiter: str = ":"):
+        self.delimiter = delimiter
+        self.trie = NamespaceTrie()
+        self.prefix_map: Dict[PREFIX, NAMESPACE] = {}
+        expansions = list(expansions)
+        reverse_prefix_map: Dict[NAMESPACE, PREFIX] = {}
+        for pe in expansions:
+            if pe.status == StatusType.canonical:
+                self.prefix_map.setdefault(pe.prefix, pe.namespace)
+                reverse_prefix_map.setdefault(pe.namespace, pe.prefix)
+                self.trie.add(pe.namespace, pe.prefix)
+        for pe in expansions:
+            if pe.status == StatusType.prefix_alias and pe.prefix in self.prefix_map:
+                self.trie.add(pe.namespace, pe.prefix)
+        self._expand_map = dict(self.prefix_map)
+        for pe in expansions:
+            if pe.status == StatusType.namespace_alias and pe.namespace in reverse_prefix_map:
+                self._expand_map.setdefault(pe.prefix, pe.namespace)
+
+    @classmethod
+    def from_context(cls, context: Context, delimiter: str = ":") -> "TrieConverter":
+        """
+        Creates a converter from the expansions of a context.
+
+        :param context:
+        :param delimiter: separator between prefix and local identifier in CURIEs
+        :return:
+        """
+        return cls(context.prefix_expansions, delimiter=delimiter)
+
+    def compress(self, uri: URI) -> Optional[CURIE]:
+        """
+        Compresses a URI to a CURIE using the longest matching namespace.
+
+        :param uri:
+        :return: None if no namespace matches
+        """
+        match = self.trie.longest_match(uri)
+        if match is None:
+            return None
+        prefix, length = match
+        return prefix + self.delimiter + uri[length:]
+
+    def expand(self, curie: CURIE) -> Optional[URI]:
+        """
+        Expands a CURIE to a URI.
+
+        :param curie:
+        :return: None if the CURIE is malformed or the prefix is unknown
+        """
+        prefix, delimiter, local_id = curie.partition(self.delimiter)
+        if not delimiter:
+            return None
+        namespace = self._expand_map.get(prefix)
+        if namespace is None:
+            return None
+        return namespace + local_id
+
+    def compress_many(self, uris: Iterable[URI]) -> List[Optional[CURIE]]:
+        """
+        Compresses URIs; as :meth:`compress` for each.
+
+        :param uris:
+        :return:
+        """
+        longest_match = self.trie.longest_match
+        delimiter = self.delimiter
+        results = []
+        append = results.append
+        for uri in uris:
+            match = longest_match(uri)
+            if match is None:
+                append(None)
+            else:
+                append(match[0] + delimiter + uri[match[1] :])
+        return results
+
+    def expand_many(self, curies: Iterable[CURIE]) -> List[Optional[URI]]:
+        """
+        Expands CURIEs; as :meth:`expand` for each.
+
+        :param curies:
+        :return:
+        """
+        get = self._expand_map.get
+        delimiter = self.delimiter
+        results = []
+        append = results.append
+        for curie in curies:
+            prefix, sep, local_id = curie.partition(delimiter)
+            namespace = get(prefix) if sep else None
+            append(None if namespace is None else namespace + local_id)
+        return results
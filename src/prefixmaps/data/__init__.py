@@ -1,12 +1,86 @@
 from pathlib import Path
-from typing import Mapping
+from typing import Dict, ItemsView, Iterator, KeysView, List, Mapping, ValuesView
 
 __all__ = [
     "data_path",
     "context_paths",
+    "COMBINED",
+    "canonical_combined",
+    "context_names",
 ]
 
 data_path = Path(__file__).parent
 
+
+class _ContextPaths(Mapping[str, Path]):
+    """
+    A read-only mapping from contexts to the paths of their datafiles.
+
+    A :class:`prefixmaps.io.watch.ContextWatcher` replaces the underlying dict when
+    datafiles are added or removed, in a single assignment, and never modifies it, so
+    readers in other threads see either the old or the new contexts.
+    """
+
+    def __init__(self, paths: Dict[str, Path]):
+        self._paths = paths
+
+    def _publish(self, paths: Dict[str, Path]) -> None:
+        self._paths = paths
+
+    def __getitem__(self, name: str) -> Path:
+        return self._paths[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    # views of one version of the dict, rather than looking up its keys in the latest
+    def keys(self) -> KeysView[str]:
+        return self._paths.keys()
+
+    def items(self) -> ItemsView[str, Path]:
+        return self._paths.items()
+
+    def values(self) -> ValuesView[Path]:
+        return self._paths.values()
+
+    def __repr__(self) -> str:
+        return repr(self._paths)
+
+
 #: A mapping from contexts to their paths
-context_paths: Mapping[str, Path] = {path.stem: path for path in data_path.glob("*.csv")}
+context_paths: Mapping[str, Path] = _ContextPaths(
+    {path.stem: path for path in data_path.glob("*.csv")}
+)
+
+COMBINED: Dict[str, List[str]] = {
+    "merged": ["obo", "go", "linked_data", "bioregistry.upper", "prefixcc"],
+    "merged.monarch": ["obo", "go", "linked_data", "bioregistry.upper", "prefixcc"],
+    "merged.oak": ["obo", "go", "linked_data", "bioregistry.upper", "prefixcc"],
+}
+"""Contexts that remix other contexts. Order is significant, with the first listed having highest precedence."""
+
+
+def canonical_combined(name: str) -> str:
+    """
+    Get the first combined context with the same components as a combined context.
+
+    Combined contexts with the same components are aliases, and only the first is
+    computed (and distributed).
+
+    :param name: name of a combined context
+    :return:
+    """
+    components = COMBINED[name]
+    return next(other for other, names in COMBINED.items() if names == components)
+
+
+def context_names() -> List[str]:
+    """
+    Get the names of all contexts that can be loaded, including combined contexts.
+
+    :return:
+    """
+    return sorted(set(context_paths) | set(COMBINED))
@@ -3,15 +3,32 @@
 import logging
 import re
 from collections import defaultdict
+from copy import copy
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Mapping, Optional, Set, Union
-
-import curies
+from typing import (
+    TYPE_CHECKING,
+    AbstractSet,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+if TYPE_CHECKING:
+    import curies
+
+    from prefixmaps.datamodel.validation import ValidationIssue
 
 __all__ = [
     "StatusType",
     "PrefixExpansion",
+    "ContextDiff",
     "Context",
 ]
 
@@ -50,14 +67,19 @@ class StatusType(Enum):
     """Both the prefix and the namespace are aliases for existing canonical namespaces."""
 
 
-@dataclass
 class PrefixExpansion:
     """
     An individual mapping between a prefix and a namespace.
 
     A PrefixExpansion corresponds to a SHACL PrefixDeclaration (https://www.w3.org/TR/shacl/#dfn-prefix-declarations)
+
+    Contexts hold many thousands of expansions, so instances use ``__slots__`` rather than
+    a per-instance ``__dict__``. The status is a reference to a shared :class:`StatusType`
+    member, and loaders intern the repeated context and source names.
     """
 
+    __slots__ = ("context", "prefix", "namespace", "status", "expansion_source")
+
     context: CONTEXT
     """Each PrefixExpansion is grouped into a context."""
 
@@ -70,9 +92,45 @@ class PrefixExpansion:
     status: StatusType
     """Indicates whether the expansion is canonical, a prefix alias, a namespace alias, or both."""
 
-    expansion_source: Optional[str] = None
+    expansion_source: Optional[str]
     """Indicates the source of the prefix expansion."""
 
+    def __init__(
+        self,
+        context: CONTEXT,
+        prefix: PREFIX,
+        namespace: NAMESPACE,
+        status: StatusType,
+        expansion_source: Optional[str] = None,
+    ):
+        self.context = context
+        self.prefix = prefix
+        self.namespace = namespace
+        self.status = status
+        self.expansion_source = expansion_source
+
+    def as_tuple(self) -> Tuple[CONTEXT, PREFIX, NAMESPACE, StatusType, Optional[str]]:
+        """
+        The fields of the expansion, in declaration order.
+
+        :return:
+        """
+        return self.context, self.prefix, self.namespace, self.status, self.expansion_source
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(context={self.context!r}, prefix={self.prefix!r}, "
+            f"namespace={self.namespace!r}, status={self.status!r}, "
+            f"expansion_source={self.expansion_source!r})"
+        )
+
     def canonical(self) -> bool:
         """
         True if this is the canonical mapping in both directions.
@@ -108,12 +166,252 @@ class PrefixExpansion:
             messages.append(f"prefix {self.prefix} does not match {PREFIX_RE}")
         if not NAMESPACE_RE.match(self.namespace):
             messages.append(
-                f"namespace {self.namespace} does not match {NAMESPACE_RE}\
-                (prefix: {self.prefix})"
+                f"namespace {self.namespace} does not match {NAMESPACE_RE} (prefix: {self.prefix})"
             )
         return messages
 
 
+class ContextDiff(NamedTuple):
+    """
+    Differences between two versions of a context, as computed by :meth:`Context.diff`.
+
+    Expansions are identified by their prefix and namespace.
+    """
+
+    added: List[PrefixExpansion]
+    """Expansions only in the new version, in its order."""
+
+    removed: List[PrefixExpansion]
+    """Expansions only in the old version, in its order."""
+
+    changed: List[Tuple[PrefixExpansion, PrefixExpansion]]
+    """(old, new) expansions whose status or expansion source changed."""
+
+    @property
+    def empty(self) -> bool:
+        """True if the versions have the same expansions."""
+        return not (self.added or self.removed or self.changed)
+
+
+class _ExpansionIndex:
+    """
+    Hash indexes from prefixes and namespaces (exact and lowercased) to expansions.
+
+    Each index maps a key to the matching expansions, in the order they appear in the
+    context. The index covers the first ``size`` expansions of the context.
+    """
+
+    __slots__ = ("size", "by_prefix", "by_namespace", "by_prefix_lower", "by_namespace_lower")
+
+    def __init__(self):
+        self.size = 0
+        self.by_prefix: Dict[PREFIX, List[PrefixExpansion]] = {}
+        self.by_namespace: Dict[NAMESPACE, List[PrefixExpansion]] = {}
+        self.by_prefix_lower: Dict[str, List[PrefixExpansion]] = {}
+        self.by_namespace_lower: Dict[str, List[PrefixExpansion]] = {}
+
+    def add(self, pe: PrefixExpansion) -> None:
+        """
+        Index an expansion appended to the context.
+
+        :param pe:
+        :return:
+        """
+        prefix = pe.prefix
+        namespace = pe.namespace
+        self.by_prefix.setdefault(prefix, []).append(pe)
+        self.by_namespace.setdefault(namespace, []).append(pe)
+        self.by_prefix_lower.setdefault(prefix.lower(), []).append(pe)
+        self.by_namespace_lower.setdefault(namespace.lower(), []).append(pe)
+        self.size += 1
+
+    def update(self, expansions: Sequence[PrefixExpansion]) -> None:
+        """
+        Index the expansions not yet covered.
+
+        :param expansions: all expansions of the context
+        :return:
+        """
+        for pe in expansions[self.size :]:
+            self.add(pe)
+
+    def find(self, prefix: PREFIX, namespace: NAMESPACE) -> Optional[PrefixExpansion]:
+        """
+        Get the expansion with a prefix and namespace.
+
+        :param prefix:
+        :param namespace:
+        :return: None if there is no such expansion
+        """
+        for pe in self.by_prefix.get(prefix, ()):
+            if pe.namespace == namespace:
+                return pe
+        return None
+
+    def replace(self, pe: PrefixExpansion, new: Optional[PrefixExpansion]) -> None:
+        """
+        Replace an indexed expansion by one with the same prefix and namespace, in place,
+        or remove it.
+
+        :param pe: the indexed expansion
+        :param new: None to remove the expansion
+        :return:
+        """
+        for index, key in (
+            (self.by_prefix, pe.prefix),
+            (self.by_namespace, pe.namespace),
+            (self.by_prefix_lower, pe.prefix.lower()),
+            (self.by_namespace_lower, pe.namespace.lower()),
+        ):
+            expansions = index[key]
+            i = next(i for i, candidate in enumerate(expansions) if candidate is pe)
+            if new is not None:
+                expansions[i] = new
+            elif len(expansions) == 1:
+                del index[key]
+            else:
+                del expansions[i]
+
+
+def _namespace_key(namespace: NAMESPACE) -> str:
+    """
+    Normalize a namespace for lookups, ignoring case, the scheme (http or https) and
+    a trailing slash.
+
+    :param namespace:
+    :return:
+    """
+    key = namespace.lower()
+    if key.startswith("https://"):
+        key = key[8:]
+    elif key.startswith("http://"):
+        key = key[7:]
+    if key.endswith("/"):
+        key = key[:-1]
+    return key
+
+
+class _Resolver:
+    """
+    Hash indexes from prefixes and namespaces, as given and normalized, to the positions
+    of the canonical expansions they resolve to.
+
+    Canonical expansions resolve to themselves. A prefix alias resolves to the canonical
+    expansion of its prefix, and a namespace alias to that of its namespace. When
+    normalized keys clash, the expansion that comes first in the context wins.
+    """
+
+    __slots__ = ("by_prefix", "by_prefix_lower", "by_namespace", "by_namespace_key")
+
+    def __init__(self, rows: Iterable[Tuple[PREFIX, NAMESPACE, StatusType]]):
+        """
+        :param rows: (prefix, namespace, status) of each expansion, in order
+        """
+        rows = list(rows)
+        canonical = StatusType.canonical
+        canonical_by_prefix = {}
+        canonical_by_namespace = {}
+        resolved = []
+        for i, (prefix, namespace, status) in enumerate(rows):
+            if status == canonical:
+                canonical_by_prefix.setdefault(prefix.lower(), i)
+                canonical_by_namespace.setdefault(namespace.lower(), i)
+                resolved.append((i, i))
+        for i, (prefix, namespace, status) in enumerate(rows):
+            if status == canonical:
+                continue
+            by_prefix = canonical_by_prefix.get(prefix.lower())
+            by_namespace = canonical_by_namespace.get(namespace.lower())
+            if status == StatusType.namespace_alias:
+                target = by_prefix if by_namespace is None else by_namespace
+            else:
+                target = by_namespace if by_prefix is None else by_prefix
+            if target is not None:
+                resolved.append((i, target))
+        self.by_prefix: Dict[PREFIX, int] = {}
+        self.by_prefix_lower: Dict[str, int] = {}
+        self.by_namespace: Dict[NAMESPACE, int] = {}
+        self.by_namespace_key: Dict[str, int] = {}
+        for i, target in resolved:
+            prefix, namespace, _ = rows[i]
+            self.by_prefix.setdefault(prefix, target)
+            self.by_prefix_lower.setdefault(prefix.lower(), target)
+            self.by_namespace.setdefault(namespace, target)
+            self.by_namespace_key.setdefault(_namespace_key(namespace), target)
+
+
+class _Views:
+    """
+    Cached views of the canonical expansions of a context.
+
+    The prefix map and its inverse are updated incrementally as expansions are appended;
+    the extended prefix map, the converter and the resolver are recomputed on demand
+    after a change. The views are valid for the expansions covered by ``index``, up to
+    ``size``.
+    """
+
+    __slots__ = (
+        "index",
+        "size",
+        "prefix_map",
+        "inverse_map",
+        "extended",
+        "converter",
+        "resolver",
+    )
+
+    def __init__(self, index: _ExpansionIndex):
+        self.index = index
+        self.size = 0
+        self.prefix_map: Dict[PREFIX, NAMESPACE] = {}
+        self.inverse_map: Dict[NAMESPACE, PREFIX] = {}
+        self.extended: Optional[List["curies.Record"]] = None
+        self.converter: Optional["curies.Converter"] = None
+        self.resolver: Optional[_Resolver] = None
+
+    def update(self, expansions: Sequence[PrefixExpansion]) -> None:
+        """
+        Add the canonical expansions not yet covered, and drop derived views.
+
+        :param expansions: all expansions of the context
+        :return:
+        """
+        prefix_map = self.prefix_map
+        inverse_map = self.inverse_map
+        for pe in expansions[self.size : self.index.size]:
+            if pe.canonical():
+                prefix_map[pe.prefix] = pe.namespace
+                inverse_map[pe.namespace] = pe.prefix
+        self.size = self.index.size
+        self.extended = None
+        self.converter = None
+        self.resolver = None
+
+
+def _converter(records: List["curies.Record"]) -> "curies.Converter":
+    """
+    Get a converter from an extended prefix map.
+
+    The converter checks records for duplicate prefixes and URI prefixes pairwise, which
+    takes quadratic time, so duplicates are looked for here, in linear time, and only
+    records with duplicates are left to the converter to report.
+    """
+    import curies
+
+    prefixes = set()
+    uri_prefixes = set()
+    for record in records:
+        record_prefixes = {record.prefix, *record.prefix_synonyms}
+        record_uri_prefixes = {record.uri_prefix, *record.uri_prefix_synonyms}
+        if not prefixes.isdisjoint(record_prefixes) or not uri_prefixes.isdisjoint(
+            record_uri_prefixes
+        ):
+            return curies.Converter.from_extended_prefix_map(records)
+        prefixes |= record_prefixes
+        uri_prefixes |= record_uri_prefixes
+    return curies.Converter(records, strict=False)
+
+
 @dataclass
 class Context:
     """
@@ -143,14 +441,18 @@ class Context:
     merged_from: Optional[List[str]] = None
     upper: bool = None
     lower: bool = None
-    _prefixes: Set[str] = field(default_factory=set)
-    """Private attr to speed up duplicate lookups"""
-    _prefixes_lower: Set[str] = field(default_factory=set)
-    """Private attr to speed up duplicate lookups"""
-    _namespaces: Set[str] = field(default_factory=set)
-    """Private attr to speed up duplicate lookups"""
-    _namespaces_lower: Set[str] = field(default_factory=set)
-    """Private attr to speed up duplicate lookups"""
+    _index: Optional[_ExpansionIndex] = field(default=None, repr=False, compare=False)
+    """Private attr to speed up duplicate, prefix and namespace lookups; maintained incrementally"""
+    _views: Optional[_Views] = field(default=None, repr=False, compare=False)
+    """Private attr caching the prefix maps and converter; maintained alongside the index"""
+    _origin: Optional["Context"] = field(default=None, repr=False, compare=False)
+    """Private attr: a context whose index and views are used until this one is modified"""
+
+    def __setattr__(self, name: str, value) -> None:
+        if name == "prefix_expansions":
+            # the index and views cover the expansions being replaced
+            self._drop_index()
+        object.__setattr__(self, name, value)
 
     def combine(self, context: "Context"):
         """
@@ -159,11 +461,14 @@ class Context:
         If there are conflicts, the current context takes precedence,
         and the merged expansions are marked as non-canonical
 
+        This is equivalent to calling :meth:`add_prefix` for each expansion of the other
+        context, but classifies all of them in a single pass over the indexes.
+
         :param context:
         :return:
         """
-        for pe in context.prefix_expansions:
-            self.add_prefix(pe.prefix, pe.namespace, pe.status, expansion_source=context.name)
+        rows = ((pe.prefix, pe.namespace, pe.status) for pe in context.prefix_expansions)
+        self._add_all(rows, False, context.name)
 
     def add_prefix(
         self,
@@ -184,6 +489,8 @@ class Context:
         prefix will be auto-case normalized,
         UNLESS preferred=True
 
+        This takes constant (amortized) time.
+
         :param prefix: prefix to be added
         :param namespace: namespace to be added
         :param status: the status of the prefix being added
@@ -191,52 +498,284 @@ class Context:
         :param expansion_source: An optional annotation to be used when merging contexts together.
             The source will keep track of the original context that a given prefix
             expansion came from. This is used in :meth:`Context.combine`.
-        :param force: if True, recompute namespaces and prefixes. default False.
+        :param force: if True, rebuild the prefix and namespace indexes first. default False.
         :return:
         """
+        if force:
+            self.reindex()
+        self._add_all([(prefix, namespace, status)], preferred, expansion_source)
+
+    def add_prefixes(
+        self,
+        expansions: Iterable[Tuple[PREFIX, NAMESPACE]],
+        status: StatusType = StatusType.canonical,
+        preferred: bool = False,
+        expansion_source: Optional[str] = None,
+    ):
+        """
+        Adds prefix expansions to this context, in order.
+
+        This is equivalent to calling :meth:`add_prefix` for each (prefix, namespace) pair,
+        and takes time linear in the number of pairs.
+
+        :param expansions: (prefix, namespace) pairs to be added
+        :param status: the status of the prefixes being added
+        :param preferred: as for :meth:`add_prefix`
+        :param expansion_source: as for :meth:`add_prefix`
+        :return:
+        """
+        rows = ((prefix, namespace, status) for prefix, namespace in expansions)
+        self._add_all(rows, preferred, expansion_source)
+
+    def _add_all(
+        self,
+        rows: Iterable[Tuple[PREFIX, NAMESPACE, StatusType]],
+        preferred: bool,
+        expansion_source: Optional[str],
+    ):
+        """
+        Classifies and appends expansions, keeping the index up to date.
+
+        This is the implementation of :meth:`add_prefix`, :meth:`add_prefixes` and
+        :meth:`combine`, written as one loop with the index updates inlined, since it runs
+        for every row of every merged context.
+        """
+        self._before_write()
+        index = self._expansion_index()
         # TODO: check status
-        _prefix = prefix
+        upper = lower = False
         if not preferred:
-            if self.upper:
+            upper = self.upper
+            lower = self.lower
+        name = self.name
+        append = self.prefix_expansions.append
+        by_prefix = index.by_prefix
+        by_namespace = index.by_namespace
+        by_prefix_lower = index.by_prefix_lower
+        by_namespace_lower = index.by_namespace_lower
+        prefix_alias = StatusType.prefix_alias
+        namespace_alias = StatusType.namespace_alias
+        for prefix, namespace, status in rows:
+            if upper:
                 prefix = prefix.upper()
-                if self.lower:
+                if lower:
                     raise ValueError("Cannot set both upper AND lower")
-            if self.lower:
+            if lower:
                 prefix = prefix.lower()
-        prefixes = self.prefixes(lower=True, force=force, as_list=False)
-        namespaces = self.namespaces(lower=True, force=force, as_list=False)
-        if prefix.lower() in prefixes:
-            if namespace.lower() in namespaces:
-                return
-                # status = StatusType.multi_alias
-            else:
-                status = StatusType.prefix_alias
+            prefix_key = prefix.lower()
+            namespace_key = namespace.lower()
+            if prefix_key in by_prefix_lower:
+                if namespace_key in by_namespace_lower:
+                    continue
+                    # status = StatusType.multi_alias
+                status = prefix_alias
+            elif namespace_key in by_namespace_lower:
+                status = namespace_alias
+            pe = PrefixExpansion(name, prefix, namespace, status, expansion_source)
+            append(pe)
+            # as _ExpansionIndex.add
+            by_prefix.setdefault(prefix, []).append(pe)
+            by_namespace.setdefault(namespace, []).append(pe)
+            by_prefix_lower.setdefault(prefix_key, []).append(pe)
+            by_namespace_lower.setdefault(namespace_key, []).append(pe)
+            index.size += 1
+
+    def _share(self) -> "Context":
+        """
+        Get a copy of this context that uses its index and cached views until modified.
+
+        The copy has its own list of expansions, so modifying it leaves this context (and
+        its views) unchanged. This context must not be modified while shared.
+
+        :return:
+        """
+        shared = copy(self)
+        shared.prefix_expansions = list(self.prefix_expansions)
+        shared._index = shared._views = None
+        if self._origin is None:
+            shared._origin = self
+        return shared
+
+    def _shared_origin(self) -> Optional["Context"]:
+        """Get the context whose index and views are used by this one, if any."""
+        origin = self._origin
+        if origin is not None and len(origin.prefix_expansions) != len(self.prefix_expansions):
+            # expansions were appended to the list directly
+            origin = self._origin = None
+        return origin
+
+    def reindex(self) -> None:
+        """
+        Rebuilds the indexes and cached views (the prefix maps, the converter) on next use.
+
+        Adding prefixes, appending to :attr:`prefix_expansions` and assigning it keep them
+        up to date. Call this after changing expansions in place, e.g. replacing an element
+        of the list or setting the status of an expansion.
+
+        :return:
+        """
+        self._drop_index()
+
+    def _drop_index(self) -> None:
+        """Drop the index and views, rebuilding them from the expansions on next use."""
+        self.__dict__.update(_index=None, _views=None, _origin=None)
+
+    def _before_write(self) -> None:
+        """
+        Called before the expansions are modified; read-only contexts raise ValueError.
+
+        :return:
+        """
+        self._origin = None
+
+    def _expansion_index(self) -> _ExpansionIndex:
+        """
+        Get the hash indexes over the prefix expansions, bringing them up to date.
+
+        Expansions added through :meth:`add_prefix` are indexed as they are added, and
+        expansions appended directly to :attr:`prefix_expansions` on the next call.
+        Assigning a new list rebuilds the index, and so does a list that shrank; any other
+        direct modification of the expansions requires a call to :meth:`reindex`.
+
+        :return:
+        """
+        origin = self._shared_origin()
+        if origin is not None:
+            return origin._expansion_index()
+        index = self._index
+        expansions = self.prefix_expansions
+        if index is None or index.size > len(expansions):
+            index = self._index = _ExpansionIndex()
+        if index.size < len(expansions):
+            index.update(expansions)
+        return index
+
+    def _canonical_views(self) -> _Views:
+        """
+        Get the cached views of the canonical expansions, bringing them up to date.
+
+        :return:
+        """
+        origin = self._shared_origin()
+        if origin is not None:
+            return origin._canonical_views()
+        index = self._expansion_index()
+        views = self._views
+        if views is None or views.index is not index:
+            views = self._views = _Views(index)
+        if views.size != index.size:
+            views.update(self.prefix_expansions)
+        return views
+
+    def get_by_prefix(
+        self, prefix: PREFIX, case_insensitive: bool = False
+    ) -> List[PrefixExpansion]:
+        """
+        Returns all expansions for a prefix, in constant time.
+
+        :param prefix:
+        :param case_insensitive: if True, match prefixes ignoring case
+        :return:
+        """
+        index = self._expansion_index()
+        if case_insensitive:
+            return list(index.by_prefix_lower.get(prefix.lower(), ()))
+        return list(index.by_prefix.get(prefix, ()))
+
+    def get_by_namespace(
+        self, namespace: NAMESPACE, case_insensitive: bool = False
+    ) -> List[PrefixExpansion]:
+        """
+        Returns all expansions for a namespace, in constant time.
+
+        :param namespace:
+        :param case_insensitive: if True, match namespaces ignoring case
+        :return:
+        """
+        index = self._expansion_index()
+        if case_insensitive:
+            return list(index.by_namespace_lower.get(namespace.lower(), ()))
+        return list(index.by_namespace.get(namespace, ()))
+
+    def _rows(self) -> Iterable[Tuple[PREFIX, NAMESPACE, StatusType]]:
+        """
+        Get the (prefix, namespace, status) of each expansion, from which the resolver and
+        the extended prefix map are built.
+
+        :return:
+        """
+        return ((pe.prefix, pe.namespace, pe.status) for pe in self.prefix_expansions)
+
+    def _resolver(self) -> _Resolver:
+        views = self._canonical_views()
+        if views.resolver is None:
+            views.resolver = _Resolver(self._rows())
+        return views.resolver
+
+    def resolve_prefix(
+        self, prefix: PREFIX, case_insensitive: bool = True
+    ) -> Optional[PrefixExpansion]:
+        """
+        Returns the canonical expansion for a prefix, in constant time.
+
+        Prefixes of aliases resolve to the canonical expansion of their namespace, e.g.
+        a prefix synonym to the canonical expansion of the same namespace.
+
+        The lookup index is built on first use, and cached on the context until prefixes
+        are added.
+
+        :param prefix:
+        :param case_insensitive: if True (default), match prefixes ignoring case,
+            e.g. ``go`` resolves to the expansion of ``GO``
+        :return: None if the prefix is not in the context
+        """
+        resolver = self._resolver()
+        if case_insensitive:
+            row = resolver.by_prefix_lower.get(prefix.lower())
         else:
-            if namespace.lower() in namespaces:
-                status = StatusType.namespace_alias
+            row = resolver.by_prefix.get(prefix)
+        return None if row is None else self.prefix_expansions[row]
 
-        self.prefix_expansions.append(
-            PrefixExpansion(
-                context=self.name,
-                prefix=prefix,
-                namespace=namespace,
-                status=status,
-                expansion_source=expansion_source,
-            )
-        )
-        self._prefixes.add(_prefix)
-        self._prefixes_lower.add(prefix.lower())
-        self._namespaces.add(namespace)
-        self._namespaces_lower.add(namespace.lower())
+    def resolve_namespace(
+        self, namespace: NAMESPACE, normalize: bool = True
+    ) -> Optional[PrefixExpansion]:
+        """
+        Returns the canonical expansion for a namespace, in constant time.
+
+        Namespaces of prefix aliases resolve to the canonical expansion of their prefix.
 
-    def filter(self, prefix: PREFIX = None, namespace: NAMESPACE = None):
+        :param namespace:
+        :param normalize: if True (default), match namespaces ignoring case, the scheme
+            (http or https) and a trailing slash
+        :return: None if the namespace is not in the context
+        """
+        resolver = self._resolver()
+        if normalize:
+            row = resolver.by_namespace_key.get(_namespace_key(namespace))
+        else:
+            row = resolver.by_namespace.get(namespace)
+        return None if row is None else self.prefix_expansions[row]
+
+    def filter(
+        self, prefix: PREFIX = None, namespace: NAMESPACE = None, use_index: bool = True
+    ) -> List[PrefixExpansion]:
         """
         Returns namespaces matching query.
 
         :param prefix:
         :param namespace:
+        :param use_index: if True (default), use the hash indexes; otherwise scan
+            all expansions
         :return:
         """
+        if use_index and (prefix is not None or namespace is not None):
+            if prefix is not None:
+                candidates = self.get_by_prefix(prefix)
+            else:
+                candidates = self.get_by_namespace(namespace)
+            if prefix is not None and namespace is not None:
+                candidates = [pe for pe in candidates if pe.namespace == namespace]
+            return candidates
         filtered_pes = []
         for pe in self.prefix_expansions:
             if prefix is not None and prefix != pe.prefix:
@@ -248,55 +787,47 @@ class Context:
 
     def prefixes(
         self, lower=False, force: bool = True, as_list: bool = True
-    ) -> Union[List[str], Set[str]]:
+    ) -> Union[List[str], AbstractSet[str]]:
         """
         All unique prefixes in all prefix expansions.
 
         :param lower: if True, the prefix is normalized to lowercase.
-        :param force: if True, recompute. if False, return cached
-        :param as_list: if True (default), return as a list. Otherwise a set
+        :param force: if True (default), rebuild the indexes from the expansions, picking up
+            changes made to them in place. if False, use the indexes kept up to date as
+            expansions are added
+        :param as_list: if True (default), return as a list. Otherwise a read-only set view
         :return:
         """
-        if lower:
-            if force or len(self._prefixes_lower) == 0:
-                self._prefixes_lower = {pe.prefix.lower() for pe in self.prefix_expansions}
-            res = self._prefixes_lower
-
-        else:
-            if force or len(self._prefixes) == 0:
-                self._prefixes = {pe.prefix for pe in self.prefix_expansions}
-            res = self._prefixes
-
+        if force:
+            self.reindex()
+        index = self._expansion_index()
+        res = index.by_prefix_lower if lower else index.by_prefix
         if as_list:
             return list(res)
         else:
-            return res
+            return res.keys()
 
     def namespaces(
         self, lower=False, force: bool = True, as_list: bool = True
-    ) -> Union[List[str], Set[str]]:
+    ) -> Union[List[str], AbstractSet[str]]:
         """
         All unique namespaces in all prefix expansions
 
         :param lower: if True, the namespace is normalized to lowercase.
-        :param force: if True, recompute. if False, return cached
-        :param as_list: if True (default), return as a list. Otherwise a set
+        :param force: if True (default), rebuild the indexes from the expansions, picking up
+            changes made to them in place. if False, use the indexes kept up to date as
+            expansions are added
+        :param as_list: if True (default), return as a list. Otherwise a read-only set view
         :return:
         """
-        if lower:
-            if force or len(self._namespaces_lower) == 0:
-                self._namespaces_lower = {pe.namespace.lower() for pe in self.prefix_expansions}
-            res = self._namespaces_lower
-
-        else:
-            if force or len(self._namespaces) == 0:
-                self._namespaces = {pe.namespace for pe in self.prefix_expansions}
-            res = self._namespaces
-
+        if force:
+            self.reindex()
+        index = self._expansion_index()
+        res = index.by_namespace_lower if lower else index.by_namespace
         if as_list:
             return list(res)
         else:
-            return res
+            return res.keys()
 
     def as_dict(self) -> PREFIX_EXPANSION_DICT:
         """
@@ -305,19 +836,26 @@ class Context:
         This only includes canonical expansions. The results can be safely used
         in the header of RDF syntax documents.
 
+        The mapping is cached on the context and kept up to date as prefixes are added, and
+        rebuilt when :attr:`prefix_expansions` is assigned; after changing expansions in
+        place, call :meth:`reindex`. Each call returns a copy of the mapping, which takes
+        time linear in its size.
+
         :return: Mappings between prefixes and namespaces
         """
-        return {pe.prefix: pe.namespace for pe in self.prefix_expansions if pe.canonical()}
+        return dict(self._canonical_views().prefix_map)
 
     def as_inverted_dict(self) -> INVERSE_PREFIX_EXPANSION_DICT:
         """
         Returns a mapping between canonical expansions and prefixes.
 
+        Like :meth:`as_dict`, this is a copy of a mapping cached on the context.
+
         :return: Mapping between namespaces and prefixes
         """
-        return {pe.namespace: pe.prefix for pe in self.prefix_expansions if pe.canonical()}
+        return dict(self._canonical_views().inverse_map)
 
-    def as_extended_prefix_map(self) -> List[curies.Record]:
+    def as_extended_prefix_map(self) -> List["curies.Record"]:
         """Return an extended prefix, appropriate for generating a :class:`curies.Converter`.
 
         An extended prefix map is a collection of dictionaries, each of which has the following
@@ -335,36 +873,40 @@ class Context:
         Extended prefix maps have the benefit over regular prefix maps in that they keep extra
         information. An extended prefix map can be readily collapsed into a normal prefix map
         by getting the ``prefix`` and ``uri_prefix`` fields.
+
+        The records are cached on the context until the expansions change (as for
+        :meth:`as_dict`), and are shared between calls; they must not be modified.
         """
+        views = self._canonical_views()
+        if views.extended is None:
+            views.extended = self._extended_prefix_map()
+        return list(views.extended)
+
+    def _extended_prefix_map(self) -> List["curies.Record"]:
+        import curies
+
+        rows = list(self._rows())
         prefix_map, reverse_prefix_map = {}, {}
-        for expansion in self.prefix_expansions:
-            if expansion.canonical():
-                reverse_prefix_map[expansion.namespace] = expansion.prefix
-                prefix_map[expansion.prefix] = expansion.namespace
+        for prefix, namespace, status in rows:
+            if status == StatusType.canonical:
+                reverse_prefix_map[namespace] = prefix
+                prefix_map[prefix] = namespace
 
         uri_prefix_synonyms = defaultdict(set)
-        for expansion in self.prefix_expansions:
-            if expansion.status == StatusType.prefix_alias:
-                uri_prefix_synonyms[expansion.prefix].add(expansion.namespace)
+        for prefix, namespace, status in rows:
+            if status == StatusType.prefix_alias:
+                uri_prefix_synonyms[prefix].add(namespace)
 
         prefix_synonyms = defaultdict(set)
-        for expansion in self.prefix_expansions:
-            if (
-                expansion.status == StatusType.namespace_alias
-                and expansion.namespace in reverse_prefix_map
-            ):
-                prefix_synonyms[reverse_prefix_map[expansion.namespace]].add(expansion.prefix)
-            elif (
-                expansion.status == StatusType.namespace_alias
-                and expansion.namespace not in reverse_prefix_map
-            ):
+        for prefix, namespace, status in rows:
+            if status == StatusType.namespace_alias and namespace in reverse_prefix_map:
+                prefix_synonyms[reverse_prefix_map[namespace]].add(prefix)
+            elif status == StatusType.namespace_alias and namespace not in reverse_prefix_map:
                 # this is too noisy, we need a logger here instead
                 # warnings.warn(
-                #    f"namespace alias {expansion.namespace} => {expansion.prefix} is not a canonical namespace"
+                #    f"namespace alias {namespace} => {prefix} is not a canonical namespace"
                 # )
-                logger.info(
-                    f"namespace alias {expansion.namespace} => {expansion.prefix} is not a canonical expansion"
-                )
+                logger.info(f"namespace alias {namespace} => {prefix} is not a canonical expansion")
 
         return [
             curies.Record(
@@ -376,27 +918,128 @@ class Context:
             for prefix, uri_prefix in sorted(prefix_map.items())
         ]
 
-    def as_converter(self) -> curies.Converter:
+    def as_converter(self) -> "curies.Converter":
         """
         Get a converter from this prefix map.
 
+        The converter is cached on the context until the expansions change (as for
+        :meth:`as_dict`), and is shared between calls; it must not be modified.
+
+        :return:
+        """
+        views = self._canonical_views()
+        if views.converter is None:
+            views.converter = _converter(self.as_extended_prefix_map())
+        return views.converter
+
+    def diff(self, other: "Context") -> ContextDiff:
+        """
+        Compares this context with another version of it, in linear time.
+
+        :param other: the new version
+        :return: the changes that turn this context into the other
+        """
+        added = []
+        changed = []
+        for pe in other.prefix_expansions:
+            old = self._find(pe.prefix, pe.namespace)
+            if old is None:
+                added.append(pe)
+            elif old.status != pe.status or old.expansion_source != pe.expansion_source:
+                changed.append((old, pe))
+        removed = [
+            pe for pe in self.prefix_expansions if other._find(pe.prefix, pe.namespace) is None
+        ]
+        return ContextDiff(added, removed, changed)
+
+    def _find(self, prefix: PREFIX, namespace: NAMESPACE) -> Optional[PrefixExpansion]:
+        """Get the expansion with a prefix and namespace, as :meth:`_ExpansionIndex.find`."""
+        return self._expansion_index().find(prefix, namespace)
+
+    def apply_diff(self, diff: ContextDiff) -> None:
+        """
+        Patches this context with the changes computed by :meth:`diff`.
+
+        The context ends up with the same expansions as the version the diff was computed
+        against: expansions keep their order, and added expansions are appended. The
+        indexes, the prefix map and its inverse are patched in place, and the extended
+        prefix map and the converter, if they were cached, are rebuilt from the patched
+        expansions.
+
+        Patching in place is not thread-safe: the context must not be used by other
+        threads until this returns. To pick up new versions of contexts while serving
+        requests, use :class:`prefixmaps.io.watch.ContextWatcher`, which replaces cached
+        contexts with fully loaded new ones.
+
+        Read-only contexts raise ValueError, and so does a diff that was not computed
+        against this context; either way the context is left unchanged.
+
+        :param diff: changes computed by :meth:`diff` against this context
         :return:
         """
-        extended_prefix_map = self.as_extended_prefix_map()
-        return curies.Converter.from_extended_prefix_map(extended_prefix_map)
+        self._before_write()
+        views = self._canonical_views()
+        index = views.index
+        replacements = []
+        for pe, new in [(pe, None) for pe in diff.removed] + diff.changed:
+            current = index.find(pe.prefix, pe.namespace)
+            if current is None:
+                raise ValueError(
+                    f"Cannot apply diff: {pe.prefix} {pe.namespace} not in {self.name}"
+                )
+            replacements.append((current, new))
+        for pe in diff.added:
+            if index.find(pe.prefix, pe.namespace) is not None:
+                raise ValueError(
+                    f"Cannot apply diff: {pe.prefix} {pe.namespace} already in {self.name}"
+                )
+        prefix_map = views.prefix_map
+        inverse_map = views.inverse_map
+        replaced = {}
+        for pe, new in replacements:
+            index.replace(pe, new)
+            replaced[id(pe)] = new
+            if pe.canonical():
+                del prefix_map[pe.prefix]
+                del inverse_map[pe.namespace]
+        expansions = [replaced.get(id(pe), pe) for pe in self.prefix_expansions]
+        expansions = [pe for pe in expansions if pe is not None] + diff.added
+        for pe in diff.added:
+            index.add(pe)
+        for pe in [new for _, new in diff.changed] + diff.added:
+            if pe.canonical():
+                prefix_map[pe.prefix] = pe.namespace
+                inverse_map[pe.namespace] = pe.prefix
+        self.prefix_expansions[:] = expansions
+        index.size = views.size = len(expansions)
+        rebuild_converter = views.converter is not None
+        views.extended = views.converter = views.resolver = None
+        if rebuild_converter:
+            self.as_converter()
 
     def validate(self, canonical_only=True) -> List[str]:
         """
         Validates each prefix expansion in the context.
 
         :param canonical_only:
-        :return:
+        :return: messages, as from :meth:`PrefixExpansion.validate`
         """
-        messages = []
-        for pe in self.prefix_expansions:
-            if canonical_only and not pe.canonical():
-                continue
-            messages += pe.validate()
-        # namespaces = self.namespaces(lower=True)
-        # prefixes = self.namespaces(lower=True)
-        return messages
+        return [issue.message for issue in self.validation_issues(canonical_only)]
+
+    def validation_issues(
+        self, canonical_only: bool = True, jobs: int = 1
+    ) -> List["ValidationIssue"]:
+        """
+        Validates the prefix expansions in the context, checking each distinct prefix
+        and namespace once.
+
+        :param canonical_only: if True, only validate canonical expansions
+        :param jobs: number of worker processes, used only for very large contexts
+        :return: issues, in the order of the expansions
+        """
+        from prefixmaps.datamodel.validation import validate_expansions
+
+        expansions = self.prefix_expansions
+        if canonical_only:
+            expansions = [pe for pe in expansions if pe.canonical()]
+        return validate_expansions(expansions, jobs=jobs)
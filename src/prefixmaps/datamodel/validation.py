@@ -0,0 +1,130 @@
+"""
+Batch validation of prefix expansions.
+
+Rather than matching each expansion against :data:`PREFIX_RE` and :data:`NAMESPACE_RE`
+(see :meth:`PrefixExpansion.validate`), each distinct prefix and namespace is matched
+once, and the expansions with invalid values are then reported as
+:class:`ValidationIssue` records.
+"""
+
+import multiprocessing
+from typing import Dict, Iterable, List, NamedTuple, Pattern, Sequence, Set
+
+from prefixmaps.datamodel.context import (
+    CONTEXT,
+    NAMESPACE,
+    NAMESPACE_RE,
+    PREFIX,
+    PREFIX_RE,
+    Context,
+    PrefixExpansion,
+)
+
+__all__ = [
+    "ValidationIssue",
+    "invalid_values",
+    "validate_expansions",
+    "validate_contexts",
+]
+
+PARALLEL_MIN_VALUES = 50000
+"""Minimum number of distinct values to match in worker processes, when requested."""
+
+
+class ValidationIssue(NamedTuple):
+    """An expansion whose prefix or namespace is invalid."""
+
+    context: CONTEXT
+    prefix: PREFIX
+    namespace: NAMESPACE
+    field: str
+    """The invalid field, "prefix" or "namespace"."""
+
+    @property
+    def message(self) -> str:
+        """The message reported for the issue by :meth:`PrefixExpansion.validate`."""
+        if self.field == "prefix":
+            return f"prefix {self.prefix} does not match {PREFIX_RE}"
+        return f"namespace {self.namespace} does not match {NAMESPACE_RE} (prefix: {self.prefix})"
+
+
+def _invalid(values: Iterable[str], pattern: Pattern) -> Set[str]:
+    match = pattern.match
+    return {value for value in values if not match(value)}
+
+
+def invalid_values(values: Iterable[str], pattern: Pattern, jobs: int = 1) -> Set[str]:
+    """
+    Get the values that do not match a pattern, matching each distinct value once.
+
+    :param values:
+    :param pattern:
+    :param jobs: number of worker processes, used only for many distinct values
+    :return:
+    """
+    distinct = list(set(values))
+    if jobs <= 1 or len(distinct) < PARALLEL_MIN_VALUES:
+        return _invalid(distinct, pattern)
+    size = -(-len(distinct) // jobs)
+    chunks = [(distinct[i : i + size], pattern) for i in range(0, len(distinct), size)]
+    with multiprocessing.Pool(jobs) as pool:
+        return set().union(*pool.starmap(_invalid, chunks))
+
+
+def validate_expansions(
+    expansions: Sequence[PrefixExpansion], jobs: int = 1
+) -> List[ValidationIssue]:
+    """
+    Validates the prefixes and namespaces of expansions.
+
+    :param expansions:
+    :param jobs: number of worker processes, used only for many distinct values
+    :return: issues, in the order of the expansions, prefix before namespace
+    """
+    invalid_prefixes = invalid_values((pe.prefix for pe in expansions), PREFIX_RE, jobs)
+    invalid_namespaces = invalid_values((pe.namespace for pe in expansions), NAMESPACE_RE, jobs)
+    return _issues(expansions, invalid_prefixes, invalid_namespaces)
+
+
+def validate_contexts(
+    contexts: Iterable[Context], canonical_only: bool = True, jobs: int = 1
+) -> Dict[CONTEXT, List[ValidationIssue]]:
+    """
+    Validates several contexts, matching each distinct prefix and namespace once
+    across all of them.
+
+    Contexts often share most of their expansions, e.g. merged contexts and their
+    components, so this is cheaper than validating each context.
+
+    :param contexts:
+    :param canonical_only: if True, only validate canonical expansions
+    :param jobs: number of worker processes, used only for many distinct values
+    :return: issues for each context, keyed by name
+    """
+    selected = {}
+    for context in contexts:
+        expansions = context.prefix_expansions
+        if canonical_only:
+            expansions = [pe for pe in expansions if pe.canonical()]
+        selected[context.name] = expansions
+    all_expansions = [pe for expansions in selected.values() for pe in expansions]
+    invalid_prefixes = invalid_values((pe.prefix for pe in all_expansions), PREFIX_RE, jobs)
+    invalid_namespaces = invalid_values((pe.namespace for pe in all_expansions), NAMESPACE_RE, jobs)
+    return {
+        name: _issues(expansions, invalid_prefixes, invalid_namespaces)
+        for name, expansions in selected.items()
+    }
+
+
+def _issues(
+    expansions: Sequence[PrefixExpansion], invalid_prefixes: Set[str], invalid_namespaces: Set[str]
+) -> List[ValidationIssue]:
+    if not invalid_prefixes and not invalid_namespaces:
+        return []
+    issues = []
+    for pe in expansions:
+        if pe.prefix in invalid_prefixes:
+            issues.append(ValidationIssue(pe.context, pe.prefix, pe.namespace, "prefix"))
+        if pe.namespace in invalid_namespaces:
+            issues.append(ValidationIssue(pe.context, pe.prefix, pe.namespace, "namespace"))
+    return issues
@@ -1,23 +1,62 @@
 """ETL logic for retrieving and normalizing upstream contexts."""
 
+import asyncio
+import logging
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Callable, Dict, Mapping, Union
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Collection,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Union,
+)
 
 import click
 
-from prefixmaps.data import data_path
+from prefixmaps.data import COMBINED, canonical_combined, data_path
 from prefixmaps.datamodel.context import CONTEXT, Context
+from prefixmaps.ingest.fetch import AsyncTransport, run_in_thread
+from prefixmaps.ingest.ingest_bioportal import CURATED_PATH as BIOPORTAL_CURATED_PATH
 from prefixmaps.ingest.ingest_bioportal import from_bioportal_file
 from prefixmaps.ingest.ingest_bioregistry import (
     from_bioregistry,
     from_bioregistry_upper,
 )
-from prefixmaps.ingest.ingest_go import parse_go_xrefs_from_remote
-from prefixmaps.ingest.ingest_jsonld import from_prefixcc
-from prefixmaps.ingest.ingest_linkml import from_semweb_curated
-from prefixmaps.ingest.ingest_shacl import from_obo
-from prefixmaps.ingest.ingest_w3id import from_w3id
-from prefixmaps.io.writer import context_to_file
+from prefixmaps.ingest.ingest_go import URL as GO_URL
+from prefixmaps.ingest.ingest_go import (
+    aparse_go_xrefs_from_remote,
+    parse_go_xrefs_from_remote,
+)
+from prefixmaps.ingest.ingest_jsonld import PREFIXCC_URL, afrom_prefixcc, from_prefixcc
+from prefixmaps.ingest.ingest_linkml import SEMWEB_CURATED_PATH, from_semweb_curated
+from prefixmaps.ingest.ingest_shacl import OBO_URL, afrom_obo, from_obo
+from prefixmaps.ingest.ingest_w3id import API_LIST_CALL as W3ID_URL
+from prefixmaps.ingest.ingest_w3id import afrom_w3id, from_w3id
+from prefixmaps.ingest.manifest import (
+    UPSTREAM,
+    Manifest,
+    ManifestEntry,
+    file_input,
+    file_sha256,
+    package_input,
+    url_input,
+)
+from prefixmaps.io.parser import context_from_file
+from prefixmaps.io.snapshot import read_snapshot
+from prefixmaps.io.writer import FORMATS, write_context
 
 # TODO: replace this with introspection from metadata file
 CONTEXTS: Mapping[str, Callable[[], Context]] = {
@@ -32,12 +71,36 @@ CONTEXTS: Mapping[str, Callable[[], Context]] = {
 }
 """Maps the name of a context to the python function that can generate it"""
 
-COMBINED = {
-    "merged": ["obo", "go", "linked_data", "bioregistry.upper", "prefixcc"],
-    "merged.monarch": ["obo", "go", "linked_data", "bioregistry.upper", "prefixcc"],
-    "merged.oak": ["obo", "go", "linked_data", "bioregistry.upper", "prefixcc"],
+ASYNC_CONTEXTS: Mapping[str, Callable[[Optional[AsyncTransport]], Awaitable[Context]]] = {
+    "obo": afrom_obo,
+    "go": aparse_go_xrefs_from_remote,
+    "prefixcc": afrom_prefixcc,
+    "w3id": afrom_w3id,
+}
+"""Coroutine functions generating the contexts that are fetched over HTTP, taking a
+transport (see :func:`prefixmaps.ingest.fetch.afetch`). Other contexts are generated
+in a worker thread."""
+
+SOURCE_INPUTS: Mapping[str, Callable[[], str]] = {
+    "obo": url_input(OBO_URL),
+    "go": url_input(GO_URL),
+    "linked_data": file_input(SEMWEB_CURATED_PATH),
+    "bioportal": file_input(BIOPORTAL_CURATED_PATH),
+    "bioregistry.upper": package_input("bioregistry"),
+    "bioregistry": package_input("bioregistry"),
+    "prefixcc": url_input(PREFIXCC_URL),
+    "w3id": url_input(W3ID_URL),
 }
-"""Contexts that remix other contexts. Order is significant, with the first listed having highest precedence."""
+"""Maps the name of a source to a function fingerprinting its upstream data.
+Sources without an entry are rebuilt on every run."""
+
+DEFAULT_FORMATS = ("csv", "snapshot")
+"""Formats the ETL writes each context in."""
+
+CPU_BOUND = {"bioregistry", "bioregistry.upper"}
+"""Sources whose loading is CPU bound, and which share upstream data."""
+
+logger = logging.getLogger(__name__)
 
 
 def load_context_from_source(context: CONTEXT) -> Context:
@@ -63,36 +126,319 @@ def load_context_from_source(context: CONTEXT) -> Context:
         raise ValueError(f"No such context: {context}")
 
 
-def run_etl(output_directory: Union[str, Path]) -> None:
+async def aload_context_from_source(
+    context: CONTEXT, transport: Optional[AsyncTransport] = None
+) -> Context:
+    """
+    Loads a context from upstream source, without blocking the event loop.
+
+    As :func:`load_context_from_source`; the sources of a combined context are
+    loaded concurrently, and combined in order of precedence.
+
+    :param context: unique handle of the context
+    :param transport: see :func:`prefixmaps.ingest.fetch.afetch`
+    :return:
+    """
+    if context in ASYNC_CONTEXTS:
+        return await ASYNC_CONTEXTS[context](transport)
+    elif context in CONTEXTS:
+        return await run_in_thread(CONTEXTS[context])
+    elif context in COMBINED:
+        components = await asyncio.gather(
+            *(aload_context_from_source(v, transport) for v in COMBINED[context])
+        )
+        ctxt = Context(context)
+        for component in components:
+            ctxt.combine(component)
+        return ctxt
+    else:
+        raise ValueError(f"No such context: {context}")
+
+
+_IF_CHANGED = "if changed by rebuilding "
+"""Reason for rebuilding a merged context only if its rebuilt components change."""
+
+
+class _Result(NamedTuple):
+    """The result of a stage of the pipeline for one context."""
+
+    stage: str
+    name: CONTEXT
+    seconds: float
+    value: Any = None
+    """The context for "fetch" and "merge", the hash of the CSV for "write",
+    and the upstream fingerprint for "check"."""
+
+
+def _check_source(name: CONTEXT) -> _Result:
+    start = time.perf_counter()
+    fingerprint = SOURCE_INPUTS[name]() if name in SOURCE_INPUTS else None
+    return _Result("check", name, time.perf_counter() - start, fingerprint)
+
+
+def _load_sources(names: List[CONTEXT]) -> List[_Result]:
+    """
+    Loads source contexts from upstream, one after another, timing each.
+
+    :param names:
+    :return:
+    """
+    results = []
+    for name in names:
+        start = time.perf_counter()
+        context = CONTEXTS[name]()
+        results.append(_Result("fetch", name, time.perf_counter() - start, context))
+    return results
+
+
+def _read_output(name: CONTEXT, output_directory: Path) -> Context:
+    path = output_directory / f"{name}.csv"
+    context = read_snapshot(name, path)
+    if context is None:
+        with path.open(encoding="UTF-8") as file:
+            context = context_from_file(name, file)
+    if context.prefix_expansions:
+        # named as when loaded from the source, as merged contexts record it
+        context.name = context.prefix_expansions[0].context
+    return context
+
+
+def _merge(
+    name: CONTEXT, components: List[Union[Context, CONTEXT]], output_directory: Path
+) -> List[_Result]:
+    """
+    Merges contexts, reading those given by name from the output directory.
+    """
+    start = time.perf_counter()
+    context = Context(name=name)
+    for component in components:
+        if isinstance(component, str):
+            component = _read_output(component, output_directory)
+        context.combine(component)
+    return [_Result("merge", name, time.perf_counter() - start, context)]
+
+
+def _write(
+    name: CONTEXT, context: Context, output_directory: Path, formats: Collection[str]
+) -> List[_Result]:
+    """
+    Writes a context in each format, leaving files with unchanged contents untouched.
+
+    The files are named after the source, which may differ from the name of the context
+    (e.g. linked_data is named "linkml").
+    """
+    start = time.perf_counter()
+    paths = write_context(
+        context,
+        output_directory,
+        name,
+        formats,
+        include_expansion_source=context.name in COMBINED,
+    )
+    sha256 = file_sha256(paths["csv"])
+    return [_Result("write", name, time.perf_counter() - start, sha256)]
+
+
+def _plan(
+    output_directory: Path,
+    manifest: Manifest,
+    fingerprints: Mapping[CONTEXT, Optional[str]],
+    force: bool,
+    formats: Collection[str],
+) -> Dict[CONTEXT, str]:
+    hashes = {name: file_sha256(output_directory / f"{name}.csv") for name in _all_contexts()}
+    plan = {}
+    for name in _all_contexts():
+        entry = manifest.entries.get(name)
+        if force:
+            plan[name] = "forced"
+        elif entry is None or hashes[name] is None:
+            plan[name] = "new"
+        elif hashes[name] != entry.sha256:
+            plan[name] = "output modified"
+        elif not all((output_directory / f"{name}{FORMATS[f]}").exists() for f in formats):
+            plan[name] = "output missing"
+        elif name in CONTEXTS:
+            if fingerprints.get(name) is None:
+                plan[name] = "upstream cannot be fingerprinted"
+            elif entry.inputs != {UPSTREAM: fingerprints[name]}:
+                plan[name] = "upstream changed"
+        elif entry.inputs != {component: hashes[component] for component in COMBINED[name]}:
+            plan[name] = "components modified"
+        else:
+            changed = [component for component in COMBINED[name] if component in plan]
+            if changed:
+                plan[name] = _IF_CHANGED + ", ".join(changed)
+    return plan
+
+
+def _all_contexts() -> List[CONTEXT]:
+    """
+    Get the names of all contexts to build, checking that merged contexts only merge known
+    contexts.
+
+    Merged contexts with the same components as an earlier one are aliases of it, and are
+    not built; see :func:`prefixmaps.data.canonical_combined`.
+    """
+    names = list(CONTEXTS)
+    for merged_name, components in COMBINED.items():
+        unknown = [name for name in components if name not in names]
+        if unknown:
+            raise ValueError(f"Merged context {merged_name} depends on unknown contexts: {unknown}")
+        if canonical_combined(merged_name) == merged_name:
+            names.append(merged_name)
+    return names
+
+
+def _check_sources(
+    threads: ThreadPoolExecutor, timings: Dict[str, float]
+) -> Dict[CONTEXT, Optional[str]]:
+    fingerprints = {}
+    for result in threads.map(_check_source, CONTEXTS):
+        timings[f"{result.stage}:{result.name}"] = result.seconds
+        fingerprints[result.name] = result.value
+    return fingerprints
+
+
+def plan_etl(
+    output_directory: Union[str, Path],
+    max_workers: Optional[int] = None,
+    force: bool = False,
+    formats: Collection[str] = DEFAULT_FORMATS,
+) -> Dict[CONTEXT, str]:
+    """
+    Determines which contexts :func:`run_etl` would rebuild, without rebuilding anything.
+
+    Merged contexts whose components would be rebuilt are included, although they are
+    only rebuilt if the rebuilt components differ.
+
+    :param output_directory:
+    :param max_workers: maximum number of sources checked concurrently
+    :param force: if True, rebuild everything
+    :param formats: formats each context is written in
+    :return: the reason for rebuilding, for each context that would be rebuilt
+    """
+    output_directory = Path(output_directory).resolve()
+    _all_contexts()
+    with ThreadPoolExecutor(max_workers) as threads:
+        fingerprints = _check_sources(threads, {})
+    manifest = Manifest.load(output_directory)
+    return _plan(output_directory, manifest, fingerprints, force, formats)
+
+
+def run_etl(
+    output_directory: Union[str, Path],
+    max_workers: Optional[int] = None,
+    processes: bool = True,
+    force: bool = False,
+    formats: Collection[str] = DEFAULT_FORMATS,
+) -> Dict[str, float]:
     """
     Runs the complete ETL pipeline.
 
-    All contexts are refreshed from upstream sources, and written to the output directory,
-    as CSV.
+    Contexts are refreshed from upstream sources, and written to the output directory,
+    as CSV, by default each accompanied by a precompiled snapshot for fast loading.
+
+    The run is incremental: a manifest in the output directory (see
+    :mod:`prefixmaps.ingest.manifest`) records the upstream data each source was built
+    from, and the CSVs each merged context was built from. Only sources whose
+    upstream data changed are ingested again, and only merged contexts with a changed
+    component are merged again. Files whose contents are unchanged are not rewritten.
+
+    Sources are fetched concurrently in a thread pool, except for the CPU bound
+    sources in :data:`CPU_BOUND`, which are loaded one after another (sharing upstream
+    data), in a separate process if ``processes`` is True. Each merged context is
+    computed as soon as the contexts it combines are available, and each context is
+    written as soon as it is computed.
 
     :param output_directory:
-    :return:
+    :param max_workers: maximum number of threads, defaults to that of :class:`ThreadPoolExecutor`
+    :param processes: if True, load CPU bound sources in a separate process
+    :param force: if True, rebuild every context, regardless of the manifest
+    :param formats: formats to write each context in, see
+        :data:`prefixmaps.io.writer.FORMATS`; must include "csv"
+    :return: seconds spent in each stage, keyed by stage and context name, e.g. "fetch:obo"
     """
+    if "csv" not in formats:
+        raise ValueError(f"The ETL writes CSVs, but formats are {list(formats)}")
     # contexts = load_contexts_meta()
     output_directory = Path(output_directory).resolve()
     output_directory.mkdir(exist_ok=True, parents=True)
+    _all_contexts()
 
-    # Load all individual contexts
-    contexts: Dict[str, Context] = {
-        name: context_getter() for name, context_getter in CONTEXTS.items()
-    }
-
-    # Create merged contexts
-    for merged_name, names in COMBINED.items():
-        context = Context(name=merged_name)
-        contexts[merged_name] = context
-        for name in names:
-            context.combine(contexts[name])
+    manifest = Manifest.load(output_directory)
+    timings: Dict[str, float] = {}
+    try:
+        with ExitStack() as stack:
+            threads = stack.enter_context(ThreadPoolExecutor(max_workers))
+            fingerprints = _check_sources(threads, timings)
+            plan = _plan(output_directory, manifest, fingerprints, force, formats)
+            for name, reason in plan.items():
+                logger.info(f"rebuild {name}: {reason}")
+            inputs = {
+                name: {} if fingerprint is None else {UPSTREAM: fingerprint}
+                for name, fingerprint in fingerprints.items()
+            }
+            hashes = {name: entry.sha256 for name, entry in manifest.entries.items()}
+            settled = {name for name in CONTEXTS if name not in plan}
+            contexts: Dict[CONTEXT, Context] = {}
 
-    # Write all contexts
-    for name, context in contexts.items():
-        with output_directory.joinpath(f"{name}.csv").open("w", encoding="UTF-8") as file:
-            context_to_file(context, file, include_expansion_source=context.name in COMBINED)
+            rebuild = [name for name in CONTEXTS if name in plan]
+            cpu_bound = [name for name in rebuild if name in CPU_BOUND]
+            pending = {
+                threads.submit(_load_sources, [name]) for name in rebuild if name not in CPU_BOUND
+            }
+            if cpu_bound:
+                executor = stack.enter_context(ProcessPoolExecutor(1)) if processes else threads
+                pending.add(executor.submit(_load_sources, cpu_bound))
+            waiting = {name: COMBINED[name] for name in _all_contexts() if name in COMBINED}
+            while True:
+                # merge (or skip) each merged context once its components are final
+                ready = [m for m, names in waiting.items() if all(n in settled for n in names)]
+                for merged_name in ready:
+                    names = waiting.pop(merged_name)
+                    inputs[merged_name] = {name: hashes[name] for name in names}
+                    entry = manifest.entries.get(merged_name)
+                    reason = plan.get(merged_name)
+                    if (
+                        entry is not None
+                        and entry.inputs == inputs[merged_name]
+                        and (reason is None or reason.startswith(_IF_CHANGED))
+                    ):
+                        settled.add(merged_name)
+                    else:
+                        components = [contexts.get(name, name) for name in names]
+                        pending.add(
+                            threads.submit(_merge, merged_name, components, output_directory)
+                        )
+                if ready:
+                    continue
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for result in future.result():
+                        timings[f"{result.stage}:{result.name}"] = result.seconds
+                        logger.info(f"{result.stage} {result.name}: {result.seconds:.2f}s")
+                        if result.stage == "write":
+                            hashes[result.name] = result.value
+                            settled.add(result.name)
+                            manifest.entries[result.name] = ManifestEntry(
+                                result.value, inputs[result.name]
+                            )
+                        else:
+                            contexts[result.name] = result.value
+                            pending.add(
+                                threads.submit(
+                                    _write, result.name, result.value, output_directory, formats
+                                )
+                            )
+    finally:
+        manifest.entries = {
+            name: entry for name, entry in manifest.entries.items() if name in _all_contexts()
+        }
+        manifest.save(output_directory)
+    return timings
 
 
 @click.command
@@ -103,8 +449,46 @@ def run_etl(output_directory: Union[str, Path]) -> None:
     type=Path,
     help="Path to directory where CSVs are stored",
 )
-def cli(output_directory):
-    run_etl(output_directory)
+@click.option(
+    "-j",
+    "--max-workers",
+    type=click.IntRange(min=1),
+    help="Maximum number of sources fetched concurrently",
+)
+@click.option(
+    "--processes/--no-processes",
+    default=True,
+    show_default=True,
+    help="Load CPU bound sources in a separate process",
+)
+@click.option("--force", is_flag=True, help="Rebuild every context, even if unchanged upstream")
+@click.option("--dry-run", is_flag=True, help="Only report which contexts would be rebuilt")
+@click.option(
+    "-f",
+    "--format",
+    "formats",
+    type=click.Choice(list(FORMATS)),
+    multiple=True,
+    default=DEFAULT_FORMATS,
+    show_default=True,
+    help="Formats to write each context in, in addition to CSV",
+)
+def cli(output_directory, max_workers, processes, force, dry_run, formats):
+    formats = {"csv", *formats}
+    if dry_run:
+        plan = plan_etl(output_directory, max_workers=max_workers, force=force, formats=formats)
+        for name, reason in plan.items():
+            click.echo(f"{name}: {reason}")
+        if not plan:
+            click.echo("Nothing to rebuild")
+        return
+    start = time.perf_counter()
+    timings = run_etl(
+        output_directory, max_workers=max_workers, processes=processes, force=force, formats=formats
+    )
+    for stage, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+        click.echo(f"{seconds:8.2f}s  {stage}")
+    click.echo(f"{time.perf_counter() - start:8.2f}s  total")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,378 @@
+"""
+Fetching of upstream sources over HTTP, with an on-disk cache.
+
+All ingests fetch through :func:`fetch`, which shares a pooled session that retries
+transient failures, and keeps every payload in a content-addressed cache (by default
+under ``~/.cache/prefixmaps/http``, see :func:`prefixmaps.io.cache.cache_directory`).
+
+Cached payloads are revalidated with ``If-None-Match`` / ``If-Modified-Since``, so an
+unchanged source is not downloaded again. In offline mode (``offline=True``, or the
+``PREFIXMAPS_OFFLINE`` environment variable set to a non-empty value) no requests are
+made, and cached payloads are replayed.
+
+:func:`afetch` is the asyncio counterpart of :func:`fetch`, sharing the same cache. It
+requests through an :class:`AsyncTransport`, by default one running the pooled session
+in worker threads, so that requests do not block the event loop.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Protocol, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from prefixmaps.io.cache import cache_directory
+
+__all__ = [
+    "OFFLINE_ENV",
+    "Payload",
+    "Response",
+    "AsyncTransport",
+    "ThreadedTransport",
+    "get_session",
+    "get_transport",
+    "fetch",
+    "afetch",
+    "record",
+    "run_in_thread",
+]
+
+OFFLINE_ENV = "PREFIXMAPS_OFFLINE"
+
+TIMEOUT = 60
+"""Seconds to wait for a server to respond."""
+
+RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=("GET", "HEAD"),
+)
+"""Retry policy for transient failures."""
+
+FALLBACK_TO_CACHE = True
+"""If False, failures to fetch are raised even if a cached payload could be used instead."""
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_transport: Optional["AsyncTransport"] = None
+
+T = TypeVar("T")
+
+
+class Payload(NamedTuple):
+    """The body of a fetched source."""
+
+    url: str
+    content: bytes
+    sha256: str
+    """Hex digest of the content, which is also its key in the cache."""
+
+    encoding: Optional[str]
+    source: str
+    """One of "network" (downloaded), "revalidated" (unchanged upstream) or "cache"
+    (replayed without contacting the server)."""
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+def get_session() -> requests.Session:
+    """
+    Get the session shared by all fetches.
+
+    :return:
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=RETRY)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+class Response(NamedTuple):
+    """A response to a request made by an :class:`AsyncTransport`."""
+
+    status_code: int
+    content: bytes
+    encoding: Optional[str]
+    headers: Mapping[str, str]
+
+
+class AsyncTransport(Protocol):
+    """
+    Makes HTTP requests for :func:`afetch`.
+
+    Transports raise :class:`OSError` (e.g. :class:`ConnectionError` or
+    :class:`TimeoutError`) when a server cannot be reached.
+    """
+
+    async def get(self, url: str, headers: Mapping[str, str]) -> Response:
+        """
+        Makes a GET request.
+
+        :param url:
+        :param headers: request headers
+        :return:
+        """
+
+
+class ThreadedTransport:
+    """
+    Requests through a :class:`requests.Session` in a pool of worker threads.
+
+    There are as many threads as connections in the pool of the shared session, so
+    concurrent requests reuse its connections and retry policy.
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None, max_workers: int = 16):
+        self.session = session
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="prefixmaps-fetch")
+
+    def _get(self, url: str, headers: Mapping[str, str]) -> Response:
+        session = self.session or get_session()
+        response = session.get(url, headers=dict(headers), timeout=TIMEOUT)
+        return Response(response.status_code, response.content, response.encoding, response.headers)
+
+    async def get(self, url: str, headers: Mapping[str, str]) -> Response:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._get, url, headers)
+
+
+def get_transport() -> AsyncTransport:
+    """
+    Get the transport shared by all asynchronous fetches.
+
+    :return:
+    """
+    global _transport
+    with _session_lock:
+        if _transport is None:
+            _transport = ThreadedTransport()
+        return _transport
+
+
+async def run_in_thread(func: Callable[..., T], *args: Any) -> T:
+    """
+    Calls a function in a worker thread, e.g. to parse a source without blocking the
+    event loop.
+
+    :param func:
+    :param args:
+    :return: the result of the function
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args))
+
+
+def _is_offline(offline: Optional[bool]) -> bool:
+    if offline is None:
+        return bool(os.environ.get(OFFLINE_ENV))
+    return offline
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+class _Cache:
+    """Payloads under ``objects/``, keyed by content hash, and per-URL metadata under ``urls/``."""
+
+    def __init__(self, directory: Path):
+        self.objects = directory / "objects"
+        self.urls = directory / "urls"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.urls.mkdir(parents=True, exist_ok=True)
+
+    def _meta_path(self, url: str) -> Path:
+        return self.urls / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, url: str) -> Optional[dict]:
+        """Get the metadata of the cached payload for a URL, if its content is present."""
+        try:
+            meta = json.loads(self._meta_path(url).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        if meta.get("url") != url or not (self.objects / meta["sha256"]).exists():
+            return None
+        return meta
+
+    def payload(self, meta: dict, source: str) -> Payload:
+        content = (self.objects / meta["sha256"]).read_bytes()
+        return Payload(meta["url"], content, meta["sha256"], meta.get("encoding"), source)
+
+    def put(
+        self,
+        url: str,
+        content: bytes,
+        encoding: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> dict:
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self.objects / sha256
+        if not path.exists():
+            _write_atomic(path, content)
+        meta = {
+            "url": url,
+            "sha256": sha256,
+            "encoding": encoding,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched": time.time(),
+        }
+        _write_atomic(self._meta_path(url), json.dumps(meta).encode("utf-8"))
+        return meta
+
+
+def _open_cache(cache_dir: Optional[Path]) -> _Cache:
+    return _Cache(Path(cache_dir) if cache_dir else cache_directory("http"))
+
+
+def _replay(cache: _Cache, meta: Optional[dict], url: str) -> Payload:
+    if meta is None:
+        raise ValueError(f"Offline, and {url} is not cached")
+    return cache.payload(meta, "cache")
+
+
+def _conditional_headers(meta: Optional[dict]) -> Dict[str, str]:
+    headers = {}
+    if meta is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def _server_error(status_code: int, url: str) -> requests.HTTPError:
+    return requests.HTTPError(f"{status_code} Server Error for url: {url}")
+
+
+def _unreachable(cache: _Cache, meta: Optional[dict], url: str, error: Exception) -> Payload:
+    if meta is None or not FALLBACK_TO_CACHE:
+        raise error
+    logger.warning(f"Using cached {url}, as it could not be fetched: {error}")
+    return cache.payload(meta, "cache")
+
+
+def _store(
+    cache: _Cache, url: str, content: bytes, encoding: Optional[str], headers: Mapping[str, str]
+) -> Payload:
+    meta = cache.put(url, content, encoding, headers.get("ETag"), headers.get("Last-Modified"))
+    return Payload(url, content, meta["sha256"], meta["encoding"], "network")
+
+
+def fetch(
+    url: str,
+    offline: Optional[bool] = None,
+    cache_dir: Optional[Path] = None,
+    session: Optional[requests.Session] = None,
+) -> Payload:
+    """
+    Fetches a URL through the on-disk cache.
+
+    If the server cannot be reached, or still fails with a server error (5xx) once
+    retries are exhausted, a cached payload is used if there is one (unless
+    :data:`FALLBACK_TO_CACHE` is False).
+
+    :param url:
+    :param offline: if True, only use cached payloads; defaults to the ``PREFIXMAPS_OFFLINE``
+        environment variable
+    :param cache_dir: directory of the cache, defaults to ``http`` in the cache directory
+    :param session: defaults to the shared session
+    :return:
+    """
+    cache = _open_cache(cache_dir)
+    meta = cache.get(url)
+    if _is_offline(offline):
+        return _replay(cache, meta, url)
+    if session is None:
+        session = get_session()
+    try:
+        response = session.get(url, headers=_conditional_headers(meta), timeout=TIMEOUT)
+    except (requests.ConnectionError, requests.Timeout, requests.exceptions.RetryError) as e:
+        # RetryError: retries are exhausted on a status in the retry policy
+        return _unreachable(cache, meta, url, e)
+    if response.status_code == 304 and meta is not None:
+        return cache.payload(meta, "revalidated")
+    if response.status_code >= 500:
+        # a status outside the retry policy, or a session without retries
+        return _unreachable(cache, meta, url, _server_error(response.status_code, url))
+    response.raise_for_status()
+    return _store(cache, url, response.content, response.encoding, response.headers)
+
+
+async def afetch(
+    url: str,
+    offline: Optional[bool] = None,
+    cache_dir: Optional[Path] = None,
+    transport: Optional[AsyncTransport] = None,
+) -> Payload:
+    """
+    Fetches a URL through the on-disk cache, without blocking the event loop.
+
+    As :func:`fetch`, with requests made by a transport.
+
+    :param url:
+    :param offline: if True, only use cached payloads; defaults to the ``PREFIXMAPS_OFFLINE``
+        environment variable
+    :param cache_dir: directory of the cache, defaults to ``http`` in the cache directory
+    :param transport: defaults to the shared transport, see :func:`get_transport`
+    :return:
+    """
+    cache = _open_cache(cache_dir)
+    meta = cache.get(url)
+    if _is_offline(offline):
+        return _replay(cache, meta, url)
+    if transport is None:
+        transport = get_transport()
+    try:
+        response = await transport.get(url, _conditional_headers(meta))
+    except OSError as e:
+        return _unreachable(cache, meta, url, e)
+    if response.status_code == 304 and meta is not None:
+        return cache.payload(meta, "revalidated")
+    if response.status_code >= 500:
+        return _unreachable(cache, meta, url, _server_error(response.status_code, url))
+    if response.status_code >= 400:
+        raise requests.HTTPError(f"{response.status_code} Error for url: {url}")
+    return _store(cache, url, response.content, response.encoding, response.headers)
+
+
+def record(url: str, content: bytes, cache_dir: Optional[Path] = None) -> Payload:
+    """
+    Stores a payload in the cache as if it had been fetched from a URL.
+
+    This allows recorded copies of sources to be replayed offline, e.g. in tests.
+
+    :param url:
+    :param content:
+    :param cache_dir: directory of the cache, defaults to ``http`` in the cache directory
+    :return:
+    """
+    cache = _open_cache(cache_dir)
+    meta = cache.put(url, content)
+    return cache.payload(meta, "cache")
@@ -1,10 +1,12 @@
 """ETL from bioregistry to prefixmaps."""
 
 import logging
+from functools import lru_cache
 
 from tqdm import tqdm
 
 from prefixmaps.datamodel.context import NAMESPACE_RE, Context
+from prefixmaps.datamodel.validation import invalid_values
 
 # Problematic records, look into later
 SKIP = {"gro"}
@@ -13,6 +15,32 @@ SKIP = {"gro"}
 PROBLEMATIC_CURIE_PREFIX_SYNONYMS_RECORDS = {"wikidata"}
 
 
+@lru_cache(maxsize=None)
+def _get_converter(canonical_idorg: bool = True):
+    """
+    Get the bioregistry converter, shared between the bioregistry contexts.
+
+    :param canonical_idorg: use the original/canonical identifiers.org PURLs
+    :return:
+    """
+    import bioregistry
+
+    prefix_priority = [
+        #  "obofoundry.preferred",
+        "preferred",
+        # "obofoundry",
+        "default",
+    ]
+    priority = [
+        "obofoundry",
+        "miriam.legacy" if canonical_idorg else "miriam",
+        "default",
+        "ols",
+        "n2t",
+    ]
+    return bioregistry.get_converter(uri_prefix_priority=priority, prefix_priority=prefix_priority)
+
+
 def from_bioregistry_upper(**kwargs) -> Context:
     """
     As :ref:`from_bioregistry`, with default uppercase normalization on
@@ -54,28 +82,16 @@ def from_bioregistry(upper=False, canonical_idorg=True, filter_dubious=True) ->
     import bioregistry
 
     context = Context("bioregistry", upper=upper)
-    prefix_priority = [
-        #  "obofoundry.preferred",
-        "preferred",
-        # "obofoundry",
-        "default",
-    ]
-    priority = [
-        "obofoundry",
-        "miriam.legacy" if canonical_idorg else "miriam",
-        "default",
-        "ols",
-        "n2t",
-    ]
-    converter = bioregistry.get_converter(
-        uri_prefix_priority=priority, prefix_priority=prefix_priority
-    )
+    converter = _get_converter(canonical_idorg)
+    dubious = set()
+    if filter_dubious:
+        dubious = invalid_values((record.uri_prefix for record in converter.records), NAMESPACE_RE)
     for record in tqdm(converter.records):
         # TODO: auto-set preferred to lowercase for SemWeb collection
         # See https://github.com/linkml/prefixmaps/issues/70
         if record.prefix in SKIP:
             continue
-        if filter_dubious and not NAMESPACE_RE.match(record.uri_prefix):
+        if record.uri_prefix in dubious:
             logging.debug(f"Skipping dubious ns {record.prefix} => {record.uri_prefix}")
             continue
         preferred = record.prefix == bioregistry.get_preferred_prefix(record.prefix)
@@ -1,18 +1,28 @@
 """Ingests the GO prefix registry."""
 
-from typing import TextIO, Union
+from typing import Optional, TextIO, Union
 
-import requests
 import yaml
 
 from prefixmaps.datamodel.context import Context
+from prefixmaps.ingest.fetch import AsyncTransport, afetch, fetch, run_in_thread
 
 URL = "https://raw.githubusercontent.com/geneontology/go-site/master/metadata/db-xrefs.yaml"  # noqa: E501
 
 
 def parse_go_xrefs_from_remote() -> Context:
-    r = requests.get(URL)
-    return parse_go_xrefs(r.text)
+    return parse_go_xrefs(fetch(URL).text)
+
+
+async def aparse_go_xrefs_from_remote(transport: Optional[AsyncTransport] = None) -> Context:
+    """
+    As :func:`parse_go_xrefs_from_remote`, without blocking the event loop.
+
+    :param transport: see :func:`prefixmaps.ingest.fetch.afetch`
+    :return:
+    """
+    payload = await afetch(URL, transport=transport)
+    return await run_in_thread(parse_go_xrefs, payload.text)
 
 
 def parse_go_xrefs(input: Union[str, TextIO]) -> Context:
@@ -3,12 +3,13 @@
 import json
 from typing import Any, Dict, List, Optional, TextIO, Union
 
-import requests
-
 from prefixmaps.datamodel.context import Context
+from prefixmaps.ingest.fetch import AsyncTransport, afetch, fetch, run_in_thread
 
 AT_CONTEXT = "@context"
 
+PREFIXCC_URL = "http://prefix.cc/context.jsonld"
+
 PREFIXCC_EXCLUDE = [
     "bp",
     "terms",
@@ -36,10 +37,31 @@ def from_jsonld_context_url(url: str, name: str, excludes: Optional[List[str]] =
     :param excludes:
     :return:
     """
-    response = requests.get(url=url)
+    payload = fetch(url)
+    if name is None:
+        name = url
+    return from_jsonld_context(payload.json(), name, excludes)
+
+
+async def afrom_jsonld_context_url(
+    url: str,
+    name: str,
+    excludes: Optional[List[str]] = None,
+    transport: Optional[AsyncTransport] = None,
+) -> Context:
+    """
+    Ingests from a remote JSON-LD context, without blocking the event loop.
+
+    :param url:
+    :param name:
+    :param excludes:
+    :param transport: see :func:`prefixmaps.ingest.fetch.afetch`
+    :return:
+    """
+    payload = await afetch(url, transport=transport)
     if name is None:
         name = url
-    return from_jsonld_context(response.json(), name, excludes)
+    return await run_in_thread(from_jsonld_context, payload.json(), name, excludes)
 
 
 def from_jsonld_context_file(
@@ -111,4 +133,14 @@ def from_prefixcc() -> Context:
 
     :return:
     """
-    return from_jsonld_context_url("http://prefix.cc/context.jsonld", "prefixcc", PREFIXCC_EXCLUDE)
+    return from_jsonld_context_url(PREFIXCC_URL, "prefixcc", PREFIXCC_EXCLUDE)
+
+
+async def afrom_prefixcc(transport: Optional[AsyncTransport] = None) -> Context:
+    """
+    As :func:`from_prefixcc`, without blocking the event loop.
+
+    :param transport: see :func:`prefixmaps.ingest.fetch.afetch`
+    :return:
+    """
+    return await afrom_jsonld_context_url(PREFIXCC_URL, "prefixcc", PREFIXCC_EXCLUDE, transport)
@@ -1,16 +1,31 @@
-from typing import Any, Dict, TextIO, Union
-
-import requests
+from typing import Any, Dict, Optional, TextIO, Union
 
 from prefixmaps.data import data_path
 from prefixmaps.datamodel.context import Context
+from prefixmaps.ingest.fetch import AsyncTransport, afetch, fetch, run_in_thread
+
+SEMWEB_CURATED_PATH = str(data_path / "linked_data.curated.yaml")
 
 
 def from_linkml_url(url: str, name: str = None) -> Context:
-    response = requests.get(url=url)
+    import yaml
+
+    payload = fetch(url)
+    if name is None:
+        name = url
+    return from_linkml(yaml.safe_load(payload.text), name)
+
+
+async def afrom_linkml_url(
+    url: str, name: str = None, transport: Optional[AsyncTransport] = None
+) -> Context:
+    import yaml
+
+    payload = await afetch(url, transport=transport)
     if name is None:
         name = url
-    return from_linkml_file(response.text, name)
+    obj = await run_in_thread(yaml.safe_load, payload.text)
+    return from_linkml(obj, name)
 
 
 def from_linkml_file(file: Union[TextIO, str], name: str = None) -> Context:
@@ -39,4 +54,4 @@ def from_semweb_curated() -> Context:
     In future this may migrate upstream.
     :return:
     """
-    return from_linkml_file(str(data_path / "linked_data.curated.yaml"))
+    return from_linkml_file(SEMWEB_CURATED_PATH)
@@ -1,11 +1,21 @@
 """Ingests from triples using the SHACL PrefixDeclarations data model."""
 
-from typing import Any, TextIO, Union
+from typing import Any, Optional, TextIO, Union
 
 import rdflib
 from rdflib import Graph, Literal
+from rdflib.util import guess_format
 
 from prefixmaps.datamodel.context import Context
+from prefixmaps.ingest.fetch import (
+    AsyncTransport,
+    Payload,
+    afetch,
+    fetch,
+    run_in_thread,
+)
+
+OBO_URL = "http://obofoundry.org/registry/obo_prefixes.ttl"
 
 
 def _literal_value(v: Any) -> str:
@@ -23,8 +33,32 @@ def from_shacl_url(url: str, name: str) -> Context:
     :param name:
     :return:
     """
+    return _from_shacl_payload(fetch(url), name)
+
+
+async def afrom_shacl_url(
+    url: str, name: str, transport: Optional[AsyncTransport] = None
+) -> Context:
+    """
+    Creates a context from a remote URL with turtle using SHACL vocabulary,
+    without blocking the event loop
+
+    :param url:
+    :param name:
+    :param transport: see :func:`prefixmaps.ingest.fetch.afetch`
+    :return:
+    """
+    payload = await afetch(url, transport=transport)
+    return await run_in_thread(_from_shacl_payload, payload, name)
+
+
+def _from_shacl_payload(payload: Payload, name: str) -> Context:
     g = Graph()
-    g.parse(url)
+    # bytes, so that rdflib decodes them as the format requires (UTF-8 for turtle), rather
+    # than as the charset defaulted from the response headers
+    g.parse(
+        data=payload.content, format=guess_format(payload.url) or "turtle", publicID=payload.url
+    )
     return from_shacl_graph(g, name)
 
 
@@ -69,4 +103,14 @@ def from_obo() -> Context:
 
     :return:
     """
-    return from_shacl_url("http://obofoundry.org/registry/obo_prefixes.ttl", "obo")
+    return from_shacl_url(OBO_URL, "obo")
+
+
+async def afrom_obo(transport: Optional[AsyncTransport] = None) -> Context:
+    """
+    As :func:`from_obo`, without blocking the event loop.
+
+    :param transport: see :func:`prefixmaps.ingest.fetch.afetch`
+    :return:
+    """
+    return await afrom_shacl_url(OBO_URL, "obo", transport)
@@ -1,6 +1,9 @@
 """ETL from w3id to prefixmaps."""
 
+from typing import Any, Dict, Optional
+
 from prefixmaps.datamodel.context import Context
+from prefixmaps.ingest.fetch import AsyncTransport, afetch, fetch
 
 API_LIST_CALL = "https://api.github.com/repos/perma-id/w3id.org/git/trees/master"
 
@@ -11,16 +14,25 @@ def from_w3id() -> Context:
 
     :return:
     """
-    import requests
+    return _from_tree(fetch(API_LIST_CALL).json())
+
+
+async def afrom_w3id(transport: Optional[AsyncTransport] = None) -> Context:
+    """
+    As :func:`from_w3id`, without blocking the event loop.
+
+    :param transport: see :func:`prefixmaps.ingest.fetch.afetch`
+    :return:
+    """
+    payload = await afetch(API_LIST_CALL, transport=transport)
+    return _from_tree(payload.json())
+
 
-    r = requests.get(API_LIST_CALL)
-    results = r.json()
-    if r.status_code != 200:
-        raise ValueError(results.message)
+def _from_tree(results: Dict[str, Any]) -> Context:
     if results["truncated"]:
         raise ValueError("truncated results")
     ctxt = Context("w3id")
-    for entry in r.json()["tree"]:
+    for entry in results["tree"]:
         if entry["type"] != "tree":
             continue
         path = entry["path"]
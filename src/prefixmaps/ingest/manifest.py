@@ -0,0 +1,158 @@
+"""
+Manifest of the inputs and outputs of an ETL run, for incremental rebuilds.
+
+For each context written, the manifest records the SHA-256 of its CSV, and the
+fingerprints of the inputs it was built from: for a source, a fingerprint of its
+upstream data; for a merged context, the SHA-256 of each component's CSV. A context
+only needs rebuilding when these differ from what is recorded.
+
+The manifest of the bundled data directory is committed with the datafiles, so that
+refreshes in CI are incremental too, but is not part of the package.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+from prefixmaps.datamodel.context import CONTEXT
+
+__all__ = [
+    "MANIFEST_NAME",
+    "ManifestEntry",
+    "Manifest",
+    "file_sha256",
+    "url_input",
+    "file_input",
+    "package_input",
+]
+
+MANIFEST_NAME = "etl.manifest.json"
+
+FORMAT_VERSION = 1
+"""Incremented whenever the layout of the manifest changes; older manifests are ignored."""
+
+UPSTREAM = "upstream"
+"""Key of the upstream fingerprint in the inputs of a source."""
+
+
+def file_sha256(path: Union[str, Path]) -> Optional[str]:
+    """
+    Get the SHA-256 of a file
+
+    :param path:
+    :return: None if there is no such file
+    """
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def url_input(url: str) -> Callable[[], str]:
+    """
+    Fingerprints a source downloaded from a URL, by the hash of the (revalidated) payload.
+
+    :param url:
+    :return:
+    """
+
+    def _fingerprint() -> str:
+        from prefixmaps.ingest.fetch import fetch
+
+        return fetch(url).sha256
+
+    return _fingerprint
+
+
+def file_input(path: Union[str, Path]) -> Callable[[], str]:
+    """
+    Fingerprints a source read from a local file, by the hash of the file.
+
+    :param path:
+    :return:
+    """
+
+    def _fingerprint() -> str:
+        sha256 = file_sha256(path)
+        if sha256 is None:
+            raise FileNotFoundError(path)
+        return sha256
+
+    return _fingerprint
+
+
+def package_input(package: str) -> Callable[[], str]:
+    """
+    Fingerprints a source distributed as a Python package, by the version of the package.
+
+    :param package:
+    :return:
+    """
+
+    def _fingerprint() -> str:
+        from importlib.metadata import version
+
+        return f"{package}=={version(package)}"
+
+    return _fingerprint
+
+
+@dataclass
+class ManifestEntry:
+    """The inputs and output of a context, as last written."""
+
+    sha256: str
+    """SHA-256 of the CSV."""
+
+    inputs: Dict[str, str] = field(default_factory=dict)
+    """Fingerprints of the inputs the context was built from, keyed by name."""
+
+
+@dataclass
+class Manifest:
+    """The entries for all contexts in an output directory."""
+
+    entries: Dict[CONTEXT, ManifestEntry] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> "Manifest":
+        """
+        Loads the manifest of an output directory
+
+        :param directory:
+        :return: an empty manifest if there is none, or it is unreadable or malformed
+        """
+        try:
+            obj = json.loads((Path(directory) / MANIFEST_NAME).read_text())
+        except (FileNotFoundError, ValueError):
+            return cls()
+        try:
+            if obj.get("version") != FORMAT_VERSION:
+                return cls()
+            entries = {name: ManifestEntry(**entry) for name, entry in obj["contexts"].items()}
+        except (AttributeError, KeyError, TypeError):
+            # e.g. edited by hand, or left over from a merge conflict
+            return cls()
+        return cls(entries)
+
+    def save(self, directory: Union[str, Path]) -> None:
+        """
+        Saves the manifest to an output directory, unless it is unchanged
+
+        :param directory:
+        :return:
+        """
+        path = Path(directory) / MANIFEST_NAME
+        contexts = {
+            name: {"sha256": entry.sha256, "inputs": entry.inputs}
+            for name, entry in sorted(self.entries.items())
+        }
+        text = json.dumps({"version": FORMAT_VERSION, "contexts": contexts}, indent=2) + "\n"
+        if path.exists() and path.read_text() == text:
+            return
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(text)
+        os.replace(tmp_path, path)
@@ -0,0 +1,252 @@
+"""
+Several contexts loaded into one shared store.
+
+A :class:`ContextBundle` holds the rows of all its contexts in a single row store: one
+column per field of :class:`PrefixExpansion`, each entry an index into a pool of
+strings shared by all the contexts. Identical strings (e.g. the bioregistry namespaces
+that appear again in merged contexts) are stored once, and so are identical rows
+(e.g. those shared by ``bioregistry`` and ``bioregistry.upper``). Each context is a
+view: an array of indexes into the row store.
+
+Like :mod:`prefixmaps.io.mapped`, bundled contexts are read-only, and
+:class:`PrefixExpansion` objects are only materialized when rows are accessed.
+"""
+
+import csv
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import Collection, Dict, Iterator, List, Optional, Tuple
+
+from prefixmaps.data import COMBINED, canonical_combined, context_paths
+from prefixmaps.datamodel.context import (
+    CONTEXT,
+    NAMESPACE,
+    PREFIX,
+    PrefixExpansion,
+    StatusType,
+)
+from prefixmaps.io.readonly import (
+    CANONICAL,
+    NO_STRING,
+    STATUS_TYPES,
+    ExpansionRows,
+    ReadOnlyContext,
+)
+from prefixmaps.io.snapshot import read_snapshot_columns
+
+__all__ = [
+    "ContextBundle",
+    "BundledExpansions",
+    "BundledContext",
+]
+
+_STATUS_CODES = {status.name: code for code, status in enumerate(STATUS_TYPES)}
+
+
+class BundledExpansions(ExpansionRows):
+    """
+    A read-only sequence of the prefix expansions of a context in a bundle.
+
+    Materialized expansions share the pooled strings.
+    """
+
+    def __init__(self, bundle: "ContextBundle", rows: array, context: Optional[CONTEXT] = None):
+        """
+        :param bundle:
+        :param rows: indexes of the rows in the row store
+        :param context: if given, the context of every expansion, overriding that of the
+            rows, e.g. for an alias sharing the rows of another context
+        """
+        self.bundle = bundle
+        self.rows = rows
+        self.context = context
+
+    def _row(self, i: int) -> PrefixExpansion:
+        bundle = self.bundle
+        row = self.rows[i]
+        strings = bundle.strings
+        source = bundle.sources[row]
+        context = self.context
+        return PrefixExpansion(
+            context=strings[bundle.contexts[row]] if context is None else context,
+            prefix=strings[bundle.prefixes[row]],
+            namespace=strings[bundle.namespaces[row]],
+            status=STATUS_TYPES[bundle.statuses[row]],
+            expansion_source=None if source == NO_STRING else strings[source],
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def triples(self) -> Iterator[Tuple[PREFIX, NAMESPACE, StatusType]]:
+        bundle = self.bundle
+        strings = bundle.strings
+        prefixes = bundle.prefixes
+        namespaces = bundle.namespaces
+        statuses = bundle.statuses
+        for row in self.rows:
+            yield strings[prefixes[row]], strings[namespaces[row]], STATUS_TYPES[statuses[row]]
+
+    def canonical_pairs(self) -> Iterator[Tuple[PREFIX, NAMESPACE]]:
+        bundle = self.bundle
+        strings = bundle.strings
+        prefixes = bundle.prefixes
+        namespaces = bundle.namespaces
+        statuses = bundle.statuses
+        for row in self.rows:
+            if statuses[row] == CANONICAL:
+                yield strings[prefixes[row]], strings[namespaces[row]]
+
+
+@dataclass(eq=False)
+class BundledContext(ReadOnlyContext):
+    """
+    A read-only context whose prefix expansions live in a :class:`ContextBundle`.
+    """
+
+
+class ContextBundle:
+    """
+    Contexts loaded into one pool of strings and one row store.
+
+    Use :meth:`load` to create one.
+    """
+
+    def __init__(self):
+        self.strings: List[str] = []
+        """The string pool; columns hold indexes into it."""
+        self.contexts = array("I")
+        self.prefixes = array("I")
+        self.namespaces = array("I")
+        self.sources = array("I")
+        """Index of the expansion source of each row, or ``NO_STRING``."""
+        self.statuses = array("B")
+        """Code of the status of each row, an index into ``STATUS_TYPES``."""
+        self.views: Dict[CONTEXT, array] = {}
+        """The rows of each context, in order."""
+        self.aliases: Dict[CONTEXT, CONTEXT] = {}
+        """The context whose rows each alias shares."""
+        self._string_ids: Dict[Optional[str], int] = {None: NO_STRING}
+        self._row_ids: Dict[Tuple[int, int, int, int, int], int] = {}
+
+    @classmethod
+    def load(cls, names: Optional[Collection[CONTEXT]] = None) -> "ContextBundle":
+        """
+        Loads contexts from their datafiles into a bundle.
+
+        Combined contexts that are aliases of another (see
+        :func:`prefixmaps.data.canonical_combined`) share its rows, relabelled with the
+        name of the alias when accessed, as by :func:`prefixmaps.io.parser.load_context`.
+
+        :param names: names of the contexts, defaults to all in
+            :data:`prefixmaps.data.context_paths`
+        :return:
+        """
+        if names is None:
+            names = sorted(context_paths)
+        bundle = cls()
+        for name in names:
+            bundle._add(name)
+        # only needed while loading
+        del bundle._string_ids, bundle._row_ids
+        return bundle
+
+    def _add(self, name: CONTEXT) -> None:
+        if name in self.views:
+            return
+        if name in COMBINED and canonical_combined(name) != name:
+            canonical = canonical_combined(name)
+            self._add(canonical)
+            self.views[name] = self.views[canonical]
+            self.aliases[name] = canonical
+            return
+        if name not in context_paths:
+            raise ValueError(f"No datafile for context {name}")
+        path = context_paths[name]
+        columns = read_snapshot_columns(path)
+        if columns is None:
+            columns = _read_columns(path)
+        self.views[name] = self._add_rows(*columns)
+
+    def _add_rows(self, contexts, prefixes, namespaces, statuses, sources) -> array:
+        """Add rows given column-wise, sharing strings and rows already in the bundle."""
+        strings = self.strings
+        string_ids = self._string_ids
+        for column in (contexts, prefixes, namespaces, sources):
+            new_strings = set(column).difference(string_ids)
+            string_ids.update(
+                zip(new_strings, range(len(strings), len(strings) + len(new_strings)))
+            )
+            strings.extend(new_strings)
+        ids = string_ids.__getitem__
+        keys = list(
+            zip(
+                map(ids, contexts),
+                map(ids, prefixes),
+                map(ids, namespaces),
+                statuses,
+                map(ids, sources),
+            )
+        )
+        row_ids = self._row_ids
+        new_keys = list(dict.fromkeys(key for key in keys if key not in row_ids))
+        if new_keys:
+            start = len(self.statuses)
+            row_ids.update(zip(new_keys, range(start, start + len(new_keys))))
+            columns = (self.contexts, self.prefixes, self.namespaces, self.statuses, self.sources)
+            for column, values in zip(columns, zip(*new_keys)):
+                column.extend(values)
+        view = array("I", map(row_ids.__getitem__, keys))
+        return view
+
+    def __contains__(self, name: CONTEXT) -> bool:
+        return name in self.views
+
+    def __getitem__(self, name: CONTEXT) -> BundledContext:
+        """
+        Get a context in the bundle, as a view over the shared rows.
+
+        :param name:
+        :return:
+        """
+        if name not in self.views:
+            raise KeyError(name)
+        context = name if name in self.aliases else None
+        return BundledContext(
+            name=name, prefix_expansions=BundledExpansions(self, self.views[name], context)
+        )
+
+    def names(self) -> List[CONTEXT]:
+        """Get the names of the contexts in the bundle."""
+        return list(self.views)
+
+    def nbytes(self) -> int:
+        """
+        Get the approximate size of the bundle in memory, in bytes, including the strings.
+
+        :return:
+        """
+        columns = [self.contexts, self.prefixes, self.namespaces, self.sources, self.statuses]
+        views = {id(view): view for view in self.views.values()}.values()
+        return (
+            sys.getsizeof(self.strings)
+            + sum(sys.getsizeof(s) for s in self.strings)
+            + sum(sys.getsizeof(column) for column in columns)
+            + sum(sys.getsizeof(view) for view in views)
+        )
+
+
+def _read_columns(path) -> tuple:
+    """Read the rows of a context datafile column-wise."""
+    with open(path, encoding="utf-8") as file:
+        reader = csv.DictReader(file)
+        rows = list(reader)
+    has_source = "expansion_source" in (reader.fieldnames or [])
+    return (
+        [row["context"] for row in rows],
+        [row["prefix"] for row in rows],
+        [row["namespace"] for row in rows],
+        bytes(_STATUS_CODES[row["status"]] for row in rows),
+        [row["expansion_source"] if has_source else None for row in rows],
+    )
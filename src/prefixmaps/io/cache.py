@@ -0,0 +1,224 @@
+"""Caching of loaded contexts and converters, in-process and on disk."""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, List, NamedTuple, Optional
+
+__all__ = [
+    "CACHE_DIR_ENV",
+    "CacheInfo",
+    "LRUCache",
+    "DiskCache",
+    "cache_directory",
+]
+
+CACHE_DIR_ENV = "PREFIXMAPS_CACHE_DIR"
+"""Environment variable overriding the directory for on-disk caches."""
+
+
+def cache_directory(*parts: str) -> Path:
+    """
+    Get (and create) a directory for on-disk caches.
+
+    This is ``$PREFIXMAPS_CACHE_DIR`` if set, otherwise ``prefixmaps`` under
+    ``$XDG_CACHE_HOME`` (by default ``~/.cache``).
+
+    :param parts: subdirectory names
+    :return:
+    """
+    root = os.environ.get(CACHE_DIR_ENV)
+    if not root:
+        xdg = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        root = Path(xdg) / "prefixmaps"
+    directory = Path(root).joinpath(*parts)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+class CacheInfo(NamedTuple):
+    """Statistics on cache usage, mirroring :func:`functools.lru_cache`."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class LRUCache:
+    """
+    A bounded, thread-safe, least-recently-used cache.
+
+    Unlike :func:`functools.lru_cache`, entries can be inspected and replaced explicitly,
+    which allows callers to validate an entry (e.g. against a file modification time)
+    before using it.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(
+        self,
+        key: Hashable,
+        default: Optional[Any] = None,
+        valid: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Look up an entry, marking it as most recently used.
+
+        :param key:
+        :param default: returned if there is no (valid) entry for the key
+        :param valid: optional predicate; entries failing it are treated as misses
+        :return:
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self._misses += 1
+                return default
+            if valid is not None and not valid(value):
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up an entry without counting a hit or miss, or marking it as used.
+
+        :param key:
+        :param default: returned if there is no entry
+        :return:
+        """
+        with self._lock:
+            return self._data.get(key, default)
+
+    def keys(self) -> List[Hashable]:
+        """Get the keys of all entries, least recently used first."""
+        with self._lock:
+            return list(self._data)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Add or replace an entry, evicting the least recently used entry if full.
+
+        :param key:
+        :param value:
+        :return:
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        """Remove an entry, if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries and reset statistics."""
+        with self._lock:
+            self._data.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self) -> CacheInfo:
+        """Report cache statistics."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize, len(self._data))
+
+
+class DiskCache:
+    """
+    A directory of byte strings keyed by hex digests, bounded in total size.
+
+    Entries are written atomically (to a temporary file, then renamed), so processes
+    sharing the directory never see a partial entry. When the total size exceeds
+    ``maxbytes``, the least recently used entries are deleted; reading an entry marks it
+    as used.
+    """
+
+    def __init__(self, directory: Path, maxbytes: int = 256 * 1024 * 1024):
+        if maxbytes < 1:
+            raise ValueError(f"maxbytes must be positive, got {maxbytes}")
+        self.directory = Path(directory)
+        self.maxbytes = maxbytes
+
+    def _path(self, key: str) -> Path:
+        if not key.isalnum():
+            raise ValueError(f"Invalid key: {key}")
+        return self.directory / key
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Look up an entry, marking it as most recently used.
+
+        :param key:
+        :return: None if there is no entry for the key
+        """
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            # absent, or evicted by another process
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Add or replace an entry, evicting least recently used entries if over size.
+
+        :param key:
+        :param data:
+        :return:
+        """
+        path = self._path(key)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the total size is within bounds."""
+        entries = []
+        for path in self.directory.iterdir():
+            if path.name.startswith("."):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.maxbytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        """Delete all entries."""
+        if not self.directory.exists():
+            return
+        for path in self.directory.iterdir():
+            if not path.name.startswith("."):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
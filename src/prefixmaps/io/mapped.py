@@ -0,0 +1,224 @@
+"""
+Read-only contexts backed by a memory-mapped file.
+
+The file holds a string table (an offsets column and a UTF-8 blob) plus one fixed-width
+column per field of :class:`PrefixExpansion`, each entry an index into the string
+table. Opening a mapped context does not parse anything; the operating system shares
+the pages between all processes that map the same file, and
+:class:`PrefixExpansion` objects are only materialized when rows are accessed.
+
+Layout (all integers little-endian)::
+
+    header    magic, version, n_rows, n_strings (4 x uint32)
+    offsets   (n_strings + 1) x uint32, byte offsets of each string in the blob
+    context   n_rows x uint32 string index
+    prefix    n_rows x uint32 string index
+    namespace n_rows x uint32 string index
+    source    n_rows x uint32 string index, NO_STRING for no source
+    status    n_rows x uint8, index into STATUS_TYPES
+    blob      UTF-8 encoded strings
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from prefixmaps.datamodel.context import (
+    CONTEXT,
+    NAMESPACE,
+    PREFIX,
+    Context,
+    PrefixExpansion,
+    StatusType,
+)
+from prefixmaps.io.readonly import (
+    CANONICAL,
+    NO_STRING,
+    STATUS_TYPES,
+    ExpansionRows,
+    ReadOnlyContext,
+)
+
+__all__ = [
+    "ExpansionTable",
+    "MappedContext",
+    "write_mapped_context",
+    "open_mapped_context",
+]
+
+MAGIC = 0x54584D50  # "PMXT"
+VERSION = 1
+HEADER = struct.Struct("<4I")
+
+_STATUS_CODES = {status: code for code, status in enumerate(STATUS_TYPES)}
+
+
+def _uint32_column(values: List[int]) -> bytes:
+    column = array("I", values)
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column.tobytes()
+
+
+def write_mapped_context(context: Context, path: Union[str, Path]) -> Path:
+    """
+    Writes a context in the memory-mappable table format
+
+    The file is written to a temporary name and moved into place, so processes that
+    have the previous version mapped are unaffected.
+
+    :param context:
+    :param path:
+    :return:
+    """
+    path = Path(path)
+    string_ids: Dict[str, int] = {}
+    strings: List[bytes] = []
+
+    def _id(s: Optional[str]) -> int:
+        if s is None:
+            return NO_STRING
+        i = string_ids.get(s)
+        if i is None:
+            i = string_ids[s] = len(strings)
+            strings.append(s.encode("utf-8"))
+        return i
+
+    expansions = context.prefix_expansions
+    contexts = [_id(pe.context) for pe in expansions]
+    prefixes = [_id(pe.prefix) for pe in expansions]
+    namespaces = [_id(pe.namespace) for pe in expansions]
+    sources = [_id(pe.expansion_source) for pe in expansions]
+    statuses = bytes(_STATUS_CODES[pe.status] for pe in expansions)
+    offsets = [0]
+    for s in strings:
+        offsets.append(offsets[-1] + len(s))
+
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(expansions), len(strings)))
+        for column in (offsets, contexts, prefixes, namespaces, sources):
+            file.write(_uint32_column(column))
+        file.write(statuses)
+        file.write(b"".join(strings))
+    os.replace(tmp_path, path)
+    return path
+
+
+class ExpansionTable(ExpansionRows):
+    """A read-only sequence of prefix expansions over a memory-mapped table."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_rows, n_strings = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a version {VERSION} mapped context")
+        if sys.byteorder != "little":
+            self._mmap.close()
+            raise ValueError("Mapped contexts are only supported on little-endian platforms")
+        self._n_rows = n_rows
+        view = memoryview(self._mmap)
+        pos = HEADER.size
+
+        def _column(length: int) -> memoryview:
+            nonlocal pos
+            column = view[pos : pos + 4 * length].cast("I")
+            pos += 4 * length
+            return column
+
+        self._offsets = _column(n_strings + 1)
+        self._contexts = _column(n_rows)
+        self._prefixes = _column(n_rows)
+        self._namespaces = _column(n_rows)
+        self._sources = _column(n_rows)
+        self._statuses = view[pos : pos + n_rows]
+        self._blob = view[pos + n_rows :]
+        self._views = [
+            self._offsets,
+            self._contexts,
+            self._prefixes,
+            self._namespaces,
+            self._sources,
+            self._statuses,
+            self._blob,
+            view,
+        ]
+
+    def close(self) -> None:
+        """Unmaps the file; the table can no longer be used."""
+        for view in self._views:
+            view.release()
+        self._mmap.close()
+
+    def string(self, i: int) -> Optional[str]:
+        """
+        Decodes an entry of the string table
+
+        :param i: index into the string table
+        :return:
+        """
+        if i == NO_STRING:
+            return None
+        offsets = self._offsets
+        return str(self._blob[offsets[i] : offsets[i + 1]], "utf-8")
+
+    def status(self, row: int) -> StatusType:
+        """Get the status of a row without materializing it."""
+        return STATUS_TYPES[self._statuses[row]]
+
+    def _row(self, row: int) -> PrefixExpansion:
+        string = self.string
+        return PrefixExpansion(
+            context=string(self._contexts[row]),
+            prefix=string(self._prefixes[row]),
+            namespace=string(self._namespaces[row]),
+            status=STATUS_TYPES[self._statuses[row]],
+            expansion_source=string(self._sources[row]),
+        )
+
+    def __len__(self) -> int:
+        return self._n_rows
+
+    def triples(self) -> Iterator[Tuple[PREFIX, NAMESPACE, StatusType]]:
+        string = self.string
+        for prefix, namespace, code in zip(self._prefixes, self._namespaces, self._statuses):
+            yield string(prefix), string(namespace), STATUS_TYPES[code]
+
+    def canonical_pairs(self) -> Iterator[Tuple[PREFIX, NAMESPACE]]:
+        string = self.string
+        prefixes = self._prefixes
+        namespaces = self._namespaces
+        for row, code in enumerate(self._statuses):
+            if code == CANONICAL:
+                yield string(prefixes[row]), string(namespaces[row])
+
+
+@dataclass(eq=False)
+class MappedContext(ReadOnlyContext):
+    """
+    A read-only context whose prefix expansions live in a memory-mapped file.
+
+    Use :func:`open_mapped_context` to create one.
+    """
+
+
+def open_mapped_context(path: Union[str, Path], name: Optional[CONTEXT] = None) -> MappedContext:
+    """
+    Opens a context written by :func:`write_mapped_context`
+
+    :param path:
+    :param name: name of the context, defaults to the basename of the file
+    :return:
+    """
+    path = Path(path)
+    if name is None:
+        name = path.stem
+    return MappedContext(name=name, prefix_expansions=ExpansionTable(path))
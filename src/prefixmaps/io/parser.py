@@ -1,19 +1,79 @@
-from csv import DictReader
+import hashlib
+import json
+import os
+import sys
+from copy import copy
 from pathlib import Path
-from typing import List, TextIO, Union
+from typing import TYPE_CHECKING, List, Optional, TextIO, Tuple, Union
 
-import yaml
-from curies import Converter
-
-from prefixmaps.data import data_path
+from prefixmaps.data import COMBINED, canonical_combined, data_path
 from prefixmaps.datamodel.context import CONTEXT, Context, PrefixExpansion, StatusType
+from prefixmaps.io.cache import CacheInfo, DiskCache, LRUCache, cache_directory
+from prefixmaps.io.snapshot import dumps_context, loads_context, read_snapshot
+from prefixmaps.io.watch import watching
+
+if TYPE_CHECKING:
+    from curies import Converter
+
+    from prefixmaps.ingest.fetch import AsyncTransport
 
 __all__ = [
     "load_multi_context",
     "load_context",
+    "aload_context",
     "load_converter",
+    "reload_context",
+    "cache_clear",
+    "cache_info",
+    "DISK_CACHE_ENV",
 ]
 
+CACHE_MAXSIZE = 64
+"""Maximum number of contexts and merged contexts held in the in-process cache."""
+
+DISK_CACHE_ENV = "PREFIXMAPS_DISK_CACHE"
+"""Environment variable enabling the on-disk cache of merged contexts, if non-empty."""
+
+DISK_CACHE_MAXBYTES = 256 * 1024 * 1024
+"""Maximum total size of the merged contexts held in the on-disk cache."""
+
+_cache = LRUCache(CACHE_MAXSIZE)
+
+
+def cache_clear(disk: bool = False) -> None:
+    """
+    Empties the in-process cache used by :func:`load_context`,
+    :func:`load_multi_context` and :func:`load_converter`.
+
+    :param disk: if True, also empty the on-disk cache of merged contexts
+    """
+    _cache.clear()
+    if disk:
+        _disk_cache().clear()
+
+
+def cache_info() -> CacheInfo:
+    """
+    Reports hits, misses and size of the in-process cache.
+
+    :return:
+    """
+    return _cache.info()
+
+
+def _file_stamp(name: CONTEXT) -> Optional[Tuple[int, int]]:
+    """
+    Get a cheap fingerprint (modification time, size) of a context datafile.
+
+    :param name:
+    :return: None if there is no datafile for the context
+    """
+    try:
+        stat = context_path(name).stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
 
 def context_path(name: CONTEXT) -> Path:
     """
@@ -25,45 +85,383 @@ def context_path(name: CONTEXT) -> Path:
     return data_path / f"{name}.csv"
 
 
-def load_converter(names: Union[CONTEXT, List[CONTEXT]], refresh: bool = False) -> Converter:
-    """Get a converter."""
+def load_converter(names: Union[CONTEXT, List[CONTEXT]], refresh: bool = False) -> "Converter":
+    """
+    Get a converter.
+
+    Converters are cached on the context they were built from (see
+    :meth:`Context.as_converter`), and are shared between callers; they must not be modified.
+
+    :param names: a context name, or a list of context names to merge
+    :param refresh: if True, fetch from upstream
+    :return:
+    """
     if isinstance(names, str):
-        return load_context(names, refresh=refresh).as_converter()
-    return load_multi_context(names, refresh=refresh).as_converter()
+        names = [names]
+    if len(names) == 1:
+        ctxt = _load_context(names[0], refresh=refresh)
+    else:
+        ctxt = _load_multi_context(names, refresh=refresh)
+    return ctxt.as_converter()
 
 
-def load_multi_context(names: List[CONTEXT], refresh=False) -> Context:
+def load_multi_context(
+    names: List[CONTEXT], refresh=False, disk_cache: Optional[bool] = None
+) -> Context:
     """
     Merges multiple contexts
 
+    Merged contexts are cached for as long as the contexts they were merged from
+    remain cached; as with :func:`load_context`, each call returns a copy of the
+    cached context.
+
+    With the on-disk cache enabled, merged contexts are also stored in the ``contexts``
+    directory of the user cache (see :func:`prefixmaps.io.cache.cache_directory`), keyed
+    by the names and the contents of the datafiles they were merged from, so that other
+    processes can load them without merging again.
+
     :param names:
     :param refresh: if True, fetch from upstream
+    :param disk_cache: if True, use the on-disk cache; defaults to the
+        ``PREFIXMAPS_DISK_CACHE`` environment variable
     :return:
     """
+    return _load_multi_context(names, refresh, disk_cache)._share()
+
+
+def _load_multi_context(
+    names: List[CONTEXT], refresh=False, disk_cache: Optional[bool] = None
+) -> Context:
+    """As :func:`load_multi_context`, returning the cached context."""
     if len(names) == 1:
-        return load_context(names[0], refresh=refresh)
+        return _load_context(names[0], refresh=refresh)
+    key = ("multi", tuple(names))
     name = "+".join(names)
+    digest = None
+    if not refresh and _use_disk_cache(disk_cache):
+        digest = _merged_digest(names)
+    if digest is not None:
+        entry = _cache.get(key, valid=lambda e: e[1] == digest)
+        if entry is not None:
+            return entry[2]
+        disk = _disk_cache()
+        data = disk.get(digest)
+        ctxt = loads_context(name, data, digest) if data is not None else None
+        if ctxt is None:
+            ctxt = _merge(name, [_load_context(n) for n in names])
+            disk.put(digest, dumps_context(ctxt, digest))
+        _cache.put(key, (None, digest, ctxt))
+        return ctxt
+    components = tuple(_load_context(n, refresh=refresh) for n in names)
+
+    def _valid(entry) -> bool:
+        return entry[0] is not None and all(a is b for a, b in zip(entry[0], components))
+
+    entry = _cache.get(key, valid=_valid)
+    if entry is not None:
+        return entry[2]
+    ctxt = _merge(name, components)
+    _cache.put(key, (components, None, ctxt))
+    return ctxt
+
+
+def _merge(name: CONTEXT, components) -> Context:
     ctxt = Context(name)
-    for n in names:
-        ctxt.combine(load_context(n, refresh=refresh))
+    for component in components:
+        ctxt.combine(component)
     return ctxt
 
 
+def _use_disk_cache(disk_cache: Optional[bool]) -> bool:
+    if disk_cache is None:
+        return bool(os.environ.get(DISK_CACHE_ENV))
+    return disk_cache
+
+
+def _disk_cache() -> DiskCache:
+    return DiskCache(cache_directory("contexts"), DISK_CACHE_MAXBYTES)
+
+
+def _content_sha256(name: CONTEXT) -> Optional[str]:
+    """
+    Get the SHA-256 of the contents of a context datafile.
+
+    Digests are cached in-process while the datafile is unchanged. Combined contexts
+    without a datafile are digested by their components.
+
+    :param name:
+    :return: None if there is no datafile for the context
+    """
+    stamp = _file_stamp(name)
+    if stamp is None:
+        if name in COMBINED:
+            return _merged_digest(COMBINED[name])
+        return None
+    key = ("sha256", name)
+    entry = _cache.get(key, valid=lambda e: e[0] == stamp)
+    if entry is not None:
+        return entry[1]
+    digest = hashlib.sha256(context_path(name).read_bytes()).hexdigest()
+    _cache.put(key, (stamp, digest))
+    return digest
+
+
+def _merged_digest(names: List[CONTEXT]) -> Optional[str]:
+    """
+    Get the key of a merged context in the on-disk cache.
+
+    :param names:
+    :return: None if a context has no datafile
+    """
+    digests = [_content_sha256(n) for n in names]
+    if None in digests:
+        return None
+    text = json.dumps([list(names), digests])
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 def load_context(name: CONTEXT, refresh=False) -> Context:
     """
     Loads a context by name from standard location
 
+    Contexts are cached in-process, keyed on the name and the modification time and size
+    of the datafile, so a regenerated datafile is picked up on the next call. While a
+    :class:`prefixmaps.io.watch.ContextWatcher` watches the data directory, datafiles are
+    not checked: the cached context is returned until the watcher has reloaded it, so
+    callers never wait for a reload.
+
+    Each call returns a copy of the cached context, which uses its indexes and cached
+    views (such as the converter) until the copy is modified, so callers can add to the
+    contexts they get without affecting each other. The expansions themselves are shared
+    with the cache: replace them rather than changing them in place.
+
+    If a fresh precompiled snapshot of the datafile is present (see
+    :mod:`prefixmaps.io.snapshot`), it is loaded instead of parsing the CSV.
+
+    With ``refresh=True`` the cache is bypassed, and the freshly fetched context replaces
+    the cached one, so subsequent calls in this process see the refreshed data.
+
+    Combined contexts (see :data:`prefixmaps.data.COMBINED`) are loaded from their
+    precompiled datafile if there is one, and otherwise composed from their components.
+    Combined contexts with the same components are merged once: all but the first are
+    aliases, copies of the first with their expansions relabelled, which share its
+    converter.
+
     :param name:
     :param refresh: if True, fetch from upstream
     :return:
     """
+    return _load_context(name, refresh)._share()
+
+
+def _load_context(name: CONTEXT, refresh=False) -> Context:
+    """As :func:`load_context`, returning the cached context."""
+    if name in COMBINED:
+        return _load_combined(name, refresh=refresh)
+    key = ("context", name)
     if refresh:
         from prefixmaps.ingest.etl_runner import load_context_from_source
 
-        return load_context_from_source(name)
-    else:
-        with open(data_path / f"{name}.csv", encoding="utf-8") as file:
-            return context_from_file(name, file)
+        ctxt = load_context_from_source(name)
+        _cache.put(key, (_file_stamp(name), ctxt))
+        return ctxt
+    stamp = _file_stamp(name)
+    watched = watching(data_path)
+    entry = _cache.get(key, valid=lambda e: stamp is not None and (e[0] == stamp or watched))
+    if entry is not None:
+        return entry[1]
+    ctxt = _read_context(name)
+    _cache.put(key, (stamp, ctxt))
+    return ctxt
+
+
+async def aload_context(
+    name: CONTEXT, refresh=False, transport: Optional["AsyncTransport"] = None
+) -> Context:
+    """
+    Loads a context by name, without blocking the event loop when fetching from upstream.
+
+    As :func:`load_context`: without ``refresh``, the context is loaded from its datafile
+    (or the cache) in the calling thread. With ``refresh=True``, sources are fetched
+    asynchronously, those of a combined context concurrently, and the refreshed contexts
+    replace the cached ones.
+
+    :param name:
+    :param refresh: if True, fetch from upstream
+    :param transport: see :func:`prefixmaps.ingest.fetch.afetch`
+    :return:
+    """
+    return (await _aload_context(name, refresh, transport))._share()
+
+
+async def _aload_context(
+    name: CONTEXT, refresh=False, transport: Optional["AsyncTransport"] = None
+) -> Context:
+    """As :func:`aload_context`, returning the cached context."""
+    if not refresh:
+        return _load_context(name)
+    import asyncio
+
+    if name in COMBINED:
+        canonical = canonical_combined(name)
+        components = await asyncio.gather(
+            *(_aload_context(n, True, transport) for n in COMBINED[canonical])
+        )
+        _put_combined(canonical, _file_stamp(canonical), tuple(components))
+        # the refreshed context is now cached, as are aliases of it made from it
+        return _load_context(name)
+    from prefixmaps.ingest.etl_runner import aload_context_from_source
+
+    ctxt = await aload_context_from_source(name, transport)
+    _cache.put(("context", name), (_file_stamp(name), ctxt))
+    return ctxt
+
+
+def _read_context(name: CONTEXT) -> Context:
+    path = context_path(name)
+    ctxt = read_snapshot(name, path)
+    if ctxt is None:
+        with open(path, encoding="utf-8") as file:
+            ctxt = context_from_file(name, file)
+    return ctxt
+
+
+def _load_combined(name: CONTEXT, refresh=False) -> Context:
+    """
+    Loads a combined context, sharing one context between all with the same components.
+
+    :param name:
+    :param refresh: if True, fetch the components from upstream
+    :return:
+    """
+    canonical = canonical_combined(name)
+    if canonical != name:
+        ctxt = _load_combined(canonical, refresh=refresh)
+        key = ("alias", name)
+        entry = _cache.get(key, valid=lambda e: e[0] is ctxt)
+        if entry is not None:
+            return entry[1]
+        alias = _relabel(ctxt, name)
+        _cache.put(key, (ctxt, alias))
+        return alias
+    key = ("combined", name)
+    stamp = _file_stamp(name)
+    components = None
+    if refresh or stamp is None:
+        components = tuple(_load_context(n, refresh=refresh) for n in COMBINED[name])
+    if not refresh:
+        watched = watching(data_path)
+
+        def _valid(entry) -> bool:
+            # precompiled: the datafile is unchanged (or a watcher will reload it);
+            # composed: the components are unchanged
+            if entry[0] is not None:
+                return stamp is not None and (entry[0] == stamp or watched)
+            return stamp is None and all(a is b for a, b in zip(entry[1], components))
+
+        entry = _cache.get(key, valid=_valid)
+        if entry is not None:
+            return entry[2]
+    if components is None:
+        ctxt = _read_context(name)
+        _cache.put(key, (stamp, components, ctxt))
+        return ctxt
+    return _put_combined(name, stamp, components)
+
+
+def _relabel(ctxt: Context, name: CONTEXT) -> Context:
+    """
+    Copy a context under another name, with its expansions relabelled.
+
+    The copy shares the extended prefix map and converter of the context, if built, which
+    do not depend on the name.
+    """
+    name = sys.intern(name)
+    alias = copy(ctxt)
+    alias.name = name
+    alias.prefix_expansions = [
+        PrefixExpansion(name, pe.prefix, pe.namespace, pe.status, pe.expansion_source)
+        for pe in ctxt.prefix_expansions
+    ]
+    alias._index = alias._views = alias._origin = None
+    views = ctxt._views
+    if views is not None and views.size == len(ctxt.prefix_expansions):
+        alias_views = alias._canonical_views()
+        alias_views.extended = views.extended
+        alias_views.converter = views.converter
+    return alias
+
+
+def _put_combined(name: CONTEXT, stamp, components: Tuple[Context, ...]) -> Context:
+    """Merges the components of a combined context, and caches it."""
+    ctxt = _merge(name, components)
+    _cache.put(("combined", name), (stamp, components, ctxt))
+    return ctxt
+
+
+def reload_context(name: CONTEXT) -> Optional[Context]:
+    """
+    Reloads a cached context from its changed datafile, as done by
+    :class:`prefixmaps.io.watch.ContextWatcher`.
+
+    The new context, with the views the cached one had built (such as its converter), is
+    fully loaded before it replaces the cached one, so callers of :func:`load_context`
+    get either the old or the new context. Cached contexts made from it (combined
+    contexts, their aliases and merged contexts) are then rebuilt and replaced likewise.
+
+    :param name:
+    :return: a copy of the new context, as from :func:`load_context`; None if it was not
+        cached or its datafile is unchanged (or gone)
+    """
+    combined = name in COMBINED
+    if combined:
+        name = canonical_combined(name)
+    key = ("combined", name) if combined else ("context", name)
+    entry = _cache.peek(key)
+    stamp = _file_stamp(name)
+    if entry is None or stamp is None or entry[0] == stamp:
+        return None
+    ctxt = _read_context(name)
+    _prepare(ctxt, entry[-1])
+    _cache.put(key, (stamp, None, ctxt) if combined else (stamp, ctxt))
+    _rebuild_dependents(name)
+    return ctxt._share()
+
+
+def _prepare(ctxt: Context, like: Context) -> None:
+    """Build the views of a context that were built for the context it replaces."""
+    views = like._views
+    if views is not None:
+        ctxt._canonical_views()
+        if views.converter is not None:
+            ctxt.as_converter()
+
+
+def _rebuild_dependents(name: CONTEXT) -> None:
+    """Rebuild the cached contexts made from a context that was reloaded."""
+    for key in _cache.keys():
+        kind, other = key
+        entry = _cache.peek(key)
+        if entry is None:
+            continue
+        if kind == "combined" and entry[0] is None and name in COMBINED[other]:
+            components = tuple(_load_context(n) for n in COMBINED[other])
+            ctxt = _merge(other, components)
+            _prepare(ctxt, entry[2])
+            _cache.put(key, (None, components, ctxt))
+            _rebuild_dependents(other)
+        elif kind == "alias" and canonical_combined(other) == name:
+            # an alias is a copy of the canonical context
+            _load_context(other)
+        elif kind == "multi" and name in other:
+            if entry[0] is None:
+                # in the on-disk cache, keyed by the contents of the datafiles
+                _load_multi_context(list(other), disk_cache=True)
+                continue
+            components = tuple(_load_context(n) for n in other)
+            ctxt = _merge("+".join(other), components)
+            _prepare(ctxt, entry[2])
+            _cache.put(key, (components, None, ctxt))
 
 
 def context_from_file(name: CONTEXT, file: TextIO) -> Context:
@@ -74,12 +472,23 @@ def context_from_file(name: CONTEXT, file: TextIO) -> Context:
     :param file:
     :return:
     """
+    from csv import DictReader
+
     reader = DictReader(file)
     context = Context(name=name)
+    expansions = context.prefix_expansions
+    intern = sys.intern
     for row in reader:
-        row["status"] = StatusType[row["status"]]
-        pe = PrefixExpansion(**row)
-        context.prefix_expansions.append(pe)
+        source = row.get("expansion_source")
+        expansions.append(
+            PrefixExpansion(
+                context=intern(row["context"]),
+                prefix=intern(row["prefix"]),
+                namespace=row["namespace"],
+                status=StatusType[row["status"]],
+                expansion_source=intern(source) if source is not None else None,
+            )
+        )
     return context
 
 
@@ -90,6 +499,8 @@ def load_contexts_meta() -> List[Context]:
     :param name:
     :return:
     """
+    import yaml
+
     objs = yaml.safe_load(open(data_path / "contexts.curated.yaml"))
     ctxts = []
     for obj in objs:
@@ -0,0 +1,253 @@
+"""
+Read-only contexts over rows stored column-wise.
+
+The common base of :mod:`prefixmaps.io.mapped` and :mod:`prefixmaps.io.bundle`: rows
+are stored as columns of indexes into a table of strings, and :class:`PrefixExpansion`
+objects are only materialized when rows are accessed.
+"""
+
+from abc import abstractmethod
+from dataclasses import dataclass, fields
+from typing import (
+    AbstractSet,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from prefixmaps.datamodel.context import (
+    INVERSE_PREFIX_EXPANSION_DICT,
+    NAMESPACE,
+    PREFIX,
+    PREFIX_EXPANSION_DICT,
+    Context,
+    PrefixExpansion,
+    StatusType,
+    _Views,
+)
+from prefixmaps.io.snapshot import STATUS_TYPES
+
+__all__ = [
+    "NO_STRING",
+    "STATUS_TYPES",
+    "ExpansionRows",
+    "ReadOnlyContext",
+]
+
+NO_STRING = 0xFFFFFFFF
+"""String index standing for no string, e.g. no expansion source."""
+
+CANONICAL = STATUS_TYPES.index(StatusType.canonical)
+"""Code of the canonical status, an index into ``STATUS_TYPES``."""
+
+
+class ExpansionRows(Sequence[PrefixExpansion]):
+    """
+    A read-only sequence of prefix expansions stored column-wise.
+
+    Subclasses implement :meth:`__len__`, :meth:`_row`, :meth:`triples` and
+    :meth:`canonical_pairs`. Rows are materialized as :class:`PrefixExpansion` objects on
+    access; nothing is cached, so repeated access creates new (equal) objects.
+
+    Rows compare equal to other rows and to lists of equal expansions.
+    """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Get the number of rows."""
+
+    @abstractmethod
+    def _row(self, i: int) -> PrefixExpansion:
+        """
+        Materialize a row.
+
+        :param i: position of the row, from 0 to ``len(self) - 1``
+        :return:
+        """
+
+    @abstractmethod
+    def triples(self) -> Iterator[Tuple[PREFIX, NAMESPACE, StatusType]]:
+        """
+        Yields (prefix, namespace, status) for each row, without materializing expansions
+
+        :return:
+        """
+
+    @abstractmethod
+    def canonical_pairs(self) -> Iterator[Tuple[PREFIX, NAMESPACE]]:
+        """
+        Yields (prefix, namespace) for each canonical row, without materializing expansions
+
+        :return:
+        """
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[PrefixExpansion, List[PrefixExpansion]]:
+        n_rows = len(self)
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(n_rows))]
+        if index < 0:
+            index += n_rows
+        if not 0 <= index < n_rows:
+            raise IndexError("row index out of range")
+        return self._row(index)
+
+    def __iter__(self) -> Iterator[PrefixExpansion]:
+        return map(self._row, range(len(self)))
+
+    def __eq__(self, other):
+        if not isinstance(other, (ExpansionRows, list)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+
+class _RowIndex:
+    """
+    Hash indexes from prefixes and namespaces (exact and lowercased) to the positions of
+    the rows, in order, as :class:`prefixmaps.datamodel.context._ExpansionIndex` is to
+    expansions.
+
+    Most keys have a single row, so the position is stored as an int, and only keys with
+    several rows have a list of positions.
+    """
+
+    __slots__ = ("by_prefix", "by_namespace", "by_prefix_lower", "by_namespace_lower")
+
+    def __init__(self, rows: Iterable[Tuple[PREFIX, NAMESPACE, StatusType]]):
+        self.by_prefix: Dict[PREFIX, Union[int, List[int]]] = {}
+        self.by_namespace: Dict[NAMESPACE, Union[int, List[int]]] = {}
+        self.by_prefix_lower: Dict[str, Union[int, List[int]]] = {}
+        self.by_namespace_lower: Dict[str, Union[int, List[int]]] = {}
+        indexes = (self.by_prefix, self.by_namespace, self.by_prefix_lower, self.by_namespace_lower)
+        for i, (prefix, namespace, _) in enumerate(rows):
+            for index, key in zip(indexes, (prefix, namespace, prefix.lower(), namespace.lower())):
+                rows_of_key = index.get(key)
+                if rows_of_key is None:
+                    index[key] = i
+                elif rows_of_key.__class__ is int:
+                    index[key] = [rows_of_key, i]
+                else:
+                    rows_of_key.append(i)
+
+    @staticmethod
+    def get(index: Dict[str, Union[int, List[int]]], key: str) -> List[int]:
+        """
+        Get the positions of the rows with a key.
+
+        :param index: one of the indexes
+        :param key:
+        :return:
+        """
+        rows = index.get(key)
+        if rows is None:
+            return []
+        return [rows] if rows.__class__ is int else rows
+
+
+class _RowViews(_Views):
+    """Cached views of a read-only context, with an index of its rows rather than expansions."""
+
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        super().__init__(None)
+        self.rows: Optional[_RowIndex] = None
+
+
+@dataclass
+class ReadOnlyContext(Context):
+    """
+    A context whose prefix expansions are :class:`ExpansionRows`.
+
+    Modifying the context raises ValueError, leaving it unchanged. It can still be
+    combined into other contexts. Lookups, the prefix maps and the converter are built
+    from the columns of the rows: only the expansions returned are materialized, and none
+    are kept on the context.
+
+    Read-only contexts compare equal to contexts (read-only or not) with the same fields
+    and expansions. Subclasses are declared with ``@dataclass(eq=False)`` to keep this.
+    """
+
+    def __eq__(self, other):
+        if not isinstance(other, Context):
+            return NotImplemented
+        return all(
+            getattr(self, f.name) == getattr(other, f.name) for f in fields(Context) if f.compare
+        )
+
+    __hash__ = None
+
+    def _before_write(self) -> None:
+        # called by every method that modifies the expansions, before any change
+        raise ValueError(f"Context {self.name} is read-only")
+
+    def _canonical_views(self) -> _RowViews:
+        # the rows cannot change, so the views are never updated
+        views = self._views
+        if views is None:
+            views = self._views = _RowViews()
+        return views
+
+    def _row_index(self) -> _RowIndex:
+        views = self._canonical_views()
+        if views.rows is None:
+            views.rows = _RowIndex(self._rows())
+        return views.rows
+
+    def _rows(self) -> Iterable[Tuple[PREFIX, NAMESPACE, StatusType]]:
+        return self.prefix_expansions.triples()
+
+    def _find(self, prefix: PREFIX, namespace: NAMESPACE) -> Optional[PrefixExpansion]:
+        index = self._row_index()
+        rows = set(index.get(index.by_prefix, prefix))
+        rows.intersection_update(index.get(index.by_namespace, namespace))
+        return self.prefix_expansions[min(rows)] if rows else None
+
+    def get_by_prefix(
+        self, prefix: PREFIX, case_insensitive: bool = False
+    ) -> List[PrefixExpansion]:
+        index = self._row_index()
+        if case_insensitive:
+            rows = index.get(index.by_prefix_lower, prefix.lower())
+        else:
+            rows = index.get(index.by_prefix, prefix)
+        return [self.prefix_expansions[i] for i in rows]
+
+    def get_by_namespace(
+        self, namespace: NAMESPACE, case_insensitive: bool = False
+    ) -> List[PrefixExpansion]:
+        index = self._row_index()
+        if case_insensitive:
+            rows = index.get(index.by_namespace_lower, namespace.lower())
+        else:
+            rows = index.get(index.by_namespace, namespace)
+        return [self.prefix_expansions[i] for i in rows]
+
+    def prefixes(
+        self, lower=False, force: bool = True, as_list: bool = True
+    ) -> Union[List[str], AbstractSet[str]]:
+        # the rows cannot change, so there is nothing to rebuild
+        index = self._row_index()
+        res = index.by_prefix_lower if lower else index.by_prefix
+        return list(res) if as_list else res.keys()
+
+    def namespaces(
+        self, lower=False, force: bool = True, as_list: bool = True
+    ) -> Union[List[str], AbstractSet[str]]:
+        index = self._row_index()
+        res = index.by_namespace_lower if lower else index.by_namespace
+        return list(res) if as_list else res.keys()
+
+    def as_dict(self) -> PREFIX_EXPANSION_DICT:
+        return dict(self.prefix_expansions.canonical_pairs())
+
+    def as_inverted_dict(self) -> INVERSE_PREFIX_EXPANSION_DICT:
+        return {namespace: prefix for prefix, namespace in self.prefix_expansions.canonical_pairs()}
@@ -0,0 +1,303 @@
+"""
+Precompiled snapshots of contexts.
+
+A snapshot stores the rows of a context datafile column-wise, with repeated strings
+interned, so that it can be loaded much faster than parsing the CSV. Each snapshot
+records a fingerprint of the CSV it was compiled from, and is ignored if the CSV has
+since changed. Datafiles of an installed (not editable) copy of the package are only
+changed by installing it again, along with their snapshots, so for those only the size
+is checked.
+
+Snapshots are pickles, and so must only be loaded from trusted locations, such as the
+data directory distributed with this package. Merged contexts in the on-disk cache of
+:func:`prefixmaps.io.parser.load_multi_context`, which is in a directory writable by the
+user, are stored as JSON instead, see :func:`dumps_context`.
+"""
+
+import json
+import os
+import pickle  # noqa: S403 -- only snapshots in trusted locations are loaded, see above
+import sys
+import sysconfig
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from prefixmaps.datamodel.context import CONTEXT, Context, PrefixExpansion, StatusType
+
+__all__ = [
+    "SNAPSHOT_SUFFIX",
+    "snapshot_path",
+    "write_snapshot",
+    "read_snapshot",
+    "read_snapshot_columns",
+    "dumps_context",
+    "loads_context",
+    "compile_snapshots",
+]
+
+SNAPSHOT_SUFFIX = ".snapshot"
+
+FORMAT_VERSION = 1
+"""Incremented whenever the layout of the snapshot changes; older snapshots are ignored."""
+
+PICKLE_PROTOCOL = 4
+
+JSON_FORMAT_VERSION = 1
+"""Incremented whenever the layout of contexts serialized by :func:`dumps_context` changes."""
+
+STATUS_TYPES = list(StatusType)
+"""Status types, indexed by their code in a snapshot."""
+
+_STATUS_CODES = {status: code for code, status in enumerate(STATUS_TYPES)}
+
+_CORRUPT = (
+    EOFError,
+    pickle.UnpicklingError,
+    AttributeError,
+    ImportError,
+    IndexError,
+    KeyError,
+    TypeError,
+    ValueError,
+)
+"""Errors raised when loading a truncated or corrupt snapshot."""
+
+INSTALL_DIRS = tuple(Path(sysconfig.get_path(key)).resolve() for key in ("purelib", "platlib"))
+"""Directories that packages are installed into."""
+
+
+def snapshot_path(csv_path: Union[str, Path]) -> Path:
+    """
+    Get the path of the snapshot compiled from a context datafile
+
+    :param csv_path:
+    :return:
+    """
+    return Path(csv_path).with_suffix(SNAPSHOT_SUFFIX)
+
+
+def _fingerprint(csv_path: Path) -> Tuple[int, int, int]:
+    """
+    Fingerprint a context datafile as (size, modification time, CRC-32 of the contents)
+
+    :param csv_path:
+    :return:
+    """
+    stat = csv_path.stat()
+    return stat.st_size, stat.st_mtime_ns, zlib.crc32(csv_path.read_bytes())
+
+
+def _is_fresh(csv_path: Path, size: int, mtime_ns: int, crc: int) -> bool:
+    """
+    Check whether a datafile still matches the fingerprint recorded in a snapshot.
+
+    The modification time differs in installed packages and fresh clones, where files are
+    not written at the time the snapshot was made. Then a matching size is enough for
+    installed datafiles, and otherwise the checksum is computed.
+    """
+    stat = csv_path.stat()
+    if stat.st_size != size:
+        return False
+    if stat.st_mtime_ns == mtime_ns or _is_installed(csv_path):
+        return True
+    return zlib.crc32(csv_path.read_bytes()) == crc
+
+
+def _is_installed(csv_path: Path) -> bool:
+    """
+    Check whether a datafile is part of an installed package
+
+    :param csv_path:
+    :return:
+    """
+    parents = csv_path.resolve().parents
+    return any(directory in parents for directory in INSTALL_DIRS)
+
+
+def write_snapshot(context: Context, csv_path: Union[str, Path]) -> Path:
+    """
+    Writes a snapshot of a context next to the datafile it was written to
+
+    The context should be the one that was just written to (or loaded from) the datafile.
+
+    :param context:
+    :param csv_path: path to the CSV datafile for the context
+    :return: path to the snapshot
+    """
+    csv_path = Path(csv_path)
+    payload = _payload(context, _fingerprint(csv_path))
+    path = snapshot_path(csv_path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as file:
+        pickle.dump(payload, file, protocol=PICKLE_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_snapshot(name: CONTEXT, csv_path: Union[str, Path]) -> Optional[Context]:
+    """
+    Loads a context from the snapshot compiled from a datafile, if it is present and fresh
+
+    :param name: name of the context
+    :param csv_path: path to the CSV datafile for the context
+    :return: None if there is no usable snapshot
+    """
+    payload = _read_payload(Path(csv_path))
+    if payload is None:
+        return None
+    try:
+        return _from_payload(name, payload)
+    except _CORRUPT:
+        return None
+
+
+def read_snapshot_columns(csv_path: Union[str, Path]) -> Optional[tuple]:
+    """
+    Loads the rows of a snapshot column-wise, without creating expansions
+
+    :param csv_path: path to the CSV datafile for the context
+    :return: (contexts, prefixes, namespaces, statuses, sources), statuses as codes into
+        :data:`STATUS_TYPES`; None if there is no usable snapshot
+    """
+    payload = _read_payload(Path(csv_path))
+    if payload is None:
+        return None
+    return payload[2:]
+
+
+def _read_payload(csv_path: Path) -> Optional[tuple]:
+    try:
+        with open(snapshot_path(csv_path), "rb") as file:
+            # the data directory is as trusted as the package itself
+            payload = pickle.load(file)  # noqa: S301
+        if payload[0] != FORMAT_VERSION or not _is_fresh(csv_path, *payload[1]):
+            return None
+        _check_columns(payload)
+    except (FileNotFoundError, *_CORRUPT):
+        return None
+    return payload
+
+
+def _check_columns(payload: tuple) -> None:
+    """Raise ValueError unless the columns of a payload are of the same length and valid."""
+    if len(payload) != 7 or len({len(column) for column in payload[2:]}) != 1:
+        raise ValueError("Malformed snapshot")
+    if max(payload[5], default=0) >= len(STATUS_TYPES):
+        raise ValueError("Malformed snapshot")
+
+
+def dumps_context(context: Context, tag: str) -> bytes:
+    """
+    Serializes a context as JSON
+
+    Unlike snapshots, serialized contexts are safe to load from untrusted locations. The
+    rows are stored column-wise, with the context and source names, which repeat, stored
+    once.
+
+    :param context:
+    :param tag: recorded alongside the rows, and checked by :func:`loads_context`
+    :return:
+    """
+    names: Dict[Optional[str], int] = {}
+    expansions = context.prefix_expansions
+    contexts = [names.setdefault(pe.context, len(names)) for pe in expansions]
+    sources = [names.setdefault(pe.expansion_source, len(names)) for pe in expansions]
+    payload = {
+        "version": JSON_FORMAT_VERSION,
+        "tag": tag,
+        "names": list(names),
+        "contexts": contexts,
+        "prefixes": [pe.prefix for pe in expansions],
+        "namespaces": [pe.namespace for pe in expansions],
+        "statuses": [_STATUS_CODES[pe.status] for pe in expansions],
+        "sources": sources,
+    }
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_context(name: CONTEXT, data: bytes, tag: str) -> Optional[Context]:
+    """
+    Deserializes a context serialized by :func:`dumps_context`
+
+    :param name: name of the context
+    :param data:
+    :param tag: the tag the context must have been serialized with
+    :return: None if the data is not a context serialized with this tag
+    """
+    try:
+        payload = json.loads(data)
+        if payload["version"] != JSON_FORMAT_VERSION or payload["tag"] != tag:
+            return None
+        return _from_json(name, payload)
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+def _from_json(name: CONTEXT, payload: dict) -> Context:
+    intern = sys.intern
+    names = [None if n is None else intern(n) for n in payload["names"]]
+    contexts: List[int] = payload["contexts"]
+    prefixes: List[str] = payload["prefixes"]
+    namespaces: List[str] = payload["namespaces"]
+    statuses: List[int] = payload["statuses"]
+    sources: List[int] = payload["sources"]
+    if len({len(contexts), len(prefixes), len(namespaces), len(statuses), len(sources)}) > 1:
+        raise ValueError("Malformed context")
+    if min(contexts + sources + statuses, default=0) < 0:
+        # would be valid, but wrong, list indexes
+        raise ValueError("Malformed context")
+    if not all(type(s) is str for s in prefixes) or not all(type(s) is str for s in namespaces):
+        raise ValueError("Malformed context")
+    context = Context(name=name)
+    context.prefix_expansions = list(
+        map(
+            PrefixExpansion,
+            map(names.__getitem__, contexts),
+            prefixes,
+            namespaces,
+            map(STATUS_TYPES.__getitem__, statuses),
+            map(names.__getitem__, sources),
+        )
+    )
+    return context
+
+
+def _payload(context: Context, fingerprint) -> tuple:
+    intern = sys.intern
+    expansions = context.prefix_expansions
+    return (
+        FORMAT_VERSION,
+        fingerprint,
+        tuple(intern(pe.context) for pe in expansions),
+        tuple(intern(pe.prefix) for pe in expansions),
+        tuple(intern(pe.namespace) for pe in expansions),
+        bytes(_STATUS_CODES[pe.status] for pe in expansions),
+        tuple(pe.expansion_source and intern(pe.expansion_source) for pe in expansions),
+    )
+
+
+def _from_payload(name: CONTEXT, payload: tuple) -> Context:
+    _, _, contexts, prefixes, namespaces, statuses, sources = payload
+    statuses = [STATUS_TYPES[code] for code in statuses]
+    context = Context(name=name)
+    context.prefix_expansions = list(
+        map(PrefixExpansion, contexts, prefixes, namespaces, statuses, sources)
+    )
+    return context
+
+
+def compile_snapshots(directory: Union[str, Path]) -> None:
+    """
+    Compiles snapshots for all context datafiles in a directory
+
+    :param directory:
+    :return:
+    """
+    from prefixmaps.io.parser import context_from_file
+
+    for csv_path in sorted(Path(directory).glob("*.csv")):
+        with open(csv_path, encoding="utf-8") as file:
+            context = context_from_file(csv_path.stem, file)
+        write_snapshot(context, csv_path)
@@ -0,0 +1,257 @@
+"""
+Watching context datafiles, reloading cached contexts when they change.
+
+Contexts are loaded once and cached (see :func:`prefixmaps.io.parser.load_context`).
+A :class:`ContextWatcher` notices when datafiles are regenerated, e.g. by
+``slurp-prefixmaps -d`` writing to the data directory of a running service, and reloads
+the cached contexts in a background thread, replacing each once it is fully loaded
+(see :func:`prefixmaps.io.parser.reload_context`). Callers never wait for a reload:
+until then, they get the context that was cached before.
+
+On Linux, changes are noticed through inotify; elsewhere, or if inotify is unavailable,
+by polling the modification times and sizes of the datafiles.
+"""
+
+import logging
+import os
+import select
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from prefixmaps.data import context_paths, data_path
+
+__all__ = [
+    "ContextWatcher",
+    "watching",
+]
+
+logger = logging.getLogger(__name__)
+
+SETTLE_SECONDS = 0.1
+"""Time to wait after a change is noticed, so that related writes are reloaded at once."""
+
+# inotify(7) events
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+_running: Set["ContextWatcher"] = set()
+_running_lock = threading.Lock()
+
+
+def watching(directory: Optional[Path] = None) -> bool:
+    """
+    Check whether a watcher is running, keeping cached contexts up to date.
+
+    While a directory is watched, :func:`prefixmaps.io.parser.load_context` returns the
+    contexts cached from it without checking whether their datafiles changed.
+
+    :param directory: if given, only watchers of this directory count
+    :return:
+    """
+    if directory is None:
+        return bool(_running)
+    with _running_lock:
+        return any(watcher.directory == directory for watcher in _running)
+
+
+def _inotify(directory: Path) -> Optional[int]:
+    """
+    Open an inotify descriptor watching a directory.
+
+    :param directory:
+    :return: None if inotify is not available
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes
+
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), _IN_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _drain(fd: int) -> None:
+    """Discard pending events; the directory is scanned for what changed."""
+    try:
+        while os.read(fd, 65536):
+            pass
+    except BlockingIOError:
+        pass
+
+
+class ContextWatcher:
+    """
+    Reloads cached contexts in a background thread when their datafiles change.
+
+    Watching is opt-in: start a watcher in long-running processes whose data directory
+    is rewritten while they run. It can be used as a context manager::
+
+        with ContextWatcher():
+            serve()
+
+    Only contexts that are cached are reloaded; others are loaded from the new
+    datafiles when first used. While the watcher runs, contexts cached from the watched
+    directory are used without checking their datafiles (see :func:`watching`). Datafiles
+    added to or removed from :data:`prefixmaps.data.data_path` are also added to or
+    removed from :data:`prefixmaps.data.context_paths`.
+    """
+
+    def __init__(
+        self,
+        interval: float = 1.0,
+        use_inotify: bool = True,
+        on_reload: Optional[Callable[[List[str]], None]] = None,
+    ):
+        """
+        :param interval: seconds between scans of the directory when polling
+        :param use_inotify: if False, always poll
+        :param on_reload: called from the watcher thread with the names of the contexts
+            reloaded after each change
+        """
+        from prefixmaps.io import parser  # imports this module
+
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        self.directory = parser.data_path
+        self.interval = interval
+        self.use_inotify = use_inotify
+        self.on_reload = on_reload
+        self.backend: Optional[str] = None
+        """How changes are noticed once started, "inotify" or "polling"."""
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._check_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._fd: Optional[int] = None
+        self._wakeup: Optional[Tuple[int, int]] = None
+
+    def start(self) -> "ContextWatcher":
+        """
+        Starts watching, first reloading cached contexts whose datafiles have changed.
+
+        :return: the watcher
+        """
+        if self._thread is not None:
+            raise ValueError("Watcher is already running")
+        self._fd = _inotify(self.directory) if self.use_inotify else None
+        self.backend = "polling" if self._fd is None else "inotify"
+        self._wakeup = os.pipe()
+        self._stop.clear()
+        with self._check_lock:
+            self._stamps = self._scan()
+            self._reload(sorted(self._stamps))
+        with _running_lock:
+            _running.add(self)
+        self._thread = threading.Thread(target=self._run, name="prefixmaps-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops watching, waiting for a reload in progress to finish."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        os.write(self._wakeup[1], b"\0")
+        self._thread.join()
+        self._thread = None
+        with _running_lock:
+            _running.discard(self)
+        for fd in (self._fd, *self._wakeup):
+            if fd is not None:
+                os.close(fd)
+        self._fd = self._wakeup = None
+
+    def __enter__(self) -> "ContextWatcher":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def check(self) -> List[str]:
+        """
+        Scans the directory once, reloading the cached contexts whose datafiles changed.
+
+        This is done by the watcher thread; call it to pick up changes immediately.
+
+        :return: names of the datafiles that changed, were added or were removed
+        """
+        with self._check_lock:
+            stamps = self._scan()
+            previous = self._stamps
+            changed = sorted(
+                name
+                for name in stamps.keys() | previous.keys()
+                if stamps.get(name) != previous.get(name)
+            )
+            self._stamps = stamps
+            if changed:
+                self._update_context_paths(stamps)
+                self._reload(changed)
+            return changed
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        stamps = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".csv") or entry.name.startswith("."):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                stamps[entry.name[: -len(".csv")]] = stat.st_mtime_ns, stat.st_size
+        return stamps
+
+    def _update_context_paths(self, stamps: Dict[str, Tuple[int, int]]) -> None:
+        if Path(self.directory) != data_path or set(stamps) == set(context_paths):
+            return
+        # published in one step, as other threads may be iterating over the paths
+        context_paths._publish({name: data_path / f"{name}.csv" for name in sorted(stamps)})
+
+    def _reload(self, names: List[str]) -> None:
+        from prefixmaps.io.parser import reload_context
+
+        reloaded = []
+        for name in names:
+            try:
+                if reload_context(name) is not None:
+                    reloaded.append(name)
+            except Exception:
+                # keep the cached context; the datafile is reloaded when it next changes
+                logger.exception(f"Failed to reload context {name}")
+        if reloaded:
+            logger.info(f"Reloaded contexts: {', '.join(reloaded)}")
+            if self.on_reload is not None:
+                self.on_reload(reloaded)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self._fd is None:
+                if self._stop.wait(self.interval):
+                    break
+            else:
+                ready, _, _ = select.select([self._fd, self._wakeup[0]], [], [], self.interval)
+                if self._stop.is_set():
+                    break
+                if self._fd in ready:
+                    if self._stop.wait(SETTLE_SECONDS):
+                        break
+                    _drain(self._fd)
+            try:
+                self.check()
+            except Exception:
+                logger.exception(f"Failed to check {self.directory} for changes")
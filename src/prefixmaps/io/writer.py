@@ -1,7 +1,31 @@
-from csv import DictWriter
-from typing import TextIO
+"""
+Writing contexts to files.
 
-from prefixmaps.datamodel.context import Context, PrefixExpansion, StatusType
+Besides the CSV datafiles, a context can be written as a JSON-LD context or as Turtle
+prefix declarations; :func:`write_context` writes several formats in one pass, sorting
+the expansions only once.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Collection, Dict, List, Optional, TextIO, Union
+
+from prefixmaps.datamodel.context import CONTEXT, Context, PrefixExpansion, StatusType
+from prefixmaps.io.snapshot import snapshot_path, write_snapshot
+
+__all__ = [
+    "FORMATS",
+    "sorted_expansions",
+    "context_to_file",
+    "context_to_jsonld",
+    "context_to_turtle",
+    "write_context",
+]
 
 STATUS_TYPE_ORDER = {
     StatusType.canonical: 0,
@@ -10,13 +34,42 @@ STATUS_TYPE_ORDER = {
     StatusType.multi_alias: 3,
 }
 
+FORMATS = {
+    "csv": ".csv",
+    "jsonld": ".context.jsonld",
+    "ttl": ".prefixes.ttl",
+    "snapshot": ".snapshot",
+}
+"""Formats written by :func:`write_context`, with the suffixes of their files."""
+
+PN_PREFIX_RE = re.compile(r"^[A-Za-z]([\w.-]*[\w-])?$")
+"""Prefixes that can be declared in Turtle (ASCII subset of PN_PREFIX)."""
+
 
 def _key(pe: PrefixExpansion):
     return pe.prefix.casefold(), STATUS_TYPE_ORDER[pe.status]
 
 
+def sorted_expansions(context: Context) -> List[PrefixExpansion]:
+    """
+    Get the expansions of a context in the order they are written
+
+    :param context:
+    :return:
+    """
+    return sorted(context.prefix_expansions, key=_key)
+
+
+def _expansions(context: Context, presorted: bool) -> List[PrefixExpansion]:
+    return context.prefix_expansions if presorted else sorted_expansions(context)
+
+
 def context_to_file(
-    context: Context, file: TextIO, *, include_expansion_source: bool = False
+    context: Context,
+    file: TextIO,
+    *,
+    include_expansion_source: bool = False,
+    presorted: bool = False,
 ) -> None:
     """
     Writes a context to a file
@@ -26,16 +79,125 @@ def context_to_file(
     :param include_expansion_source: If true, include a "source" column. This is useful for
         writing merged contexts since it says the highest priority simple context
         from which the row corresponding to a :class:`PrefixExpansion` came.
+    :param presorted: if True, the expansions are already in order (see
+        :func:`sorted_expansions`), and are written as they are
+    :return:
+    """
+    file.write(_render_csv(_expansions(context, presorted), include_expansion_source))
+
+
+def context_to_jsonld(context: Context, file: TextIO, *, presorted: bool = False) -> None:
+    """
+    Writes the canonical expansions of a context as a JSON-LD context
+
+    :param context:
+    :param file:
+    :param presorted: if True, the expansions are already in order
     :return:
     """
-    field_names = ["context", "prefix", "namespace", "status"]
+    file.write(_render_jsonld(_expansions(context, presorted)))
+
+
+def context_to_turtle(context: Context, file: TextIO, *, presorted: bool = False) -> None:
+    """
+    Writes the canonical expansions of a context as Turtle prefix declarations
+
+    Prefixes that cannot be declared in Turtle are skipped.
+
+    :param context:
+    :param file:
+    :param presorted: if True, the expansions are already in order
+    :return:
+    """
+    file.write(_render_turtle(_expansions(context, presorted)))
+
+
+def _render_csv(expansions: List[PrefixExpansion], include_expansion_source: bool) -> str:
+    output = io.StringIO()
+    writer = csv.writer(output)
     if include_expansion_source:
-        field_names.append("expansion_source")
-    writer = DictWriter(file, fieldnames=field_names)
-    writer.writeheader()
-    for pe in sorted(context.prefix_expansions, key=_key):
-        row = vars(pe)
-        row["status"] = pe.status.value
-        if not include_expansion_source:
-            row.pop("expansion_source", None)
-        writer.writerow(row)
+        writer.writerow(["context", "prefix", "namespace", "status", "expansion_source"])
+        writer.writerows(
+            (pe.context, pe.prefix, pe.namespace, pe.status.value, pe.expansion_source)
+            for pe in expansions
+        )
+    else:
+        writer.writerow(["context", "prefix", "namespace", "status"])
+        writer.writerows(
+            (pe.context, pe.prefix, pe.namespace, pe.status.value) for pe in expansions
+        )
+    return output.getvalue()
+
+
+def _render_jsonld(expansions: List[PrefixExpansion]) -> str:
+    prefix_map = {pe.prefix: pe.namespace for pe in expansions if pe.canonical()}
+    return json.dumps({"@context": prefix_map}, indent=2) + "\n"
+
+
+def _render_turtle(expansions: List[PrefixExpansion]) -> str:
+    return "".join(
+        f"@prefix {pe.prefix}: <{pe.namespace}> .\n"
+        for pe in expansions
+        if pe.canonical() and PN_PREFIX_RE.match(pe.prefix)
+    )
+
+
+def _write_if_changed(path: Path, data: bytes) -> bool:
+    try:
+        if path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    # atomically, so that processes loading or watching the file never see it partly written
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def write_context(
+    context: Context,
+    directory: Union[str, Path],
+    name: Optional[CONTEXT] = None,
+    formats: Collection[str] = ("csv",),
+    *,
+    include_expansion_source: bool = False,
+    presorted: bool = False,
+) -> Dict[str, Path]:
+    """
+    Writes a context to files in several formats, sorting its expansions once
+
+    Files whose contents are unchanged are left untouched, and others are replaced
+    atomically (see :mod:`prefixmaps.io.watch`). A snapshot is compiled from
+    the CSV, so requires the "csv" format, and is only rewritten when the CSV changes
+    (or is missing).
+
+    :param context:
+    :param directory:
+    :param name: base name of the files, defaults to the name of the context
+    :param formats: keys of :data:`FORMATS`
+    :param include_expansion_source: include the source column in the CSV
+    :param presorted: if True, the expansions are already in order
+    :return: the path of each format
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown formats: {sorted(unknown)}; expected some of {list(FORMATS)}")
+    if "snapshot" in formats and "csv" not in formats:
+        raise ValueError("A snapshot can only be written alongside the CSV")
+    directory = Path(directory)
+    name = name or context.name
+    paths = {format: directory / f"{name}{FORMATS[format]}" for format in formats}
+    expansions = _expansions(context, presorted)
+    csv_changed = False
+    if "csv" in formats:
+        data = _render_csv(expansions, include_expansion_source)
+        csv_changed = _write_if_changed(paths["csv"], data.encode("UTF-8"))
+    if "jsonld" in formats:
+        _write_if_changed(paths["jsonld"], _render_jsonld(expansions).encode("UTF-8"))
+    if "ttl" in formats:
+        _write_if_changed(paths["ttl"], _render_turtle(expansions).encode("UTF-8"))
+    if "snapshot" in formats and (csv_changed or not snapshot_path(paths["csv"]).exists()):
+        # in the order of the CSV, so that both load the same
+        write_snapshot(Context(context.name, prefix_expansions=expansions), paths["csv"])
+    return paths
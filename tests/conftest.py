@@ -0,0 +1,19 @@
+"""Keeps the tests from using or filling the user's cache directory."""
+
+import pytest
+
+from prefixmaps.ingest import fetch
+from prefixmaps.io.cache import CACHE_DIR_ENV
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cache_directory(tmp_path_factory):
+    """
+    Cache in a temporary directory, and never fall back to cached payloads when a
+    fetch fails, so that tests against upstream sources fail rather than pass on stale
+    data.
+    """
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path_factory.mktemp("cache")))
+        monkeypatch.setattr(fetch, "FALLBACK_TO_CACHE", False)
+        yield
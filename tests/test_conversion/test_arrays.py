@@ -0,0 +1,95 @@
+"""Tests for bulk conversion of NumPy and Arrow arrays."""
+
+import unittest
+
+from prefixmaps.conversion.trie import TrieConverter
+from prefixmaps.datamodel.context import Context, StatusType
+from prefixmaps.io.parser import load_context
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+@unittest.skipIf(np is None, "requires numpy")
+class TestArrayConverter(unittest.TestCase):
+    """Tests for bulk conversion of NumPy and Arrow arrays."""
+
+    def setUp(self) -> None:
+        from prefixmaps.conversion.arrays import ArrayConverter
+
+        self.context = load_context("merged")
+        self.converter = ArrayConverter.from_context(self.context)
+        canonical = Context("canonical")
+        for prefix, namespace in self.context.as_dict().items():
+            canonical.add_prefix(prefix, namespace, StatusType.canonical)
+        self.reference = TrieConverter.from_context(canonical)
+        self.uris = [
+            "http://purl.obolibrary.org/obo/GO_0008150",
+            "http://purl.obolibrary.org/obo/GO_",
+            "http://www.w3.org/2002/07/owl#Class",
+            "http://example.org/unknown/1",
+            "",
+            "http://identifiers.org/taxonomy/9606",
+        ] + [namespace + "x/y#z_1" for namespace in list(self.context.as_inverted_dict())[::7]]
+        self.curies = ["GO:0008150", "owl:Class", "nosuchprefix:1", "GO", "", "GO:"] + [
+            prefix + ":local:1" for prefix in list(self.context.as_dict())[::7]
+        ]
+
+    def assert_parity(self, expected, result, inputs):
+        for value, converted, unmatched, original in zip(
+            expected, list(result.values), result.unmatched.tolist(), inputs
+        ):
+            if value is None:
+                self.assertTrue(unmatched)
+                self.assertEqual(original, converted)
+            else:
+                self.assertFalse(unmatched)
+                self.assertEqual(value, converted)
+
+    def test_compress(self):
+        """Compression matches the element-wise converter."""
+        result = self.converter.compress(np.array(self.uris))
+        self.assert_parity(self.reference.compress_many(self.uris), result, self.uris)
+        self.assertEqual("GO:0008150", result.values[0])
+        self.assertEqual("GO:", result.values[1])
+
+    def test_expand(self):
+        """Expansion matches the element-wise converter."""
+        result = self.converter.expand(np.array(self.curies))
+        self.assert_parity(self.reference.expand_many(self.curies), result, self.curies)
+        self.assertEqual("http://purl.obolibrary.org/obo/GO_0008150", result.values[0])
+
+    def test_expand_to_itself(self):
+        """CURIEs expanding to themselves are matched."""
+        from prefixmaps.conversion.arrays import ArrayConverter
+
+        converter = ArrayConverter({"urn": "urn:", "x": "http://example.org/x/"})
+        result = converter.expand(np.array(["urn:1", "x:1", "y:1", "urn"]))
+        self.assertEqual(["urn:1", "http://example.org/x/1", "y:1", "urn"], list(result.values))
+        self.assertEqual([False, False, True, True], result.unmatched.tolist())
+
+    def test_object_arrays(self):
+        """Object arrays with nulls are supported, and nulls are unmatched."""
+        values = np.array(["GO:1", None, "nosuchprefix:1"], dtype=object)
+        result = self.converter.expand(values)
+        self.assertEqual(
+            ["http://purl.obolibrary.org/obo/GO_1", None, "nosuchprefix:1"], list(result.values)
+        )
+        self.assertEqual([False, True, True], result.unmatched.tolist())
+        self.assertEqual(0, len(self.converter.compress(np.array([], dtype=str)).values))
+
+    @unittest.skipIf(pa is None, "requires pyarrow")
+    def test_arrow(self):
+        """Arrow arrays are converted to Arrow arrays, preserving nulls."""
+        values = pa.chunked_array([["http://purl.obolibrary.org/obo/GO_1", None], ["x"]])
+        result = self.converter.compress(values)
+        self.assertIsInstance(result.values, pa.Array)
+        self.assertEqual(["GO:1", None, "x"], result.values.to_pylist())
+        self.assertEqual([False, True, True], result.unmatched.tolist())
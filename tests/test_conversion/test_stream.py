@@ -0,0 +1,86 @@
+"""Tests for streaming conversion and the convert command."""
+
+import io
+import os
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from prefixmaps.cli import main
+from prefixmaps.conversion.stream import convert_stream
+from prefixmaps.conversion.trie import TrieConverter
+from prefixmaps.io.parser import load_context
+
+GO = "http://purl.obolibrary.org/obo/GO_"
+TSV = f"id\tsubject\tobject\nr1\t{GO}1\t{GO}2\nr2\t{GO}3\thttp://example.org/x\n"
+TSV_COMPRESSED = "id\tsubject\tobject\nr1\tGO:1\tGO:2\nr2\tGO:3\thttp://example.org/x\n"
+
+
+class TestConvertStream(unittest.TestCase):
+    """Tests for :func:`convert_stream`."""
+
+    def setUp(self) -> None:
+        self.converter = TrieConverter.from_context(load_context("obo"))
+
+    def convert(self, text: str, **kwargs) -> str:
+        output = io.StringIO()
+        convert_stream(io.StringIO(text, newline=""), output, self.converter, **kwargs)
+        return output.getvalue()
+
+    def test_tsv(self):
+        """All columns are converted unless columns are selected, by index or name."""
+        self.assertEqual(TSV_COMPRESSED, self.convert(TSV, header=True))
+        self.assertEqual(TSV, self.convert(TSV_COMPRESSED, header=True, expand=True))
+        selected = f"id\tsubject\tobject\nr1\tGO:1\t{GO}2\nr2\tGO:3\thttp://example.org/x\n"
+        self.assertEqual(selected, self.convert(TSV, header=True, columns=[1]))
+        self.assertEqual(selected, self.convert(TSV, header=True, columns=["subject"]))
+        with self.assertRaises(ValueError):
+            self.convert(TSV, header=True, columns=["predicate"])
+
+    def test_csv(self):
+        """CSV records are parsed and written with quoting."""
+        text = f'"a, b",{GO}1\r\n"multi\nline",{GO}2\r\n'
+        expected = '"a, b",GO:1\n"multi\nline",GO:2\n'
+        self.assertEqual(expected, self.convert(text, format="csv"))
+
+    def test_ntriples(self):
+        """IRIs are compressed, literals are left alone, and terms expand back to IRIs."""
+        rdfs_label = "<http://www.w3.org/2000/01/rdf-schema#label>"
+        text = f'<{GO}1> {rdfs_label} "see <{GO}2>"@en .\n'
+        compressed = f'GO:1 {rdfs_label} "see <{GO}2>"@en .\n'
+        self.assertEqual(compressed, self.convert(text, format="nt"))
+        self.assertEqual(text, self.convert(compressed, format="nt", expand=True))
+
+    def test_parallel(self):
+        """Output order is preserved when chunks are converted in parallel."""
+        text = "".join(f"{GO}{i}\n" for i in range(1000))
+        expected = "".join(f"GO:{i}\n" for i in range(1000))
+        self.assertEqual(expected, self.convert(text, jobs=2, chunk_size=7))
+
+
+class TestConvertCommand(unittest.TestCase):
+    """Tests for ``prefixmaps convert``."""
+
+    def test_convert(self):
+        """The command converts standard input, and rejects unknown contexts."""
+        runner = CliRunner()
+        result = runner.invoke(main, ["convert", "-c", "obo", "--header"], input=TSV)
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual(TSV_COMPRESSED, result.output)
+        result = runner.invoke(
+            main, ["convert", "-c", "obo", "--header", "--expand", "-k", "2"], input=TSV_COMPRESSED
+        )
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual(f"r1\t{GO}1\tGO:2", result.output.splitlines()[1])
+        result = runner.invoke(main, ["convert", "-c", "nosuchcontext"], input=TSV)
+        self.assertEqual(2, result.exit_code)
+
+    def test_missing_input(self):
+        """A missing input file is a usage error."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "missing.tsv")
+            result = CliRunner().invoke(main, ["convert", "-c", "obo", path])
+        self.assertEqual(2, result.exit_code)
+        self.assertIn("does not exist", result.output)
+        self.assertNotIsInstance(result.exception, FileNotFoundError)
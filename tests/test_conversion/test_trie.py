@@ -0,0 +1,73 @@
+"""Tests for the radix trie converter."""
+
+import unittest
+
+from prefixmaps.conversion.trie import NamespaceTrie, TrieConverter
+from prefixmaps.io.parser import load_context, load_multi_context
+
+NAMES = ["obo", "go", "linked_data", "bioportal"]
+
+
+class TestNamespaceTrie(unittest.TestCase):
+    """Tests for the radix trie."""
+
+    def test_longest_match(self):
+        """The longest namespace wins, including when edges are split."""
+        trie = NamespaceTrie()
+        self.assertTrue(trie.add("http://example.org/", "ex"))
+        self.assertTrue(trie.add("http://example.org/a/", "a"))
+        self.assertTrue(trie.add("http://example.org/ab/", "ab"))
+        self.assertTrue(trie.add("http://example.com/", "com"))
+        self.assertTrue(trie.add("http://example.org/a", "a2"))
+        self.assertFalse(trie.add("http://example.org/", "ex2"))
+        self.assertEqual(5, len(trie))
+        self.assertEqual(("ex", 19), trie.longest_match("http://example.org/x"))
+        self.assertEqual(("a", 21), trie.longest_match("http://example.org/a/1"))
+        self.assertEqual(("ab", 22), trie.longest_match("http://example.org/ab/1"))
+        self.assertEqual(("a2", 20), trie.longest_match("http://example.org/ab"))
+        self.assertEqual(("com", 19), trie.longest_match("http://example.com/"))
+        self.assertIsNone(trie.longest_match("http://example.net/"))
+        self.assertIsNone(trie.longest_match("http://example.org"))
+        self.assertIsNone(trie.longest_match(""))
+
+
+class TestTrieConverter(unittest.TestCase):
+    """Tests for the radix trie converter."""
+
+    def setUp(self) -> None:
+        self.context = load_multi_context(NAMES)
+        self.converter = TrieConverter.from_context(self.context)
+
+    def test_parity_with_curies(self):
+        """Results are the same as for a :class:`curies.Converter`."""
+        reference = self.context.as_converter()
+        uris = []
+        curies = []
+        for pe in self.context.prefix_expansions:
+            uris.append(pe.namespace + "0001")
+            curies.append(pe.prefix + ":0001")
+        uris += ["http://example.org/unknown/1", ""]
+        curies += ["NOSUCHPREFIX:1"]
+        self.assertEqual(
+            [reference.compress(uri) for uri in uris], self.converter.compress_many(uris)
+        )
+        self.assertEqual([reference.expand(c) for c in curies], self.converter.expand_many(curies))
+        for uri in uris[:20]:
+            self.assertEqual(reference.compress(uri), self.converter.compress(uri))
+        for curie in curies[:20]:
+            self.assertEqual(reference.expand(curie), self.converter.expand(curie))
+        self.assertIsNone(self.converter.expand("GO"))
+        self.assertEqual([None], self.converter.expand_many([""]))
+
+    def test_roundtrip(self):
+        """CURIEs of canonical expansions roundtrip."""
+        converter = TrieConverter.from_context(load_context("merged"))
+        self.assertEqual(
+            "GO:0008150", converter.compress("http://purl.obolibrary.org/obo/GO_0008150")
+        )
+        self.assertEqual(
+            "http://purl.obolibrary.org/obo/GO_0008150", converter.expand("GO:0008150")
+        )
+        for prefix, namespace in list(converter.prefix_map.items())[::100]:
+            curie = f"{prefix}:123"
+            self.assertEqual(curie, converter.compress(converter.expand(curie)))
@@ -0,0 +1,84 @@
+"""Tests for bundles of contexts sharing one string pool and row store."""
+
+import unittest
+from unittest.mock import patch
+
+from prefixmaps.data import context_paths
+from prefixmaps.io import bundle as bundle_module
+from prefixmaps.io.bundle import ContextBundle
+from prefixmaps.io.parser import load_context
+
+
+class TestContextBundle(unittest.TestCase):
+    """Tests for bundles of contexts."""
+
+    def setUp(self) -> None:
+        self.bundle = ContextBundle.load()
+
+    def test_rows(self):
+        """Each bundled context has the rows of the context loaded on its own."""
+        self.assertEqual(sorted(context_paths), self.bundle.names())
+        for name in self.bundle.names():
+            with self.subTest(name=name):
+                ctxt = load_context(name)
+                bundled = self.bundle[name]
+                self.assertEqual(name, bundled.name)
+                self.assertEqual(ctxt.prefix_expansions, list(bundled.prefix_expansions))
+                self.assertEqual(ctxt.prefix_expansions[5:10], bundled.prefix_expansions[5:10])
+                self.assertEqual(ctxt.prefix_expansions[-1], bundled.prefix_expansions[-1])
+                n_rows = len(bundled.prefix_expansions)
+                for index in (n_rows, -n_rows - 1):
+                    with self.assertRaises(IndexError):
+                        bundled.prefix_expansions[index]
+                self.assertEqual(ctxt.as_dict(), bundled.as_dict())
+                self.assertEqual(ctxt.as_inverted_dict(), bundled.as_inverted_dict())
+
+    def test_sharing(self):
+        """Strings and identical rows are stored once, and aliases share their rows."""
+        bundle = self.bundle
+        self.assertEqual(len(bundle.strings), len(set(bundle.strings)))
+        n_rows = sum(len(bundle.views[name]) for name in bundle.names())
+        self.assertLess(len(bundle.statuses), n_rows)
+        shared = set(bundle.views["bioregistry"]) & set(bundle.views["bioregistry.upper"])
+        self.assertGreater(len(shared), 0)
+        bundle = ContextBundle.load(["merged", "merged.oak"])
+        self.assertIs(bundle.views["merged"], bundle.views["merged.oak"])
+        self.assertEqual(len(bundle.views["merged"]), len(bundle.statuses))
+
+    def test_aliases(self):
+        """Aliases share the rows of their canonical context, relabelled."""
+        bundle = ContextBundle.load(["merged", "merged.oak"])
+        self.assertEqual(["merged", "merged.oak"], bundle.names())
+        alias = bundle["merged.oak"]
+        self.assertEqual(
+            load_context("merged.oak").prefix_expansions, list(alias.prefix_expansions)
+        )
+        self.assertEqual("merged.oak", alias.prefix_expansions[0].context)
+        self.assertEqual("merged", bundle["merged"].prefix_expansions[0].context)
+        self.assertEqual(load_context("merged.oak").as_dict(), alias.as_dict())
+
+    def test_lookups(self):
+        """Bundled contexts support lookups, and are read-only."""
+        obo = self.bundle["obo"]
+        self.assertEqual("http://purl.obolibrary.org/obo/GO_", obo.as_dict()["GO"])
+        self.assertEqual("GO", obo.resolve_prefix("go").prefix)
+        with self.assertRaises(ValueError):
+            obo.add_prefix("x", "http://example.org/x/")
+        with self.assertRaises(ValueError):
+            obo.combine(load_context("go"))
+        with self.assertRaises(ValueError):
+            obo.apply_diff(obo.diff(load_context("go")))
+        self.assertEqual(load_context("obo").prefix_expansions, list(obo.prefix_expansions))
+        with self.assertRaises(KeyError):
+            self.bundle["unknown"]
+        with self.assertRaises(ValueError):
+            ContextBundle.load(["unknown"])
+
+    def test_csv(self):
+        """Contexts without a usable snapshot are read from the CSV."""
+        with patch.object(bundle_module, "read_snapshot_columns", return_value=None):
+            bundle = ContextBundle.load(["obo", "merged"])
+        for name in ["obo", "merged"]:
+            self.assertEqual(
+                load_context(name).prefix_expansions, list(bundle[name].prefix_expansions)
+            )
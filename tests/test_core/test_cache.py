@@ -0,0 +1,223 @@
+"""Tests for the in-process and on-disk caches of contexts and converters."""
+
+import json
+import os
+import pickle  # noqa: S403
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from prefixmaps.datamodel.context import PrefixExpansion, StatusType
+from prefixmaps.io import parser
+from prefixmaps.io.cache import CACHE_DIR_ENV, DiskCache
+from prefixmaps.io.parser import (
+    cache_clear,
+    cache_info,
+    load_context,
+    load_converter,
+    load_multi_context,
+)
+from prefixmaps.io.snapshot import loads_context
+from tests import OUTPUT_DIR
+
+
+class TestCache(unittest.TestCase):
+    """Tests for the in-process cache of contexts and converters."""
+
+    def setUp(self) -> None:
+        cache_clear()
+
+    def tearDown(self) -> None:
+        cache_clear()
+
+    def test_shared(self):
+        """Repeated loads return copies of one cached context, sharing its views."""
+        ctxt = load_context("obo")
+        other = load_context("obo")
+        self.assertIsNot(ctxt, other)
+        self.assertIs(ctxt._origin, other._origin)
+        self.assertIs(ctxt.as_converter(), other.as_converter())
+        self.assertIs(load_converter("obo"), load_converter(["obo"]))
+        merged = load_multi_context(["obo", "go"])
+        self.assertIs(merged._origin, load_multi_context(["obo", "go"])._origin)
+        self.assertIsNot(merged._origin, load_multi_context(["go", "obo"])._origin)
+        info = cache_info()
+        self.assertGreater(info.hits, 0)
+        self.assertEqual(info.maxsize, parser.CACHE_MAXSIZE)
+
+    def test_modify(self):
+        """Modifying a loaded context leaves the cached context unchanged."""
+        ctxt = load_context("obo")
+        converter = ctxt.as_converter()
+        ctxt.add_prefix("xyz", "http://example.org/xyz/")
+        ctxt.combine(load_context("linked_data"))
+        self.assertIn("xyz", ctxt.as_dict())
+        self.assertIn("owl", ctxt.as_dict())
+        self.assertIsNot(converter, ctxt.as_converter())
+        other = load_context("obo")
+        self.assertNotIn("xyz", other.as_dict())
+        self.assertNotIn("owl", other.as_dict())
+        self.assertIs(converter, load_converter("obo"))
+        self.assertIsNone(load_converter("obo").expand("xyz:1"))
+        other.prefix_expansions.append(
+            PrefixExpansion("obo", "abc", "http://example.org/abc/", StatusType.canonical)
+        )
+        self.assertIn("abc", other.as_dict())
+        self.assertNotIn("abc", load_context("obo").as_dict())
+
+    def test_cache_clear(self):
+        """Clearing the cache forces a reload."""
+        ctxt = load_context("obo")
+        cache_clear()
+        self.assertEqual(0, cache_info().currsize)
+        self.assertIsNot(ctxt._origin, load_context("obo")._origin)
+
+    def test_file_change(self):
+        """A modified datafile invalidates the cached context and dependent objects."""
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        shutil.copy(parser.context_path("go"), OUTPUT_DIR / "go.csv")
+        with mock.patch.object(parser, "data_path", OUTPUT_DIR):
+            ctxt = load_context("go")
+            converter = load_converter("go")
+            merged = load_multi_context(["go", "go"])
+            with open(OUTPUT_DIR / "go.csv", "a", encoding="utf-8") as file:
+                file.write("go,NEWPREFIX,http://example.org/new/,canonical\n")
+            stat = os.stat(OUTPUT_DIR / "go.csv")
+            os.utime(OUTPUT_DIR / "go.csv", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            ctxt2 = load_context("go")
+            self.assertIsNot(ctxt._origin, ctxt2._origin)
+            self.assertIn("NEWPREFIX", ctxt2.as_dict())
+            self.assertIsNot(converter, load_converter("go"))
+            self.assertIsNot(merged._origin, load_multi_context(["go", "go"])._origin)
+
+    def test_refresh_repopulates(self):
+        """Refreshing bypasses the cache and replaces the cached context."""
+        ctxt = load_context("go")
+        sentinel = parser.Context("go")
+        with mock.patch(
+            "prefixmaps.ingest.etl_runner.load_context_from_source", return_value=sentinel
+        ):
+            self.assertIs(sentinel, load_context("go", refresh=True)._origin)
+        self.assertIs(sentinel, load_context("go")._origin)
+        self.assertIsNot(ctxt._origin, load_context("go")._origin)
+
+    def test_combined_aliases(self):
+        """Combined contexts with the same components are copies of one, relabelled."""
+        merged = load_context("merged")
+        merged.as_converter()
+        oak = load_context("merged.oak")
+        self.assertEqual("merged.oak", oak.name)
+        self.assertEqual({"merged.oak"}, {pe.context for pe in oak.prefix_expansions})
+        self.assertEqual(
+            [pe.as_tuple()[1:] for pe in merged.prefix_expansions],
+            [pe.as_tuple()[1:] for pe in oak.prefix_expansions],
+        )
+        self.assertIs(merged.as_converter(), oak.as_converter())
+        self.assertIs(oak._origin, load_context("merged.oak")._origin)
+        self.assertEqual("merged.oak", oak.resolve_prefix("GO").context)
+        self.assertEqual(merged.as_dict(), load_context("merged.monarch").as_dict())
+
+    def test_composed(self):
+        """Combined contexts without a datafile are composed from their components."""
+        combined = {"obo.go": ["obo", "go"], "obo.go.alias": ["obo", "go"]}
+        with mock.patch.dict(parser.COMBINED, combined):
+            ctxt = load_context("obo.go")
+            self.assertIs(ctxt._origin, load_context("obo.go")._origin)
+            expected = load_multi_context(["obo", "go"])
+            self.assertEqual(
+                [pe.as_tuple()[1:] for pe in expected.prefix_expansions],
+                [pe.as_tuple()[1:] for pe in ctxt.prefix_expansions],
+            )
+            alias = load_context("obo.go.alias")
+            self.assertEqual(len(ctxt.prefix_expansions), len(alias.prefix_expansions))
+            self.assertEqual("obo.go.alias", alias.prefix_expansions[0].context)
+
+
+class TestDiskCache(unittest.TestCase):
+    """Tests for the on-disk cache of merged contexts."""
+
+    def setUp(self) -> None:
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.environ = mock.patch.dict(os.environ, {CACHE_DIR_ENV: self.cache_dir.name})
+        self.environ.start()
+        cache_clear()
+
+    def tearDown(self) -> None:
+        cache_clear()
+        self.environ.stop()
+        self.cache_dir.cleanup()
+
+    def test_reload(self):
+        """Merged contexts are reloaded from disk, without merging, until a datafile changes."""
+        names = ["go", "obo"]
+        merged = load_multi_context(names, disk_cache=True)
+        self.assertEqual(1, len(list((Path(self.cache_dir.name) / "contexts").iterdir())))
+        cache_clear()
+        with mock.patch.object(parser.Context, "combine", side_effect=AssertionError):
+            reloaded = load_multi_context(names, disk_cache=True)
+        self.assertEqual("go+obo", reloaded.name)
+        self.assertEqual(merged.prefix_expansions, reloaded.prefix_expansions)
+        self.assertIs(reloaded._origin, load_multi_context(names, disk_cache=True)._origin)
+
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        for name in names:
+            shutil.copy(parser.context_path(name), OUTPUT_DIR / f"{name}.csv")
+        with mock.patch.object(parser, "data_path", OUTPUT_DIR):
+            with open(OUTPUT_DIR / "go.csv", "a", encoding="utf-8") as file:
+                file.write("go,NEWPREFIX,http://example.org/new/,canonical\n")
+            changed = load_multi_context(names, disk_cache=True)
+        self.assertIn("NEWPREFIX", changed.as_dict())
+        cache_clear(disk=True)
+        self.assertEqual([], list((Path(self.cache_dir.name) / "contexts").iterdir()))
+
+    def test_format(self):
+        """Entries are JSON, and unusable entries are merged again and replaced."""
+        names = ["go", "obo"]
+        merged = load_multi_context(names, disk_cache=True)
+        (path,) = (Path(self.cache_dir.name) / "contexts").iterdir()
+        payload = json.loads(path.read_bytes())
+        self.assertEqual(len(merged.prefix_expansions), len(payload["prefixes"]))
+        malformed = [
+            pickle.dumps(payload),
+            path.read_bytes()[:100],
+            json.dumps({**payload, "tag": "other"}).encode(),
+            json.dumps({**payload, "statuses": [-1] * len(payload["statuses"])}).encode(),
+            json.dumps({**payload, "prefixes": payload["prefixes"][1:]}).encode(),
+            json.dumps({**payload, "names": [1]}).encode(),
+            b"[]",
+        ]
+        for data in malformed:
+            with self.subTest(data=data[:20]):
+                path.write_bytes(data)
+                cache_clear()
+                self.assertIsNone(loads_context("go+obo", data, path.name))
+                reloaded = load_multi_context(names, disk_cache=True)
+                self.assertEqual(merged.prefix_expansions, reloaded.prefix_expansions)
+                self.assertEqual(payload, json.loads(path.read_bytes()))
+
+    def test_opt_in(self):
+        """The on-disk cache is only used when enabled."""
+        load_multi_context(["go", "obo"])
+        self.assertFalse((Path(self.cache_dir.name) / "contexts").exists())
+        with mock.patch.dict(os.environ, {parser.DISK_CACHE_ENV: "1"}):
+            load_multi_context(["obo", "go"])
+        self.assertTrue((Path(self.cache_dir.name) / "contexts").exists())
+
+    def test_eviction(self):
+        """Least recently used entries are evicted when over size."""
+        cache = DiskCache(Path(self.cache_dir.name), maxbytes=25)
+        cache.put("a", b"0123456789")
+        cache.put("b", b"0123456789")
+        past = time.time() - 60
+        os.utime(Path(self.cache_dir.name) / "a", (past, past))
+        os.utime(Path(self.cache_dir.name) / "b", (past - 60, past - 60))
+        self.assertEqual(b"0123456789", cache.get("b"))
+        cache.put("c", b"0123456789")
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        with self.assertRaises(ValueError):
+            cache.get("../a")
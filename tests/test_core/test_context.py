@@ -0,0 +1,391 @@
+"""Tests for lookups and indexes on contexts."""
+
+import json
+import pickle  # noqa: S403
+import unittest
+from copy import deepcopy
+
+from prefixmaps.datamodel.context import Context, PrefixExpansion, StatusType
+from prefixmaps.io.parser import load_context
+
+
+class TestContextIndex(unittest.TestCase):
+    """Tests for the prefix and namespace indexes of a context."""
+
+    def setUp(self) -> None:
+        self.context = load_context("merged")
+
+    def test_filter_parity(self):
+        """Indexed filtering gives the same results as scanning."""
+        ctxt = self.context
+        for prefix in sorted(ctxt.prefixes())[::50]:
+            with self.subTest(prefix=prefix):
+                self.assertEqual(
+                    ctxt.filter(prefix=prefix, use_index=False), ctxt.filter(prefix=prefix)
+                )
+        for namespace in sorted(ctxt.namespaces())[::50]:
+            with self.subTest(namespace=namespace):
+                self.assertEqual(
+                    ctxt.filter(namespace=namespace, use_index=False),
+                    ctxt.filter(namespace=namespace),
+                )
+        pe = ctxt.prefix_expansions[0]
+        self.assertEqual(
+            ctxt.filter(prefix=pe.prefix, namespace=pe.namespace, use_index=False),
+            ctxt.filter(prefix=pe.prefix, namespace=pe.namespace),
+        )
+        self.assertEqual([], ctxt.filter(prefix=pe.prefix, namespace="http://example.org/"))
+        self.assertEqual(ctxt.prefix_expansions, ctxt.filter())
+
+    def test_get_by(self):
+        """Exact and case-insensitive lookups."""
+        ctxt = self.context
+        [pe] = [pe for pe in ctxt.get_by_prefix("GO") if pe.canonical()]
+        self.assertEqual("http://purl.obolibrary.org/obo/GO_", pe.namespace)
+        self.assertEqual([], ctxt.get_by_prefix("gO"))
+        self.assertIn(pe, ctxt.get_by_prefix("gO", case_insensitive=True))
+        self.assertIn(pe, ctxt.get_by_namespace("http://purl.obolibrary.org/obo/GO_"))
+        self.assertIn(
+            pe, ctxt.get_by_namespace("http://purl.obolibrary.org/obo/go_", case_insensitive=True)
+        )
+        self.assertEqual([], ctxt.get_by_prefix("NO-SUCH-PREFIX"))
+
+    def test_invalidation(self):
+        """Indexes reflect expansions added after they were built."""
+        ctxt = deepcopy(self.context)
+        self.assertEqual([], ctxt.filter(prefix="xyzxyz"))
+        ctxt.add_prefix("xyzxyz", "http://example.org/xyzxyz/")
+        [pe] = ctxt.filter(prefix="xyzxyz")
+        self.assertEqual(StatusType.canonical, pe.status)
+        appended = PrefixExpansion(ctxt.name, "abcabc", "http://example.org/abc/", pe.status)
+        ctxt.prefix_expansions.append(appended)
+        self.assertEqual([appended], ctxt.get_by_prefix("abcabc"))
+        ctxt.prefix_expansions = []
+        self.assertEqual([], ctxt.get_by_prefix("abcabc"))
+
+    def test_replaced_expansions(self):
+        """Indexes are rebuilt when the expansions are replaced, or changed in place on request."""
+        ctxt = Context("test")
+        ctxt.add_prefix("A", "http://example.org/a/")
+        self.assertEqual({"A": "http://example.org/a/"}, ctxt.as_dict())
+        b, c = (
+            PrefixExpansion("test", prefix, f"http://example.org/{prefix}/", StatusType.canonical)
+            for prefix in "BC"
+        )
+        ctxt.prefix_expansions = [b]
+        self.assertEqual([b], ctxt.filter(prefix="B"))
+        self.assertEqual({"B": "http://example.org/B/"}, ctxt.as_dict())
+        ctxt.prefix_expansions[0] = c
+        self.assertEqual(["C"], ctxt.prefixes())
+        self.assertEqual(["C"], ctxt.prefixes(force=False))
+        self.assertEqual([c], ctxt.filter(prefix="C"))
+        self.assertEqual({"C": "http://example.org/C/"}, ctxt.as_dict())
+        # a copy of a cached context stops using the shared index
+        shared = load_context("go")
+        shared.prefix_expansions = [b]
+        self.assertEqual([b], shared.get_by_prefix("B"))
+        self.assertEqual({"B": "http://example.org/B/"}, shared.as_dict())
+        self.assertIn("GO", load_context("go").as_dict())
+
+    def test_empty(self):
+        """Lookups on an empty context."""
+        ctxt = Context("empty")
+        self.assertEqual([], ctxt.filter(prefix="x"))
+        self.assertEqual([], ctxt.get_by_namespace("http://example.org/"))
+
+
+class TestAddPrefix(unittest.TestCase):
+    """Tests for adding prefixes to a context."""
+
+    def test_add_prefixes(self):
+        """Bulk additions classify expansions the same way as individual additions."""
+        pairs = [
+            ("GO", "http://purl.obolibrary.org/obo/GO_"),
+            ("go", "http://example.org/go/"),
+            ("GOGO", "http://purl.obolibrary.org/obo/go_"),
+            ("GO", "http://purl.obolibrary.org/obo/GO_"),
+            ("x", "http://example.org/x/"),
+        ]
+        expected = Context("test")
+        for prefix, namespace in pairs:
+            expected.add_prefix(prefix, namespace)
+        ctxt = Context("test")
+        ctxt.add_prefixes(pairs)
+        self.assertEqual(expected.prefix_expansions, ctxt.prefix_expansions)
+        self.assertEqual(
+            [
+                StatusType.canonical,
+                StatusType.prefix_alias,
+                StatusType.namespace_alias,
+                StatusType.canonical,
+            ],
+            [pe.status for pe in ctxt.prefix_expansions],
+        )
+
+    def test_combine_precedence(self):
+        """Expansions that conflict with the context are aliases, or dropped."""
+        go = "http://purl.obolibrary.org/obo/GO_"
+        cl = "http://purl.obolibrary.org/obo/CL_"
+        canonical = StatusType.canonical
+        prefix_alias = StatusType.prefix_alias
+        namespace_alias = StatusType.namespace_alias
+        other = Context("other")
+        other.prefix_expansions = [
+            PrefixExpansion("other", prefix, namespace, status)
+            for prefix, namespace, status in [
+                ("go", "http://example.org/go/", canonical),
+                ("GOGO", go, canonical),
+                ("Go", go.lower(), canonical),
+                ("cl", cl, namespace_alias),
+                ("CLX", cl.upper(), canonical),
+                ("cl", "http://example.org/cl/", prefix_alias),
+                ("X", "http://example.org/x/", prefix_alias),
+            ]
+        ]
+        for upper in (False, True):
+            with self.subTest(upper=upper):
+                ctxt = Context("test", upper=upper)
+                ctxt.add_prefix("GO", go, expansion_source="test")
+                ctxt.combine(other)
+                cased = str.upper if upper else str
+                self.assertEqual(
+                    [
+                        ("test", "GO", go, canonical, "test"),
+                        ("test", cased("go"), "http://example.org/go/", prefix_alias, "other"),
+                        ("test", "GOGO", go, namespace_alias, "other"),
+                        ("test", cased("cl"), cl, namespace_alias, "other"),
+                        ("test", "CLX", cl.upper(), namespace_alias, "other"),
+                        ("test", cased("cl"), "http://example.org/cl/", prefix_alias, "other"),
+                        ("test", "X", "http://example.org/x/", prefix_alias, "other"),
+                    ],
+                    [pe.as_tuple() for pe in ctxt.prefix_expansions],
+                )
+                self.assertEqual({"GO": go}, ctxt.as_dict())
+
+    def test_combine(self):
+        """Combining gives the same expansions as adding each row in order."""
+        components = [load_context(name) for name in ["obo", "go", "linked_data", "prefixcc"]]
+        for upper in (False, True):
+            with self.subTest(upper=upper):
+                expected = Context("test", upper=upper)
+                ctxt = Context("test", upper=upper)
+                for component in components:
+                    for pe in component.prefix_expansions:
+                        expected.add_prefix(
+                            pe.prefix, pe.namespace, pe.status, expansion_source=component.name
+                        )
+                    ctxt.combine(component)
+                self.assertEqual(expected.prefix_expansions, ctxt.prefix_expansions)
+                self.assertEqual(expected.as_dict(), ctxt.as_dict())
+                self.assertEqual(
+                    ctxt.filter(prefix="GO", use_index=False), ctxt.filter(prefix="GO")
+                )
+
+    def test_index_coherence(self):
+        """Prefix and namespace sets are consistent regardless of call order."""
+        ctxt = Context("test", upper=True)
+        ctxt.add_prefix("go", "http://purl.obolibrary.org/obo/GO_")
+        self.assertEqual(["GO"], ctxt.prefixes())
+        self.assertEqual({"go"}, set(ctxt.prefixes(lower=True, as_list=False)))
+        ctxt.prefix_expansions.append(
+            PrefixExpansion(
+                "test", "CL", "http://purl.obolibrary.org/obo/CL_", StatusType.canonical
+            )
+        )
+        self.assertIn("http://purl.obolibrary.org/obo/cl_", ctxt.namespaces(lower=True))
+        ctxt.add_prefix("cl", "http://example.org/cl/")
+        self.assertEqual(StatusType.prefix_alias, ctxt.prefix_expansions[-1].status)
+        self.assertEqual({"GO", "CL"}, set(ctxt.prefixes(as_list=False)))
+
+
+class TestViews(unittest.TestCase):
+    """Tests for the cached prefix maps and converter of a context."""
+
+    def setUp(self) -> None:
+        self.context = Context("test")
+        self.context.add_prefixes(
+            [
+                ("GO", "http://purl.obolibrary.org/obo/GO_"),
+                ("go", "http://example.org/go/"),
+                ("GOGO", "http://purl.obolibrary.org/obo/GO_"),
+            ]
+        )
+
+    def test_prefix_maps(self):
+        """Prefix maps are copies of cached maps, kept up to date as prefixes are added."""
+        ctxt = self.context
+        prefix_map = ctxt.as_dict()
+        self.assertEqual({"GO": "http://purl.obolibrary.org/obo/GO_"}, prefix_map)
+        self.assertEqual({"http://purl.obolibrary.org/obo/GO_": "GO"}, ctxt.as_inverted_dict())
+        prefix_map["X"] = "http://example.org/x/"
+        self.assertNotIn("X", ctxt.as_dict())
+        ctxt.add_prefix("CL", "http://purl.obolibrary.org/obo/CL_")
+        other = Context("other")
+        other.add_prefix("x", "http://example.org/x/")
+        ctxt.combine(other)
+        ctxt.prefix_expansions.append(
+            PrefixExpansion("test", "Y", "http://example.org/y/", StatusType.canonical)
+        )
+        expected = {pe.prefix: pe.namespace for pe in ctxt.prefix_expansions if pe.canonical()}
+        self.assertEqual(expected, ctxt.as_dict())
+        self.assertEqual({v: k for k, v in expected.items()}, ctxt.as_inverted_dict())
+        # plain dicts, as before they were cached
+        for mapping in (ctxt.as_dict(), ctxt.as_inverted_dict()):
+            self.assertIs(dict, type(mapping))
+            self.assertEqual(mapping, json.loads(json.dumps(mapping)))
+            self.assertEqual(mapping, pickle.loads(pickle.dumps(mapping)))  # noqa: S301
+
+    def test_in_place_changes(self):
+        """Views are rebuilt after the expansions are modified in place."""
+        ctxt = self.context
+        self.assertIn("GO", ctxt.as_dict())
+        ctxt.prefix_expansions.pop(0)
+        ctxt.prefix_expansions.pop(0)
+        self.assertEqual({}, ctxt.as_dict())
+        ctxt.prefix_expansions[0].status = StatusType.canonical
+        ctxt.add_prefix("CL", "http://purl.obolibrary.org/obo/CL_", force=True)
+        self.assertEqual({"GOGO", "CL"}, set(ctxt.as_dict()))
+
+    def test_reindex(self):
+        """Views are rebuilt after the expansions are replaced, or changed in place and reindexed."""
+        ctxt = self.context
+        converter = ctxt.as_converter()
+        ctxt.prefix_expansions[0].status = StatusType.prefix_alias
+        ctxt.prefix_expansions[1].status = StatusType.canonical
+        ctxt.reindex()
+        self.assertEqual({"go": "http://example.org/go/"}, ctxt.as_dict())
+        self.assertEqual({"http://example.org/go/": "go"}, ctxt.as_inverted_dict())
+        self.assertEqual("go", ctxt.resolve_prefix("GO").prefix)
+        self.assertIsNot(converter, ctxt.as_converter())
+        self.assertEqual("go:1", ctxt.as_converter().compress("http://example.org/go/1"))
+        ctxt.prefix_expansions = ctxt.prefix_expansions[:1]
+        self.assertEqual({}, ctxt.as_dict())
+        self.assertEqual([], ctxt.as_extended_prefix_map())
+
+    def test_converter(self):
+        """The extended prefix map and converter are reused until prefixes are added."""
+        ctxt = self.context
+        records = ctxt.as_extended_prefix_map()
+        self.assertEqual(records, ctxt.as_extended_prefix_map())
+        self.assertEqual(["GOGO"], records[0].prefix_synonyms)
+        converter = ctxt.as_converter()
+        self.assertIs(converter, ctxt.as_converter())
+        ctxt.add_prefix("CL", "http://purl.obolibrary.org/obo/CL_")
+        self.assertIsNot(converter, ctxt.as_converter())
+        self.assertEqual(
+            "CL:1", ctxt.as_converter().compress("http://purl.obolibrary.org/obo/CL_1")
+        )
+        self.assertEqual(2, len(ctxt.as_extended_prefix_map()))
+
+
+class TestResolve(unittest.TestCase):
+    """Tests for resolving prefixes and namespaces to canonical expansions."""
+
+    def setUp(self) -> None:
+        self.context = Context("test")
+        self.context.add_prefix("GO", "http://purl.obolibrary.org/obo/GO_")
+        self.context.add_prefix("GO", "http://identifiers.org/go/")
+        self.context.add_prefix("gene_ontology", "http://purl.obolibrary.org/obo/GO_")
+        self.context.add_prefix("dcterms", "http://purl.org/dc/terms/")
+
+    def test_resolve_prefix(self):
+        """Prefixes resolve to canonical expansions, ignoring case by default."""
+        ctxt = self.context
+        go = ctxt.prefix_expansions[0]
+        self.assertIs(go, ctxt.resolve_prefix("GO"))
+        self.assertIs(go, ctxt.resolve_prefix("go"))
+        self.assertIsNone(ctxt.resolve_prefix("go", case_insensitive=False))
+        self.assertIs(go, ctxt.resolve_prefix("Gene_Ontology"))
+        self.assertIsNone(ctxt.resolve_prefix("unknown"))
+
+    def test_resolve_namespace(self):
+        """Namespaces resolve to canonical expansions, normalized by default."""
+        ctxt = self.context
+        go, _, _, dcterms = ctxt.prefix_expansions
+        for namespace in [
+            "http://purl.obolibrary.org/obo/GO_",
+            "HTTP://PURL.OBOLIBRARY.ORG/obo/GO_",
+            "https://purl.obolibrary.org/obo/GO_",
+            "https://identifiers.org/go",
+        ]:
+            self.assertIs(go, ctxt.resolve_namespace(namespace))
+        self.assertIs(dcterms, ctxt.resolve_namespace("https://purl.org/dc/terms"))
+        self.assertIsNone(ctxt.resolve_namespace("http://purl.org/dc/terms", normalize=False))
+        self.assertIsNone(ctxt.resolve_namespace("http://example.org/"))
+
+    def test_invalidation(self):
+        """The lookup index is rebuilt after prefixes are added."""
+        ctxt = self.context
+        self.assertIsNone(ctxt.resolve_prefix("owl"))
+        ctxt.add_prefix("owl", "http://www.w3.org/2002/07/owl#")
+        self.assertEqual("owl", ctxt.resolve_prefix("OWL").prefix)
+
+    def test_merged(self):
+        """Canonical expansions of bundled contexts resolve to themselves, by any case."""
+        ctxt = load_context("merged")
+        for pe in ctxt.prefix_expansions:
+            if pe.canonical():
+                self.assertIs(pe, ctxt.resolve_prefix(pe.prefix.swapcase()))
+                self.assertIs(pe, ctxt.resolve_prefix(pe.prefix, case_insensitive=False))
+                self.assertIs(pe, ctxt.resolve_namespace(pe.namespace, normalize=False))
+
+
+class TestDiff(unittest.TestCase):
+    """Tests for comparing and patching versions of a context."""
+
+    def setUp(self) -> None:
+        expansions = load_context("prefixcc").prefix_expansions
+        self.old = Context("prefixcc", prefix_expansions=list(expansions[:-100]))
+        new_expansions = list(expansions[50:])
+        # a change of status, as when an alias becomes canonical upstream
+        new_expansions[0] = PrefixExpansion(
+            "prefixcc",
+            new_expansions[0].prefix,
+            new_expansions[0].namespace,
+            StatusType.multi_alias,
+        )
+        self.new = Context("prefixcc", prefix_expansions=new_expansions)
+
+    def test_diff(self):
+        """Added, removed and changed expansions are found."""
+        diff = self.old.diff(self.new)
+        self.assertEqual(self.new.prefix_expansions[-100:], diff.added)
+        self.assertEqual(self.old.prefix_expansions[:50], diff.removed)
+        self.assertEqual(
+            [(self.old.prefix_expansions[50], self.new.prefix_expansions[0])], diff.changed
+        )
+        self.assertFalse(diff.empty)
+        self.assertTrue(self.new.diff(self.new).empty)
+
+    def test_apply_diff(self):
+        """Patching gives the same expansions, lookups and views as the new version."""
+        ctxt = self.old
+        converter = ctxt.as_converter()
+        removed = ctxt.prefix_expansions[0]
+        ctxt.apply_diff(ctxt.diff(self.new))
+        self.assertEqual(
+            sorted(pe.as_tuple() for pe in self.new.prefix_expansions),
+            sorted(pe.as_tuple() for pe in ctxt.prefix_expansions),
+        )
+        self.assertEqual(self.new.as_dict(), ctxt.as_dict())
+        self.assertEqual(self.new.as_inverted_dict(), ctxt.as_inverted_dict())
+        self.assertEqual(self.new.as_extended_prefix_map(), ctxt.as_extended_prefix_map())
+        self.assertIsNot(converter, ctxt.as_converter())
+        added = self.new.prefix_expansions[-1]
+        self.assertEqual(added.prefix, ctxt.as_converter().compress(added.namespace + "1")[:-2])
+        self.assertEqual([], ctxt.get_by_prefix(removed.prefix))
+        fresh = Context("prefixcc", prefix_expansions=list(ctxt.prefix_expansions))
+        for pe in self.new.prefix_expansions[::100]:
+            self.assertEqual(
+                fresh.get_by_namespace(pe.namespace, case_insensitive=True),
+                ctxt.get_by_namespace(pe.namespace, case_insensitive=True),
+            )
+        self.assertTrue(ctxt.diff(self.new).empty)
+
+    def test_invalid_diff(self):
+        """Diffs computed against another context are rejected, leaving it unchanged."""
+        diff = self.old.diff(self.new)
+        expansions = list(self.new.prefix_expansions)
+        with self.assertRaises(ValueError):
+            self.new.apply_diff(diff)
+        self.assertEqual(expansions, self.new.prefix_expansions)
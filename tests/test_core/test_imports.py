@@ -0,0 +1,42 @@
+"""Checks that importing the package defers importing its dependencies."""
+
+import subprocess
+import sys
+import unittest
+
+from tests.test_perf.bench import import_times
+
+DEFERRED = ["curies", "pydantic", "yaml", "csv", "importlib.metadata"]
+"""Modules that must only be imported when a feature needing them is used."""
+
+
+class TestImports(unittest.TestCase):
+    """Checks that importing the package defers importing its dependencies."""
+
+    def test_import(self):
+        """Importing the package imports none of its dependencies."""
+        baseline = import_times("pass")
+        times = import_times("import prefixmaps")
+        imported = set(times) - set(baseline)
+        for module in DEFERRED:
+            self.assertNotIn(module, imported)
+
+    def test_load_context(self):
+        """Loading a context imports neither curies nor yaml."""
+        baseline = import_times("pass")
+        times = import_times("from prefixmaps import load_context; load_context('go').as_dict()")
+        imported = set(times) - set(baseline)
+        self.assertIn("prefixmaps.io.parser", imported)
+        for module in ["curies", "pydantic", "yaml"]:
+            self.assertNotIn(module, imported)
+
+    def test_lazy_names(self):
+        """Public names and the version resolve on first use."""
+        code = (
+            "import prefixmaps, sys; "
+            "assert 'prefixmaps.io.parser' not in sys.modules; "
+            "assert prefixmaps.load_context.__module__ == 'prefixmaps.io.parser'; "
+            "assert prefixmaps.__version__; "
+            "assert set(prefixmaps.__all__) <= set(dir(prefixmaps))"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
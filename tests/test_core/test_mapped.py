@@ -0,0 +1,113 @@
+"""Tests for memory-mapped read-only contexts."""
+
+import unittest
+
+from prefixmaps.datamodel.context import Context, StatusType
+from prefixmaps.io.mapped import open_mapped_context, write_mapped_context
+from prefixmaps.io.parser import load_context
+from tests import OUTPUT_DIR
+
+
+class TestMappedContext(unittest.TestCase):
+    """Tests for memory-mapped read-only contexts."""
+
+    def setUp(self) -> None:
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        self.context = load_context("merged")
+        path = write_mapped_context(self.context, OUTPUT_DIR / "merged.table")
+        self.mapped = open_mapped_context(path)
+
+    def tearDown(self) -> None:
+        self.mapped.prefix_expansions.close()
+
+    def test_rows(self):
+        """Rows are materialized identically to the source context."""
+        self.assertEqual("merged", self.mapped.name)
+        expansions = self.mapped.prefix_expansions
+        self.assertEqual(len(self.context.prefix_expansions), len(expansions))
+        self.assertEqual(self.context.prefix_expansions, list(expansions))
+        self.assertEqual(self.context.prefix_expansions[-1], expansions[-1])
+        self.assertEqual(self.context.prefix_expansions[10:20], expansions[10:20])
+        for index in (len(expansions), -len(expansions) - 1):
+            with self.assertRaises(IndexError):
+                expansions[index]
+
+    def test_views(self):
+        """The mapping and converter APIs give the same results as the source context."""
+        self.assertEqual(self.context.as_dict(), self.mapped.as_dict())
+        self.assertEqual(self.context.as_inverted_dict(), self.mapped.as_inverted_dict())
+        obo = load_context("obo")
+        path = write_mapped_context(obo, OUTPUT_DIR / "obo.table")
+        mapped_obo = open_mapped_context(path)
+        self.assertEqual(obo.as_converter().prefix_map, mapped_obo.as_converter().prefix_map)
+        mapped_obo.prefix_expansions.close()
+
+    def test_lookups(self):
+        """Lookups give the same results as the source context, without keeping expansions."""
+        ctxt, mapped = self.context, self.mapped
+        for prefix in ("GO", "go", "geo", "NO-SUCH-PREFIX"):
+            with self.subTest(prefix=prefix):
+                self.assertEqual(ctxt.filter(prefix=prefix), mapped.filter(prefix=prefix))
+                self.assertEqual(
+                    ctxt.get_by_prefix(prefix, case_insensitive=True),
+                    mapped.get_by_prefix(prefix, case_insensitive=True),
+                )
+                self.assertEqual(ctxt.resolve_prefix(prefix), mapped.resolve_prefix(prefix))
+        namespace = "http://purl.obolibrary.org/obo/GO_"
+        self.assertEqual(
+            ctxt.get_by_namespace(namespace.lower(), case_insensitive=True),
+            mapped.get_by_namespace(namespace.lower(), case_insensitive=True),
+        )
+        self.assertEqual(ctxt.resolve_namespace(namespace), mapped.resolve_namespace(namespace))
+        self.assertEqual(ctxt.prefixes(lower=True), mapped.prefixes(lower=True))
+        self.assertEqual(ctxt.namespaces(), mapped.namespaces())
+        self.assertEqual(ctxt.as_extended_prefix_map(), mapped.as_extended_prefix_map())
+        self.assertIs(mapped.as_extended_prefix_map()[0], mapped.as_extended_prefix_map()[0])
+        self.assertTrue(mapped.diff(ctxt).empty)
+        self.assertTrue(ctxt.diff(mapped).empty)
+        # no index of materialized expansions
+        self.assertIsNone(mapped._index)
+
+    def test_equality(self):
+        """Mapped contexts equal contexts with the same expansions."""
+        ctxt = Context("merged", prefix_expansions=list(self.context.prefix_expansions))
+        self.assertEqual(ctxt, self.mapped)
+        self.assertEqual(self.mapped, ctxt)
+        self.assertEqual(self.mapped.prefix_expansions, ctxt.prefix_expansions)
+        ctxt.prefix_expansions.pop()
+        self.assertNotEqual(ctxt, self.mapped)
+        self.assertNotEqual(Context("other", prefix_expansions=ctxt.prefix_expansions), self.mapped)
+
+    def test_read_only(self):
+        """Mapped contexts cannot be modified, but can be combined into other contexts."""
+        for modify in (
+            lambda: self.mapped.add_prefix("x", "http://example.org/x/"),
+            lambda: self.mapped.add_prefixes([("x", "http://example.org/x/")]),
+            lambda: self.mapped.combine(load_context("obo")),
+            lambda: self.mapped.apply_diff(self.mapped.diff(load_context("obo"))),
+        ):
+            with self.assertRaises(ValueError):
+                modify()
+        self.assertEqual(self.context.prefix_expansions, list(self.mapped.prefix_expansions))
+        expected = Context("copy")
+        expected.combine(load_context("obo"))
+        expected.combine(self.context)
+        ctxt = Context("copy")
+        ctxt.combine(load_context("obo"))
+        ctxt.combine(self.mapped)
+        self.assertEqual(expected.prefix_expansions, ctxt.prefix_expansions)
+
+    def test_empty(self):
+        """Empty contexts can be mapped."""
+        path = write_mapped_context(Context("empty"), OUTPUT_DIR / "empty.table")
+        mapped = open_mapped_context(path)
+        self.assertEqual(0, len(mapped.prefix_expansions))
+        self.assertEqual({}, mapped.as_dict())
+        mapped.prefix_expansions.close()
+
+    def test_status(self):
+        """Statuses can be read without materializing rows."""
+        table = self.mapped.prefix_expansions
+        for row in (0, 1, len(table) - 1):
+            self.assertEqual(self.context.prefix_expansions[row].status, table.status(row))
+        self.assertIn(StatusType.canonical, {table.status(row) for row in range(len(table))})
@@ -0,0 +1,84 @@
+"""Tests for precompiled context snapshots."""
+
+import pickle  # noqa: S403
+import shutil
+import unittest
+from unittest.mock import patch
+
+from prefixmaps.io import snapshot
+from prefixmaps.io.parser import context_from_file, context_path
+from prefixmaps.io.snapshot import (
+    read_snapshot,
+    read_snapshot_columns,
+    snapshot_path,
+    write_snapshot,
+)
+from tests import OUTPUT_DIR
+
+
+class TestSnapshot(unittest.TestCase):
+    """Tests for precompiled context snapshots."""
+
+    def setUp(self) -> None:
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        self.csv_path = OUTPUT_DIR / "merged.csv"
+        shutil.copy(context_path("merged"), self.csv_path)
+        snapshot_path(self.csv_path).unlink(missing_ok=True)
+        with open(self.csv_path, encoding="utf-8") as file:
+            self.context = context_from_file("merged", file)
+
+    def test_roundtrip(self):
+        """A snapshot loads the same rows as the CSV."""
+        self.assertIsNone(read_snapshot("merged", self.csv_path))
+        write_snapshot(self.context, self.csv_path)
+        ctxt = read_snapshot("merged", self.csv_path)
+        self.assertEqual("merged", ctxt.name)
+        self.assertEqual(self.context.prefix_expansions, ctxt.prefix_expansions)
+        self.assertEqual(self.context.as_dict(), ctxt.as_dict())
+
+    def test_stale(self):
+        """A snapshot is ignored once the CSV changes."""
+        write_snapshot(self.context, self.csv_path)
+        with open(self.csv_path, "a", encoding="utf-8") as file:
+            file.write("merged,NEWPREFIX,http://example.org/new/,canonical,\n")
+        self.assertIsNone(read_snapshot("merged", self.csv_path))
+
+    def test_installed(self):
+        """Installed datafiles with the recorded size are trusted whatever their mtime."""
+        write_snapshot(self.context, self.csv_path)
+        data = self.csv_path.read_bytes()
+        self.csv_path.write_bytes(data.replace(b"merged,GO,", b"merged,XX,", 1))
+        self.assertIsNone(read_snapshot("merged", self.csv_path))
+        with patch.object(snapshot, "INSTALL_DIRS", (OUTPUT_DIR.resolve(),)):
+            ctxt = read_snapshot("merged", self.csv_path)
+            self.assertEqual(self.context.prefix_expansions, ctxt.prefix_expansions)
+            self.csv_path.write_bytes(data + b"\n")
+            self.assertIsNone(read_snapshot("merged", self.csv_path))
+
+    def test_corrupt(self):
+        """A truncated or malformed snapshot is ignored."""
+        path = write_snapshot(self.context, self.csv_path)
+        data = path.read_bytes()
+        payload = pickle.loads(data)  # noqa: S301
+        malformed = [
+            data[: len(data) // 2],
+            pickle.dumps(payload[:3]),
+            pickle.dumps(payload[:5] + (b"\xff" * len(payload[5]), payload[6])),
+            pickle.dumps(payload[:4] + (payload[4][:10],) + payload[5:]),
+            pickle.dumps(None),
+        ]
+        for data in malformed:
+            with self.subTest(data=data[:20]):
+                path.write_bytes(data)
+                self.assertIsNone(read_snapshot("merged", self.csv_path))
+                self.assertIsNone(read_snapshot_columns(self.csv_path))
+
+    def test_bundled(self):
+        """Bundled snapshots are in sync with the bundled CSVs."""
+        for name in ["obo", "bioregistry", "merged"]:
+            with self.subTest(name=name):
+                with open(context_path(name), encoding="utf-8") as file:
+                    expected = context_from_file(name, file)
+                ctxt = read_snapshot(name, context_path(name))
+                self.assertIsNotNone(ctxt)
+                self.assertEqual(expected.prefix_expansions, ctxt.prefix_expansions)
@@ -0,0 +1,70 @@
+import unittest
+from unittest.mock import patch
+
+from prefixmaps.data import context_names
+from prefixmaps.datamodel import validation
+from prefixmaps.datamodel.context import Context
+from prefixmaps.datamodel.validation import (
+    ValidationIssue,
+    invalid_values,
+    validate_contexts,
+)
+from prefixmaps.io.parser import load_context
+
+
+class TestValidation(unittest.TestCase):
+    """Tests batch validation of prefix expansions."""
+
+    def setUp(self) -> None:
+        self.context = Context("test")
+        self.context.add_prefix("good", "http://example.org/good/")
+        self.context.add_prefix("bad prefix", "http://example.org/bad/")
+        self.context.add_prefix("ns", "ftp://example.org/ns/")
+        self.context.add_prefix("both:", "urn:both")
+
+    def test_issues(self):
+        """Issues are structured records, in the order of the expansions."""
+        self.assertEqual(
+            [
+                ValidationIssue("test", "bad prefix", "http://example.org/bad/", "prefix"),
+                ValidationIssue("test", "ns", "ftp://example.org/ns/", "namespace"),
+                ValidationIssue("test", "both:", "urn:both", "prefix"),
+                ValidationIssue("test", "both:", "urn:both", "namespace"),
+            ],
+            self.context.validation_issues(),
+        )
+
+    def test_messages(self):
+        """Messages are the same as from validating each expansion."""
+        for name in ["merged", "prefixcc"]:
+            ctxt = load_context(name)
+            for canonical_only in [True, False]:
+                expected = [
+                    message
+                    for pe in ctxt.prefix_expansions
+                    if pe.canonical() or not canonical_only
+                    for message in pe.validate()
+                ]
+                self.assertEqual(expected, ctxt.validate(canonical_only=canonical_only))
+
+    def test_validate_contexts(self):
+        """Validating several contexts at once gives the same issues as one by one."""
+        contexts = [load_context(name) for name in context_names()]
+        issues = validate_contexts(contexts, canonical_only=False)
+        self.assertEqual([ctxt.name for ctxt in contexts], list(issues))
+        for ctxt in contexts:
+            self.assertEqual(ctxt.validation_issues(canonical_only=False), issues[ctxt.name])
+
+    def test_parallel(self):
+        """Matching in worker processes gives the same values."""
+        values = [f"http://example.org/{i}/" for i in range(100)] + ["bad", "bad", "also bad"]
+        with patch.object(validation, "PARALLEL_MIN_VALUES", 10):
+            self.assertEqual(
+                {"bad", "also bad"}, invalid_values(values, validation.NAMESPACE_RE, jobs=2)
+            )
+        ctxt = load_context("prefixcc")
+        with patch.object(validation, "PARALLEL_MIN_VALUES", 100):
+            self.assertEqual(
+                ctxt.validation_issues(canonical_only=False),
+                ctxt.validation_issues(canonical_only=False, jobs=2),
+            )
@@ -0,0 +1,146 @@
+"""Tests for reloading cached contexts when their datafiles change."""
+
+import tempfile
+import threading
+import unittest
+from contextlib import ExitStack
+from pathlib import Path
+from unittest.mock import patch
+
+from prefixmaps.data import COMBINED, context_paths
+from prefixmaps.datamodel.context import Context
+from prefixmaps.io import parser, watch
+from prefixmaps.io.parser import cache_clear, load_context, load_multi_context
+from prefixmaps.io.watch import ContextWatcher, watching
+from prefixmaps.io.writer import write_context
+
+
+def _context(name: str, n: int) -> Context:
+    ctxt = Context(name)
+    ctxt.add_prefixes([(f"{name}{i}", f"http://example.org/{name}/{i}/") for i in range(n)])
+    return ctxt
+
+
+class TestContextWatcher(unittest.TestCase):
+    """Tests for watching a data directory."""
+
+    def setUp(self) -> None:
+        stack = ExitStack()
+        self.addCleanup(stack.close)
+        self.directory = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        stack.enter_context(patch.object(parser, "data_path", self.directory))
+        stack.enter_context(patch.dict(COMBINED, {"ab": ["a", "b"], "ab.alias": ["a", "b"]}))
+        for name in ("a", "b"):
+            write_context(_context(name, 3), self.directory)
+        cache_clear()
+        self.addCleanup(cache_clear)
+
+    def _rewrite(self, name: str, n: int) -> None:
+        write_context(_context(name, n), self.directory)
+
+    def test_check(self):
+        """Changed datafiles are reloaded, with the views that had been built."""
+        old = load_context("a")
+        old.as_converter()
+        with ContextWatcher(interval=60, use_inotify=False) as watcher:
+            self.assertTrue(watching())
+            self.assertTrue(watching(self.directory))
+            self.assertFalse(watching(self.directory / "other"))
+            self.assertEqual([], watcher.check())
+            self._rewrite("a", 5)
+            self._rewrite("c", 1)
+            # callers get the cached context until it is reloaded
+            self.assertIs(old._origin, load_context("a")._origin)
+            self.assertEqual(["a", "c"], watcher.check())
+            new = load_context("a")
+            self.assertIsNot(old._origin, new._origin)
+            self.assertEqual(5, len(new.prefix_expansions))
+            self.assertEqual(3, len(old.prefix_expansions))
+            self.assertIsNotNone(new._canonical_views().converter)
+            self.assertEqual(["c0"], list(load_context("c").as_dict()))
+        self.assertFalse(watching())
+        # without a watcher, changes are picked up by the next call
+        self._rewrite("a", 2)
+        self.assertEqual(2, len(load_context("a").prefix_expansions))
+
+    def test_context_paths(self):
+        """Datafiles added to or removed from the data directory are published at once."""
+        paths = dict(context_paths)
+        self.addCleanup(context_paths._publish, paths)
+        with patch.object(watch, "data_path", self.directory):
+            with ContextWatcher(interval=60, use_inotify=False) as watcher:
+                names = iter(context_paths)
+                self._rewrite("c", 1)
+                (self.directory / "a.csv").unlink()
+                self.assertEqual(["a", "c"], watcher.check())
+                self.assertEqual(["b", "c"], sorted(context_paths))
+                self.assertEqual(self.directory / "c.csv", context_paths["c"])
+                # iterating over the previous version is unaffected
+                self.assertEqual(sorted(paths), sorted(names))
+
+    def test_dependents(self):
+        """Combined contexts, their aliases and merged contexts are rebuilt."""
+        combined = load_context("ab")
+        alias = load_context("ab.alias")
+        merged = load_multi_context(["b", "a"], disk_cache=False)
+        combined.as_converter()
+        with ContextWatcher(interval=60, use_inotify=False) as watcher:
+            self._rewrite("b", 4)
+            self.assertIs(merged._origin, load_multi_context(["b", "a"], disk_cache=False)._origin)
+            self.assertEqual(["b"], watcher.check())
+            info = parser.cache_info()
+            new = load_context("ab")
+            new_alias = load_context("ab.alias")
+            new_merged = load_multi_context(["b", "a"], disk_cache=False)
+            # all served from the cache
+            self.assertEqual(info.misses, parser.cache_info().misses)
+        self.assertEqual(7, len(new.prefix_expansions))
+        self.assertIsNot(combined._origin, new._origin)
+        self.assertIsNotNone(new._canonical_views().converter)
+        self.assertIsNot(alias._origin, new_alias._origin)
+        self.assertEqual("ab.alias", new_alias.name)
+        self.assertIs(new.as_converter(), new_alias.as_converter())
+        self.assertEqual(7, len(new_merged.prefix_expansions))
+
+    def test_background(self):
+        """The watcher thread reloads changed datafiles."""
+        old = load_context("a")
+        reloaded = threading.Event()
+        names = []
+
+        def _on_reload(reloaded_names):
+            names.extend(reloaded_names)
+            reloaded.set()
+
+        for use_inotify in (True, False):
+            with self.subTest(use_inotify=use_inotify):
+                reloaded.clear()
+                names.clear()
+                with ContextWatcher(interval=0.05, use_inotify=use_inotify, on_reload=_on_reload):
+                    self._rewrite("a", 6 if use_inotify else 7)
+                    self.assertTrue(reloaded.wait(10))
+                self.assertEqual(["a"], names)
+                self.assertIsNot(old._origin, load_context("a")._origin)
+                old = load_context("a")
+
+    def test_failed_reload(self):
+        """A datafile that cannot be loaded leaves the cached context in place."""
+        old = load_context("a")
+        with ContextWatcher(interval=60, use_inotify=False) as watcher:
+            (self.directory / "a.csv").write_text("context,prefix,namespace,status\na,x,y,bad\n")
+            with self.assertLogs("prefixmaps.io.watch", "ERROR"):
+                self.assertEqual(["a"], watcher.check())
+            self.assertIs(old._origin, load_context("a")._origin)
+
+    def test_errors(self):
+        """Invalid arguments and restarting are errors."""
+        with self.assertRaises(ValueError):
+            ContextWatcher(interval=0)
+        with ContextWatcher(use_inotify=False) as watcher:
+            self.assertEqual("polling", watcher.backend)
+            with self.assertRaises(ValueError):
+                watcher.start()
+
+
+if __name__ == "__main__":
+    unittest.main()
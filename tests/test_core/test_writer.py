@@ -0,0 +1,94 @@
+"""Tests for writing contexts to files."""
+
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from prefixmaps.datamodel.context import Context, StatusType
+from prefixmaps.io.parser import context_from_file, context_path, load_context
+from prefixmaps.io.snapshot import read_snapshot
+from prefixmaps.io.writer import (
+    context_to_file,
+    context_to_jsonld,
+    context_to_turtle,
+    sorted_expansions,
+    write_context,
+)
+
+
+class TestWriter(unittest.TestCase):
+    """Tests for writing contexts to files."""
+
+    def setUp(self) -> None:
+        self.context = Context("test")
+        self.context.add_prefixes(
+            [
+                ("go", "http://purl.obolibrary.org/obo/GO_"),
+                ("GO", "http://example.org/go/"),
+                ("bad prefix", "http://example.org/bad/"),
+                ("CL", "http://purl.obolibrary.org/obo/CL_"),
+            ]
+        )
+
+    def test_csv(self):
+        """Datafiles are written as distributed, and without modifying the context."""
+        merged = load_context("merged")
+        before = [pe.as_tuple() for pe in merged.prefix_expansions]
+        output = io.StringIO(newline="")
+        context_to_file(merged, output, include_expansion_source=True)
+        self.assertEqual(context_path("merged").read_bytes(), output.getvalue().encode("UTF-8"))
+        self.assertEqual(before, [pe.as_tuple() for pe in merged.prefix_expansions])
+
+    def test_presorted(self):
+        """Presorted expansions are written in the order given."""
+        output = io.StringIO()
+        context_to_file(self.context, output, presorted=True)
+        prefixes = [row.split(",")[1] for row in output.getvalue().splitlines()[1:]]
+        self.assertEqual(["go", "GO", "bad prefix", "CL"], prefixes)
+        output = io.StringIO()
+        context_to_file(self.context, output)
+        prefixes = [row.split(",")[1] for row in output.getvalue().splitlines()[1:]]
+        self.assertEqual(["bad prefix", "CL", "go", "GO"], prefixes)
+
+    def test_jsonld_turtle(self):
+        """Canonical expansions are written as a JSON-LD context and as Turtle prefixes."""
+        output = io.StringIO()
+        context_to_jsonld(self.context, output)
+        self.assertEqual(self.context.as_dict(), json.loads(output.getvalue())["@context"])
+        output = io.StringIO()
+        context_to_turtle(self.context, output)
+        self.assertEqual(
+            [
+                "@prefix CL: <http://purl.obolibrary.org/obo/CL_> .",
+                "@prefix go: <http://purl.obolibrary.org/obo/GO_> .",
+            ],
+            output.getvalue().splitlines(),
+        )
+
+    def test_write_context(self):
+        """All formats are written in one call, and unchanged files are left untouched."""
+        formats = ["csv", "jsonld", "ttl", "snapshot"]
+        with tempfile.TemporaryDirectory() as directory:
+            paths = write_context(self.context, directory, "other", formats)
+            self.assertEqual(Path(directory) / "other.context.jsonld", paths["jsonld"])
+            mtimes = {path: path.stat().st_mtime_ns for path in Path(directory).iterdir()}
+            self.assertEqual(4, len(mtimes))
+            with open(paths["csv"]) as file:
+                from_csv = context_from_file("other", file)
+            from_snapshot = read_snapshot("other", paths["csv"])
+            self.assertEqual(from_csv.prefix_expansions, from_snapshot.prefix_expansions)
+            self.assertEqual(sorted_expansions(self.context), from_csv.prefix_expansions)
+
+            write_context(self.context, directory, "other", formats)
+            self.assertEqual(mtimes, {path: path.stat().st_mtime_ns for path in mtimes})
+            self.context.add_prefix("X", "http://example.org/x/", StatusType.canonical)
+            write_context(self.context, directory, "other", formats)
+            self.assertNotEqual(mtimes[paths["csv"]], paths["csv"].stat().st_mtime_ns)
+            self.assertIn("X", read_snapshot("other", paths["csv"]).as_dict())
+
+            with self.assertRaises(ValueError):
+                write_context(self.context, directory, formats=["xml"])
+            with self.assertRaises(ValueError):
+                write_context(self.context, directory, formats=["snapshot"])
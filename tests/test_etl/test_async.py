@@ -0,0 +1,167 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from typing import Dict, List, Mapping, Optional
+from unittest.mock import patch
+
+import requests
+
+from prefixmaps.datamodel.context import Context
+from prefixmaps.ingest import etl_runner
+from prefixmaps.ingest import fetch as fetch_module
+from prefixmaps.ingest.fetch import OFFLINE_ENV, Response, afetch
+from prefixmaps.ingest.ingest_go import URL as GO_URL
+from prefixmaps.ingest.ingest_go import aparse_go_xrefs_from_remote, parse_go_xrefs
+from prefixmaps.ingest.ingest_jsonld import (
+    PREFIXCC_EXCLUDE,
+    PREFIXCC_URL,
+    afrom_prefixcc,
+    from_jsonld_context_file,
+)
+from prefixmaps.ingest.ingest_shacl import OBO_URL, afrom_obo, from_shacl_file
+from prefixmaps.io.cache import CACHE_DIR_ENV
+from prefixmaps.io.parser import aload_context, cache_clear, load_context
+from tests import INPUT_DIR
+
+FIXTURES = {
+    OBO_URL: "obo_prefixes.ttl",
+    GO_URL: "go-db-xrefs.yaml",
+    PREFIXCC_URL: "prefix-cc.context.jsonld",
+}
+
+
+class _FakeTransport:
+    """Serves fixed payloads with ETags after a delay, recording the requests it receives."""
+
+    def __init__(self, payloads: Dict[str, bytes], delay: float = 0.0):
+        self.payloads = payloads
+        self.delay = delay
+        self.reachable = True
+        self.status: Optional[int] = None
+        """If set, the status of every response."""
+        self.requests: List[tuple] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get(self, url: str, headers: Mapping[str, str]) -> Response:
+        if not self.reachable:
+            raise ConnectionError(f"cannot reach {url}")
+        self.requests.append((url, headers.get("If-None-Match")))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        body = self.payloads.get(url)
+        if self.status is not None:
+            return Response(self.status, b"", None, {})
+        if body is None:
+            return Response(404, b"", None, {})
+        etag = f'"{hash(body)}"'
+        if headers.get("If-None-Match") == etag:
+            return Response(304, b"", None, {})
+        return Response(200, body, "utf-8", {"ETag": etag})
+
+
+class TestAsync(unittest.TestCase):
+    """Tests for asynchronous fetching and ingest, with a fake transport."""
+
+    def setUp(self) -> None:
+        self.cache_dir = tempfile.TemporaryDirectory()
+        environ = {CACHE_DIR_ENV: self.cache_dir.name, OFFLINE_ENV: ""}
+        self.environ = patch.dict(os.environ, environ)
+        self.environ.start()
+        payloads = {url: (INPUT_DIR / path).read_bytes() for url, path in FIXTURES.items()}
+        self.transport = _FakeTransport(payloads, delay=0.05)
+
+    def tearDown(self) -> None:
+        self.environ.stop()
+        self.cache_dir.cleanup()
+        cache_clear()
+
+    @patch.object(fetch_module, "FALLBACK_TO_CACHE", True)
+    def test_afetch(self):
+        """Payloads are cached and revalidated, as when fetched synchronously."""
+        transport = self.transport
+
+        async def _run():
+            first = await afetch(OBO_URL, transport=transport)
+            second = await afetch(OBO_URL, transport=transport)
+            return first, second
+
+        first, second = asyncio.run(_run())
+        self.assertEqual(("network", "revalidated"), (first.source, second.source))
+        self.assertEqual(first.content, second.content)
+        self.assertIsNotNone(transport.requests[-1][1])
+        transport.reachable = False
+        self.assertEqual("cache", asyncio.run(afetch(OBO_URL, transport=transport)).source)
+        with self.assertRaises(ConnectionError):
+            asyncio.run(afetch(GO_URL, transport=transport))
+        transport.reachable = True
+        with self.assertRaises(requests.HTTPError):
+            asyncio.run(afetch("http://example.org/missing", transport=transport))
+        transport.status = 503
+        self.assertEqual("cache", asyncio.run(afetch(OBO_URL, transport=transport)).source)
+        with self.assertRaises(requests.HTTPError):
+            asyncio.run(afetch(GO_URL, transport=transport))
+
+    def test_ingests(self):
+        """Asynchronous ingests give the same contexts as parsing the sources."""
+        transport = self.transport
+
+        async def _run():
+            return await asyncio.gather(
+                afrom_obo(transport),
+                aparse_go_xrefs_from_remote(transport),
+                afrom_prefixcc(transport),
+            )
+
+        obo, go, prefixcc = asyncio.run(_run())
+        expected = [
+            from_shacl_file(str(INPUT_DIR / "obo_prefixes.ttl"), "obo", format="turtle"),
+            parse_go_xrefs((INPUT_DIR / "go-db-xrefs.yaml").read_text()),
+            from_jsonld_context_file(
+                str(INPUT_DIR / "prefix-cc.context.jsonld"), "prefixcc", PREFIXCC_EXCLUDE
+            ),
+        ]
+        for ctxt, expected_ctxt in zip([obo, go, prefixcc], expected):
+            self.assertEqual(expected_ctxt.prefix_expansions, ctxt.prefix_expansions)
+        # fetched concurrently
+        self.assertEqual(3, transport.max_in_flight)
+
+    def test_combined(self):
+        """Sources of combined contexts are fetched concurrently, and combined in order."""
+        transport = self.transport
+        combined = {"offline": ["obo", "linked_data", "go", "prefixcc"]}
+        with patch.dict(etl_runner.COMBINED, combined, clear=True):
+            ctxt = asyncio.run(etl_runner.aload_context_from_source("offline", transport))
+        self.assertEqual(3, transport.max_in_flight)
+        expected = Context("offline")
+        for name in combined["offline"]:
+            with patch.dict(os.environ, {OFFLINE_ENV: "1"}):
+                expected.combine(etl_runner.load_context_from_source(name))
+        self.assertEqual(expected.prefix_expansions, ctxt.prefix_expansions)
+
+    def test_aload_context(self):
+        """Refreshed contexts replace cached ones, and the event loop is not blocked."""
+        transport = self.transport
+        ticks = []
+
+        async def _tick():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0.01)
+
+        async def _run():
+            ticker = asyncio.ensure_future(_tick())
+            try:
+                return await aload_context("go", refresh=True, transport=transport)
+            finally:
+                ticker.cancel()
+
+        ctxt = asyncio.run(_run())
+        self.assertIs(ctxt._origin, load_context("go")._origin)
+        self.assertGreater(len(ticks), 2)
+        self.assertIs(asyncio.run(aload_context("go"))._origin, ctxt._origin)
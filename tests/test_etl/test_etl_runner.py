@@ -0,0 +1,211 @@
+import csv
+import json
+import tempfile
+import threading
+import unittest
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+from unittest.mock import patch
+
+from prefixmaps.datamodel.context import Context
+from prefixmaps.ingest import etl_runner
+from prefixmaps.ingest.manifest import MANIFEST_NAME
+from prefixmaps.io.parser import context_from_file
+from prefixmaps.io.snapshot import read_snapshot
+
+
+def _source(name: str, *pairs):
+    def _getter() -> Context:
+        context = Context(name)
+        for prefix, namespace in pairs:
+            context.add_prefix(prefix, namespace)
+        return context
+
+    return _getter
+
+
+SOURCES = {
+    # named differently from its source, like linked_data
+    "a": _source("alpha", ("X", "http://example.org/x/"), ("Y", "http://example.org/y/")),
+    "b": _source("b", ("X", "http://example.org/other/"), ("Z", "http://example.org/z/")),
+    "bioregistry": _source("bioregistry", ("W", "http://example.org/w/")),
+}
+COMBINED = {"ab": ["a", "b"], "ba": ["b", "a"]}
+
+
+def _mtimes(directory):
+    """Get the modification times of the outputs in a directory."""
+    paths = Path(directory).iterdir()
+    return {path.name: path.stat().st_mtime_ns for path in paths if path.name != MANIFEST_NAME}
+
+
+def _fingerprints(**fingerprints):
+    return {name: (lambda value=value: value) for name, value in fingerprints.items()}
+
+
+@contextmanager
+def _patched_etl(
+    sources: Dict[str, Callable[[], Context]],
+    combined: Dict[str, List[str]],
+    inputs: Optional[Dict[str, Callable[[], str]]] = None,
+) -> Iterator[str]:
+    """Patch the ETL to build the given contexts, yielding a temporary output directory."""
+    with ExitStack() as stack:
+        directory = stack.enter_context(tempfile.TemporaryDirectory())
+        stack.enter_context(patch.dict(etl_runner.CONTEXTS, sources, clear=True))
+        stack.enter_context(patch.dict(etl_runner.COMBINED, combined, clear=True))
+        if inputs is not None:
+            stack.enter_context(patch.dict(etl_runner.SOURCE_INPUTS, inputs, clear=True))
+        yield directory
+
+
+class TestRunETL(unittest.TestCase):
+    """Tests for the ETL pipeline, with local sources."""
+
+    def test_run_etl(self):
+        """All contexts are written, merged in precedence order, with timings per stage."""
+        with _patched_etl(SOURCES, COMBINED, {}) as directory:
+            timings = etl_runner.run_etl(directory, max_workers=2, processes=False)
+            for name in list(SOURCES) + ["ab", "ba"]:
+                path = Path(directory) / f"{name}.csv"
+                with open(path) as file:
+                    context = context_from_file(name, file)
+                self.assertIsNotNone(read_snapshot(name, path))
+                self.assertIn(f"write:{name}", timings)
+            with open(Path(directory) / "ab.csv") as file:
+                rows = {row["namespace"]: row for row in csv.DictReader(file)}
+        self.assertEqual("canonical", rows["http://example.org/x/"]["status"])
+        self.assertEqual("alpha", rows["http://example.org/x/"]["expansion_source"])
+        self.assertEqual("prefix_alias", rows["http://example.org/other/"]["status"])
+        self.assertEqual("http://example.org/other/", context.as_dict()["X"])
+        self.assertEqual(
+            {"fetch:a", "fetch:b", "fetch:bioregistry", "merge:ab", "merge:ba"},
+            {stage for stage in timings if stage.split(":")[0] in ("fetch", "merge")},
+        )
+
+    def test_output_names(self):
+        """Outputs are named after their sources, even if sources name their contexts alike."""
+        sources = {
+            # as bioregistry.upper and bioregistry, and linked_data (named "linkml")
+            "bioregistry.upper": _source("bioregistry", ("W", "http://example.org/w/")),
+            "bioregistry": _source("bioregistry", ("w", "http://example.org/w/")),
+            "linked_data": _source("linkml", ("X", "http://example.org/x/")),
+        }
+        with _patched_etl(sources, {}, {}) as directory:
+            etl_runner.run_etl(directory, processes=False)
+            self.assertEqual(
+                {"bioregistry.upper.csv", "bioregistry.csv", "linked_data.csv"},
+                {path.name for path in Path(directory).glob("*.csv")},
+            )
+            prefixes = {}
+            for name in sources:
+                with open(Path(directory) / f"{name}.csv") as file:
+                    prefixes[name] = list(context_from_file(name, file).as_dict())
+        self.assertEqual(
+            {"bioregistry.upper": ["W"], "bioregistry": ["w"], "linked_data": ["X"]}, prefixes
+        )
+
+    def test_concurrent_fetch(self):
+        """Sources are fetched concurrently."""
+        barrier = threading.Barrier(2, timeout=10)
+
+        def _waiting_source(name):
+            def _getter() -> Context:
+                barrier.wait()
+                return Context(name)
+
+            return _getter
+
+        sources = {"a": _waiting_source("a"), "b": _waiting_source("b")}
+        with _patched_etl(sources, {}) as directory:
+            timings = etl_runner.run_etl(directory, max_workers=2, processes=False)
+        self.assertIn("fetch:b", timings)
+
+    def test_unknown_component(self):
+        """A merged context of unknown contexts is an error."""
+        with _patched_etl(SOURCES, {"ac": ["a", "c"]}) as directory:
+            with self.assertRaises(ValueError):
+                etl_runner.run_etl(directory, processes=False)
+
+    def test_incremental(self):
+        """Only contexts with changed inputs are rebuilt, and unchanged files are untouched."""
+        sources = dict(SOURCES)
+        fingerprints = _fingerprints(a="a1", b="b1", bioregistry="w1")
+        with _patched_etl(sources, COMBINED, fingerprints) as directory:
+            plan = etl_runner.plan_etl(directory)
+            self.assertEqual({"new"}, set(plan.values()))
+            etl_runner.run_etl(directory, processes=False)
+            self.assertEqual({}, etl_runner.plan_etl(directory))
+            mtimes = _mtimes(directory)
+            timings = etl_runner.run_etl(directory, processes=False)
+            self.assertEqual({"check"}, {stage.split(":")[0] for stage in timings})
+
+            # upstream of b changes, but its output does not: only the manifest is rewritten
+            etl_runner.SOURCE_INPUTS["b"] = lambda: "b2"
+            plan = etl_runner.plan_etl(directory)
+            self.assertEqual(["b", "ab", "ba"], list(plan))
+            self.assertEqual("upstream changed", plan["b"])
+            timings = etl_runner.run_etl(directory, processes=False)
+            self.assertIn("fetch:b", timings)
+            self.assertNotIn("merge:ab", timings)
+            self.assertNotIn("fetch:a", timings)
+            self.assertEqual(mtimes, _mtimes(directory))
+
+            # upstream and output of b change: b and both merged contexts are rewritten
+            etl_runner.SOURCE_INPUTS["b"] = lambda: "b3"
+            etl_runner.CONTEXTS["b"] = _source("b", ("V", "http://example.org/v/"))
+            timings = etl_runner.run_etl(directory, processes=False)
+            self.assertEqual(
+                {"fetch:b", "merge:ab", "merge:ba"},
+                {stage for stage in timings if stage.split(":")[0] in ("fetch", "merge")},
+            )
+            for name in ["b", "ab", "ba"]:
+                path = Path(directory) / f"{name}.csv"
+                self.assertNotEqual(mtimes[path.name], path.stat().st_mtime_ns)
+                self.assertIsNotNone(read_snapshot(name, path))
+            for name in ["a", "bioregistry"]:
+                path = Path(directory) / f"{name}.csv"
+                self.assertEqual(mtimes[path.name], path.stat().st_mtime_ns)
+            with open(Path(directory) / "ab.csv") as file:
+                ab = context_from_file("ab", file)
+            self.assertEqual("http://example.org/v/", ab.as_dict()["V"])
+            self.assertEqual("http://example.org/x/", ab.as_dict()["X"])
+            # a was read back from its output, and is still named as by its source
+            self.assertEqual("alpha", ab.get_by_prefix("X")[0].expansion_source)
+
+            # a modified output is rebuilt
+            (Path(directory) / "a.csv").write_text("context,prefix,namespace,status\n")
+            self.assertEqual(["a", "ab", "ba"], list(etl_runner.plan_etl(directory)))
+            self.assertEqual("output modified", etl_runner.plan_etl(directory)["a"])
+
+    def test_malformed_manifest(self):
+        """Malformed manifests are ignored, rebuilding everything."""
+        fingerprints = _fingerprints(a="a1", b="b1", bioregistry="w1")
+        with _patched_etl(SOURCES, COMBINED, fingerprints) as directory:
+            etl_runner.run_etl(directory, processes=False)
+            path = Path(directory) / MANIFEST_NAME
+            for obj in (
+                [],
+                {"version": 1},
+                {"version": 1, "contexts": {"a": {"hash": "a1"}}},
+                {"version": 1, "contexts": {"a": None}},
+            ):
+                with self.subTest(manifest=obj):
+                    path.write_text(json.dumps(obj))
+                    self.assertEqual({"new"}, set(etl_runner.plan_etl(directory).values()))
+
+    def test_formats(self):
+        """Contexts are written in each requested format, and missing formats are rebuilt."""
+        fingerprints = _fingerprints(a="a1", b="b1", bioregistry="w1")
+        with _patched_etl(SOURCES, COMBINED, fingerprints) as directory:
+            etl_runner.run_etl(directory, processes=False)
+            formats = ["csv", "snapshot", "jsonld"]
+            plan = etl_runner.plan_etl(directory, formats=formats)
+            self.assertEqual({"output missing"}, set(plan.values()))
+            etl_runner.run_etl(directory, processes=False, formats=formats)
+            self.assertEqual({}, etl_runner.plan_etl(directory, formats=formats))
+            with open(Path(directory) / "a.context.jsonld") as file:
+                self.assertIn("X", json.load(file)["@context"])
+            with self.assertRaises(ValueError):
+                etl_runner.run_etl(directory, processes=False, formats=["jsonld"])
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from unittest.mock import patch
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from prefixmaps.ingest import fetch as fetch_module
+from prefixmaps.ingest.fetch import OFFLINE_ENV, fetch
+from prefixmaps.ingest.ingest_go import parse_go_xrefs
+from prefixmaps.ingest.ingest_jsonld import from_jsonld_context_url
+from prefixmaps.ingest.ingest_shacl import from_shacl_url
+from prefixmaps.io.cache import CACHE_DIR_ENV
+from tests import INPUT_DIR
+
+
+class _StandInServer(ThreadingHTTPServer):
+    """Serves fixed payloads with ETags, recording the requests it receives."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.payloads: Dict[str, bytes] = {}
+        self.content_types: Dict[str, str] = {}
+        self.failures: Dict[str, int] = {}
+        self.requests: List[tuple] = []
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        etag = self.headers.get("If-None-Match")
+        server.requests.append((self.path, etag))
+        if server.failures.get(self.path):
+            server.failures[self.path] -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = server.payloads.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        current = f'"{hashlib.md5(body).hexdigest()}"'
+        if etag == current:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", current)
+        if self.path in server.content_types:
+            self.send_header("Content-Type", server.content_types[self.path])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFetch(unittest.TestCase):
+    """Tests for the cached fetch layer, against a local stand-in server."""
+
+    def setUp(self) -> None:
+        self.server = _StandInServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        environ = {CACHE_DIR_ENV: self.cache_dir.name, OFFLINE_ENV: ""}
+        self.environ = patch.dict(os.environ, environ)
+        self.environ.start()
+
+    def tearDown(self) -> None:
+        self.environ.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        self.cache_dir.cleanup()
+
+    def test_revalidation(self):
+        """Payloads are cached, revalidated with their ETag, and replaced when changed."""
+        self.server.payloads["/a"] = b"first"
+        url = self.server.url("/a")
+        payload = fetch(url)
+        self.assertEqual(("first", "network"), (payload.text, payload.source))
+        payload = fetch(url)
+        self.assertEqual(("first", "revalidated"), (payload.text, payload.source))
+        self.assertIsNotNone(self.server.requests[-1][1])
+        self.server.payloads["/a"] = b"second"
+        payload = fetch(url)
+        self.assertEqual(("second", "network"), (payload.text, payload.source))
+        self.assertEqual(hashlib.sha256(b"second").hexdigest(), payload.sha256)
+
+    def test_offline(self):
+        """Offline, cached payloads are replayed without requests, and others are errors."""
+        self.server.payloads["/a"] = b"first"
+        url = self.server.url("/a")
+        fetch(url)
+        n_requests = len(self.server.requests)
+        with patch.dict(os.environ, {OFFLINE_ENV: "1"}):
+            payload = fetch(url)
+            self.assertEqual(("first", "cache"), (payload.text, payload.source))
+            with self.assertRaises(ValueError):
+                fetch(self.server.url("/b"))
+        self.assertEqual(n_requests, len(self.server.requests))
+
+    def test_unreachable(self):
+        """Cached payloads are used when the server cannot be reached."""
+        self.server.payloads["/a"] = b"first"
+        url = self.server.url("/a")
+        fetch(url)
+        self.server.shutdown()
+        self.server.server_close()
+        # without retries, to fail fast
+        session = requests.Session()
+        with patch.object(fetch_module, "FALLBACK_TO_CACHE", True):
+            self.assertEqual("cache", fetch(url, session=session).source)
+        with self.assertRaises(requests.ConnectionError):
+            fetch(url, session=session)
+        with self.assertRaises(requests.ConnectionError):
+            fetch(self.server.url("/b"), session=session)
+
+    def test_server_error(self):
+        """Cached payloads are used when the server still fails once retries are exhausted."""
+        self.server.payloads["/a"] = b"first"
+        url = self.server.url("/a")
+        fetch(url)
+        retrying = requests.Session()
+        retry = Retry(total=1, backoff_factor=0, status_forcelist=(503,))
+        retrying.mount("http://", HTTPAdapter(max_retries=retry))
+        for session in (retrying, requests.Session()):
+            self.server.failures["/a"] = 2
+            with patch.object(fetch_module, "FALLBACK_TO_CACHE", True):
+                self.assertEqual("cache", fetch(url, session=session).source)
+        self.server.failures["/b"] = 2
+        with self.assertRaises(requests.exceptions.RetryError):
+            fetch(self.server.url("/b"), session=retrying)
+
+    def test_retry(self):
+        """Transient server errors are retried."""
+        self.server.payloads["/a"] = b"first"
+        self.server.failures["/a"] = 2
+        self.assertEqual("first", fetch(self.server.url("/a")).text)
+        self.assertEqual(3, len(self.server.requests))
+        with self.assertRaises(requests.HTTPError):
+            fetch(self.server.url("/missing"))
+
+    def test_ingests(self):
+        """Ingests from URLs go through the fetch layer."""
+        for path in ["obo_prefixes.ttl", "prefix-cc.context.jsonld", "go-db-xrefs.yaml"]:
+            self.server.payloads[f"/{path}"] = (INPUT_DIR / path).read_bytes()
+        obo = from_shacl_url(self.server.url("/obo_prefixes.ttl"), "obo")
+        self.assertEqual("http://purl.obolibrary.org/obo/GO_", obo.as_dict()["GO"])
+        prefixcc = from_jsonld_context_url(self.server.url("/prefix-cc.context.jsonld"), "p", [])
+        self.assertGreater(len(prefixcc.prefix_expansions), 0)
+        go = parse_go_xrefs(fetch(self.server.url("/go-db-xrefs.yaml")).text)
+        self.assertGreater(len(go.prefix_expansions), 0)
+        with patch.dict(os.environ, {OFFLINE_ENV: "1"}):
+            replayed = from_shacl_url(self.server.url("/obo_prefixes.ttl"), "obo")
+        self.assertEqual(obo.as_dict(), replayed.as_dict())
+
+    def test_turtle_encoding(self):
+        """Turtle is decoded as UTF-8, even if the response gives no charset."""
+        self.server.payloads["/t.ttl"] = (
+            "@prefix sh: <http://www.w3.org/ns/shacl#> .\n"
+            '[ sh:declare [ sh:prefix "caf\u00e9" ; sh:namespace "http://example.org/caf\u00e9/" ] ] .\n'
+        ).encode("utf-8")
+        self.server.content_types["/t.ttl"] = "text/turtle"
+        ctxt = from_shacl_url(self.server.url("/t.ttl"), "t")
+        self.assertEqual({"caf\u00e9": "http://example.org/caf\u00e9/"}, ctxt.as_dict())
@@ -0,0 +1,472 @@
+"""
+Benchmarks of the hot paths: loading, merging, converting, writing, and the ETL.
+
+Run them with ``make benchmark``, or directly::
+
+    python -m tests.test_perf.bench --save results.json --compare baseline.json
+
+Results are saved as JSON; comparing against a baseline exits with a non-zero status if
+any benchmark is slower than the baseline by more than the threshold.
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from unittest.mock import patch
+
+from prefixmaps.conversion.trie import TrieConverter
+from prefixmaps.data import COMBINED, canonical_combined, context_names, context_paths
+from prefixmaps.datamodel.context import Context
+from prefixmaps.datamodel.validation import validate_contexts
+from prefixmaps.ingest import etl_runner
+from prefixmaps.ingest.fetch import OFFLINE_ENV, record
+from prefixmaps.ingest.ingest_bioportal import from_bioportal_file
+from prefixmaps.ingest.ingest_go import URL as GO_URL
+from prefixmaps.ingest.ingest_go import parse_go_xrefs_from_remote
+from prefixmaps.ingest.ingest_jsonld import PREFIXCC_URL, from_prefixcc
+from prefixmaps.ingest.ingest_linkml import from_semweb_curated
+from prefixmaps.ingest.ingest_shacl import OBO_URL, from_obo
+from prefixmaps.io.bundle import ContextBundle
+from prefixmaps.io.cache import CACHE_DIR_ENV
+from prefixmaps.io.parser import cache_clear, load_context, load_multi_context
+from prefixmaps.io.writer import context_to_file
+from tests import INPUT_DIR
+
+FORMAT_VERSION = 1
+"""Incremented whenever the layout of saved results changes."""
+
+THRESHOLD = 1.5
+"""Default allowed slowdown relative to a baseline, as a ratio of the best times."""
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+"""Maps the name of a benchmark to a function that sets it up, returning the function to time."""
+
+FIXTURES = {
+    OBO_URL: "obo_prefixes.ttl",
+    GO_URL: "go-db-xrefs.yaml",
+    PREFIXCC_URL: "prefix-cc.context.jsonld",
+}
+"""Recorded copies of upstream sources, replayed by the offline ETL."""
+
+OFFLINE_SOURCES = {
+    "obo": from_obo,
+    "go": parse_go_xrefs_from_remote,
+    "linked_data": from_semweb_curated,
+    "bioportal": from_bioportal_file,
+    "prefixcc": from_prefixcc,
+}
+OFFLINE_COMBINED = {"offline": ["obo", "go", "linked_data", "prefixcc"]}
+
+
+def benchmark(name: str):
+    """Registers a benchmark."""
+
+    def _register(setup: Callable[[], Callable[[], Any]]):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return _register
+
+
+def _register_loads():
+    for name in sorted(context_paths):
+
+        @benchmark(f"load_context:{name}")
+        def _load(name=name):
+            def _run():
+                cache_clear()
+                return load_context(name)
+
+            return _run
+
+    for name in sorted({canonical_combined(name) for name in COMBINED}):
+
+        @benchmark(f"load_multi_context:{name}")
+        def _load_multi(names=COMBINED[name]):
+            def _run():
+                cache_clear()
+                return load_multi_context(names, disk_cache=False)
+
+            return _run
+
+
+_register_loads()
+
+
+@benchmark("load_bundle:all")
+def _load_bundle():
+    return ContextBundle.load
+
+
+def _fresh_context(name: str) -> Context:
+    """Get a context that is not shared through the cache."""
+    cache_clear()
+    ctxt = load_context(name)
+    cache_clear()
+    return ctxt
+
+
+@benchmark("as_extended_prefix_map:merged")
+def _extended_prefix_map():
+    expansions = _fresh_context("merged").prefix_expansions
+    # a new context each time, as the map is cached on the context
+    return lambda: Context("merged", prefix_expansions=expansions).as_extended_prefix_map()
+
+
+@benchmark("as_converter:merged")
+def _converter():
+    expansions = _fresh_context("merged").prefix_expansions
+    return lambda: Context("merged", prefix_expansions=expansions).as_converter()
+
+
+@benchmark("apply_diff:merged")
+def _apply_diff():
+    new = _fresh_context("merged")
+    expansions = new.prefix_expansions
+    # as when reloading after a release that added and removed a few hundred expansions
+    old_expansions = expansions[:200] + expansions[400:]
+
+    def _run():
+        old = Context("merged", prefix_expansions=list(old_expansions))
+        old.as_converter()
+        start = time.perf_counter()
+        old.apply_diff(old.diff(new))
+        return time.perf_counter() - start
+
+    return _run
+
+
+@benchmark("add_prefixes:merged")
+def _add_prefixes():
+    pairs = [(pe.prefix, pe.namespace) for pe in _fresh_context("merged").prefix_expansions]
+    return lambda: Context("test").add_prefixes(pairs)
+
+
+@benchmark("add_prefix:merged")
+def _add_prefix():
+    pairs = [(pe.prefix, pe.namespace) for pe in _fresh_context("merged").prefix_expansions]
+
+    def _run():
+        ctxt = Context("test")
+        for prefix, namespace in pairs:
+            ctxt.add_prefix(prefix, namespace)
+        return ctxt
+
+    return _run
+
+
+def _records(n: int) -> List[Tuple[str, str]]:
+    """Synthetic registry records: a canonical expansion, a prefix synonym and a URI synonym."""
+    pairs = []
+    for i in range(n):
+        pairs.append((f"P{i}", f"http://example.org/p{i}/"))
+        pairs.append((f"p{i}syn", f"http://example.org/p{i}/"))
+        pairs.append((f"P{i}", f"https://identifiers.org/p{i}:"))
+    return pairs
+
+
+def _register_scaling():
+    # as many records as bioregistry, and a quarter of them: linear scaling takes about 4x
+    # as long for the larger, quadratic about 16x
+    for n in (3500, 14000):
+
+        @benchmark(f"add_prefixes:records-{n}")
+        def _add_prefixes(pairs=_records(n)):
+            return lambda: Context("test", upper=True).add_prefixes(pairs)
+
+        @benchmark(f"add_prefix:records-{n}")
+        def _add_prefix(pairs=_records(n)):
+            def _run():
+                ctxt = Context("test", upper=True)
+                for prefix, namespace in pairs:
+                    ctxt.add_prefix(prefix, namespace)
+                return ctxt
+
+            return _run
+
+
+_register_scaling()
+
+
+@benchmark("combine:merged")
+def _combine():
+    # compare with add_prefix:merged, adding the expansions one by one
+    components = [_fresh_context(name) for name in COMBINED["merged"]]
+
+    def _run():
+        ctxt = Context("merged")
+        for component in components:
+            ctxt.combine(component)
+        return ctxt
+
+    return _run
+
+
+@benchmark("context_to_file:merged")
+def _context_to_file():
+    ctxt = _fresh_context("merged")
+    return lambda: context_to_file(ctxt, io.StringIO())
+
+
+CONVERSIONS = 200000
+"""Number of values converted by the conversion benchmarks."""
+
+
+def _conversion_inputs() -> Tuple[Context, List[str], List[str]]:
+    """Get the merged context, with CURIEs and URIs using its canonical prefixes."""
+    ctxt = _fresh_context("merged")
+    rng = random.Random(0)
+    pairs = rng.choices(sorted(ctxt.as_dict().items()), k=CONVERSIONS)
+    curies = [f"{prefix}:{rng.randrange(10**7)}" for prefix, _ in pairs]
+    uris = [f"{namespace}{rng.randrange(10**7)}" for _, namespace in pairs]
+    return ctxt, curies, uris
+
+
+@benchmark("expand_many:merged")
+def _expand_many():
+    ctxt, curies, _ = _conversion_inputs()
+    converter = TrieConverter.from_context(ctxt)
+    return lambda: converter.expand_many(curies)
+
+
+@benchmark("compress_many:merged")
+def _compress_many():
+    ctxt, _, uris = _conversion_inputs()
+    converter = TrieConverter.from_context(ctxt)
+    return lambda: converter.compress_many(uris)
+
+
+def _register_arrays():
+    # compare with expand_many and compress_many, which convert element by element
+    try:
+        import numpy
+    except ImportError:
+        return
+    from prefixmaps.conversion.arrays import ArrayConverter
+
+    @benchmark("arrays:expand")
+    def _expand():
+        ctxt, curies, _ = _conversion_inputs()
+        converter = ArrayConverter.from_context(ctxt)
+        values = numpy.array(curies)
+        return lambda: converter.expand(values)
+
+    @benchmark("arrays:compress")
+    def _compress():
+        ctxt, _, uris = _conversion_inputs()
+        converter = ArrayConverter.from_context(ctxt)
+        values = numpy.array(uris)
+        return lambda: converter.compress(values)
+
+
+_register_arrays()
+
+
+@benchmark("validate:all")
+def _validate():
+    contexts = [_fresh_context(name) for name in context_names()]
+    return lambda: validate_contexts(contexts, canonical_only=False)
+
+
+def import_times(code: str) -> Dict[str, int]:
+    """
+    Get the cumulative import time of each module imported by running some code.
+
+    :param code: run in a new interpreter, with ``-X importtime``
+    :return: times in microseconds, by module
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, module = line.split("|")
+        # skipping the header
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+@benchmark("import:prefixmaps")
+def _import():
+    return lambda: import_times("import prefixmaps")["prefixmaps"] / 1e6
+
+
+@contextmanager
+def offline_etl() -> Iterator[Path]:
+    """
+    Sets up the ETL to run offline, on recorded copies of the upstream sources.
+
+    Only sources that can be replayed are included; bioregistry and w3id are not.
+
+    :return: an empty output directory
+    """
+    with ExitStack() as stack:
+        directory = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        cache_dir = directory / "cache"
+        for url, fixture in FIXTURES.items():
+            record(url, (INPUT_DIR / fixture).read_bytes(), cache_dir / "http")
+        environ = {CACHE_DIR_ENV: str(cache_dir), OFFLINE_ENV: "1"}
+        stack.enter_context(patch.dict(os.environ, environ))
+        stack.enter_context(patch.dict(etl_runner.CONTEXTS, OFFLINE_SOURCES, clear=True))
+        stack.enter_context(patch.dict(etl_runner.COMBINED, OFFLINE_COMBINED, clear=True))
+        output = directory / "output"
+        output.mkdir()
+        yield output
+
+
+@benchmark("etl:offline")
+def _etl():
+    def _run():
+        with offline_etl() as output:
+            return etl_runner.run_etl(output, processes=False)
+
+    return _run
+
+
+@benchmark("etl:offline-unchanged")
+def _etl_unchanged():
+    def _run():
+        with offline_etl() as output:
+            etl_runner.run_etl(output, processes=False)
+            start = time.perf_counter()
+            etl_runner.run_etl(output, processes=False)
+            return time.perf_counter() - start
+
+    return _run
+
+
+def measure(func: Callable[[], Any], rounds: int = 5) -> Dict[str, Any]:
+    """
+    Times a function, with the garbage collector disabled.
+
+    A function returning a float reports its own time, e.g. to exclude its setup.
+
+    :param func:
+    :param rounds:
+    :return: statistics of the times, in seconds
+    """
+    times = []
+    for _ in range(rounds):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            value = func()
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        times.append(value if isinstance(value, float) else elapsed)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "rounds": rounds,
+    }
+
+
+def run(names: Optional[List[str]] = None, rounds: int = 5) -> Dict[str, Any]:
+    """
+    Runs benchmarks.
+
+    :param names: names of the benchmarks to run, defaults to all
+    :param rounds: number of times each benchmark is timed
+    :return: results, as saved by :func:`save`
+    """
+    benchmarks = {}
+    for name in names if names is not None else BENCHMARKS:
+        benchmarks[name] = measure(BENCHMARKS[name](), rounds)
+    cache_clear()
+    return {
+        "version": FORMAT_VERSION,
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "benchmarks": benchmarks,
+    }
+
+
+def save(results: Dict[str, Any], path: Path) -> None:
+    """Saves results as JSON."""
+    Path(path).write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+
+def load(path: Path) -> Dict[str, Any]:
+    """Loads results saved by :func:`save`."""
+    results = json.loads(Path(path).read_text())
+    if results.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported benchmark results in {path}")
+    return results
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = THRESHOLD
+) -> List[Tuple[str, float]]:
+    """
+    Compares results against a baseline, by the best time of each benchmark.
+
+    :param results:
+    :param baseline:
+    :param threshold: allowed ratio of the best time to that of the baseline
+    :return: the benchmarks slower than allowed, with their ratios
+    """
+    regressions = []
+    for name, stats in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            continue
+        ratio = stats["min"] / previous["min"]
+        if ratio > threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", "--keyword", help="only run benchmarks whose name contains this")
+    parser.add_argument("-r", "--rounds", type=int, default=5)
+    parser.add_argument("--save", type=Path, help="save results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="compare against results in this file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+    names = [name for name in BENCHMARKS if not args.keyword or args.keyword in name]
+    baseline = load(args.compare) if args.compare else None
+    results = run(names, args.rounds)
+    for name, stats in results["benchmarks"].items():
+        line = f"{name:<40} {stats['min'] * 1000:10.2f}ms {stats['median'] * 1000:10.2f}ms"
+        previous = baseline and baseline["benchmarks"].get(name)
+        if previous:
+            line += f" {stats['min'] / previous['min']:6.2f}x"
+        print(line)
+    if args.save:
+        save(results, args.save)
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for name, ratio in regressions:
+            print(f"REGRESSION: {name} is {ratio:.2f}x slower than the baseline", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""Tests for the benchmark suite."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from prefixmaps.ingest import etl_runner
+from tests.test_perf import bench
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Tests for the benchmark suite."""
+
+    def test_run(self):
+        """All benchmarks run, and their results can be saved and compared."""
+        results = bench.run(rounds=1)
+        self.assertEqual(set(bench.BENCHMARKS), set(results["benchmarks"]))
+        self.assertIn("load_context:merged", results["benchmarks"])
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "results.json"
+            bench.save(results, path)
+            baseline = bench.load(path)
+        self.assertEqual([], bench.compare(results, baseline))
+        baseline["benchmarks"]["load_context:merged"]["min"] /= 10
+        regressions = bench.compare(results, baseline)
+        self.assertEqual(["load_context:merged"], [name for name, _ in regressions])
+        self.assertGreater(regressions[0][1], bench.THRESHOLD)
+
+    def test_main(self):
+        """The command saves results, and fails on regressions."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "results.json"
+            args = ["-k", "load_context:go", "-r", "1"]
+            self.assertEqual(0, bench.main(args + ["--save", str(path)]))
+            results = bench.load(path)
+            results["benchmarks"]["load_context:go"]["min"] /= 1000
+            bench.save(results, path)
+            self.assertEqual(1, bench.main(args + ["--compare", str(path)]))
+
+    def test_offline_etl(self):
+        """The offline ETL replays recorded sources."""
+        with bench.offline_etl() as output:
+            etl_runner.run_etl(output, processes=False)
+            names = {path.stem for path in output.glob("*.csv")}
+        self.assertEqual(set(bench.OFFLINE_SOURCES) | set(bench.OFFLINE_COMBINED), names)
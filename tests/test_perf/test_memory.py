@@ -0,0 +1,32 @@
+"""Tracks the memory used per prefix expansion by loaded contexts."""
+
+import gc
+import tracemalloc
+import unittest
+
+from prefixmaps.data import context_paths
+from prefixmaps.io.parser import context_from_file
+
+MAX_BYTES_PER_EXPANSION = 200
+"""Budget for the bundled contexts, parsed from CSV; about 360 bytes before slots and interning."""
+
+
+class TestMemory(unittest.TestCase):
+    """Tracks the memory used per prefix expansion by loaded contexts."""
+
+    def test_bytes_per_expansion(self):
+        """Loading all bundled contexts stays within the per-expansion memory budget."""
+        gc.collect()
+        tracemalloc.start()
+        try:
+            contexts = []
+            for name, path in sorted(context_paths.items()):
+                with open(path, encoding="utf-8") as file:
+                    contexts.append(context_from_file(name, file))
+            gc.collect()
+            allocated, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        n_expansions = sum(len(ctxt.prefix_expansions) for ctxt in contexts)
+        bytes_per_expansion = allocated / n_expansions
+        self.assertLess(bytes_per_expansion, MAX_BYTES_PER_EXPANSION)